@@ -0,0 +1,108 @@
+"""
+Consultas sobre el corpus exportado a Parquet (ver corpus.py).
+
+Todas las consultas son operaciones vectorizadas de pandas (groupby, explode,
+isin) sobre los datasets, sin bucles en Python por fila.
+
+Uso:
+    python analitica.py                          # exporta los posts y muestra todos los informes
+    python analitica.py --corpus .cache/corpus --informe latencia
+"""
+
+import argparse
+
+import pandas as pd
+
+import corpus
+
+
+def volumen_por_fuente_dia(noticias: pd.DataFrame) -> pd.DataFrame:
+    """Noticias ingeridas por día (filas) y fuente (columnas)"""
+    if noticias.empty:
+        return pd.DataFrame()
+    return (noticias.groupby(["fecha", "fuente"]).size()
+            .unstack("fuente", fill_value=0)
+            .sort_index())
+
+
+def latencia_mediana_por_proveedor(posts: pd.DataFrame) -> pd.DataFrame:
+    """Mediana y p90 de latencia y tokens de respuesta de las generaciones por proveedor y modelo"""
+    generados = posts[(posts["tipo"] != "editado") & posts["latencia_ms"].notna()]
+    if generados.empty:
+        return pd.DataFrame()
+    return (generados.groupby(["proveedor", "modelo"])
+            .agg(generaciones=("id", "size"),
+                 latencia_mediana_ms=("latencia_ms", "median"),
+                 latencia_p90_ms=("latencia_ms", lambda s: s.quantile(0.9)),
+                 tokens_respuesta_mediana=("tokens_respuesta", "median"))
+            .sort_values("latencia_mediana_ms"))
+
+
+def palabras_clave_por_semana(noticias: pd.DataFrame, top: int = 10) -> pd.DataFrame:
+    """Palabras clave más frecuentes de cada semana de ingesta"""
+    if noticias.empty:
+        return pd.DataFrame()
+    palabras = noticias[["fecha", "palabras_clave"]].explode("palabras_clave").dropna()
+    if palabras.empty:
+        return pd.DataFrame()
+    palabras["semana"] = pd.to_datetime(palabras["fecha"]).dt.to_period("W").dt.start_time.dt.date
+    palabras["palabra"] = palabras["palabras_clave"].str.lower()
+    frecuencias = palabras.groupby(["semana", "palabra"]).size().rename("menciones").reset_index()
+    return (frecuencias.sort_values(["semana", "menciones"], ascending=[True, False])
+            .groupby("semana").head(top)
+            .reset_index(drop=True))
+
+
+def tasa_uso_por_configuracion(posts: pd.DataFrame, por: str = "estilo") -> pd.DataFrame:
+    """
+    Proporción de posts generados que el usuario llegó a editar y guardar,
+    agrupada por estilo, tono, longitud o fuente de la noticia
+    """
+    generados = posts[posts["tipo"] != "editado"]
+    if generados.empty:
+        return pd.DataFrame()
+    editados = posts.loc[posts["tipo"] == "editado", "post_origen"].dropna().astype(int)
+    usados = generados["id"].isin(editados)
+    return (usados.groupby(generados[por].fillna("").replace("", "—"))
+            .agg(generados="size", editados="sum", tasa_uso="mean")
+            .sort_values("tasa_uso", ascending=False))
+
+
+INFORMES = {
+    "volumen": ("📰 Noticias por día y fuente", lambda n, p: volumen_por_fuente_dia(n)),
+    "latencia": ("⏱️ Latencia por proveedor", lambda n, p: latencia_mediana_por_proveedor(p)),
+    "palabras": ("🔑 Palabras clave por semana", lambda n, p: palabras_clave_por_semana(n)),
+    "uso": ("✍️ Tasa de uso por estilo", lambda n, p: tasa_uso_por_configuracion(p, "estilo")),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informes sobre el corpus de noticias y posts en Parquet")
+    parser.add_argument("--corpus", default=corpus.DIRECTORIO, help="Directorio del corpus exportado")
+    parser.add_argument("--historial", default="historial_posts.db", help="Historial a exportar antes de consultar")
+    parser.add_argument("--informe", choices=list(INFORMES), nargs="+", default=list(INFORMES))
+    args = parser.parse_args()
+
+    if not corpus.disponible():
+        print("❌ Instala pyarrow para usar el corpus en Parquet: pip install pyarrow")
+        return
+
+    exportador = corpus.ExportadorParquet(args.corpus)
+    try:
+        from historial import HistorialPosts
+        nuevos = exportador.exportar_posts(HistorialPosts(args.historial))
+        print(f"📦 {nuevos} posts nuevos exportados a {exportador.ruta_posts}")
+    except Exception as e:
+        print(f"⚠️ No se pudo exportar el historial: {e}")
+
+    noticias, posts = exportador.leer_noticias(), exportador.leer_posts()
+    print(f"📚 {len(noticias)} noticias y {len(posts)} posts en el corpus\n")
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        for informe in args.informe:
+            titulo, consulta = INFORMES[informe]
+            resultado = consulta(noticias, posts)
+            print(f"{titulo}\n{resultado if not resultado.empty else 'Sin datos'}\n")
+
+
+if __name__ == "__main__":
+    main()
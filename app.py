@@ -2,16 +2,58 @@ import streamlit as st
 import requests
 from datetime import datetime, timedelta
 import openai
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 import os
+import html
 from groq import Groq
 import time
+import threading
+import functools
 from dotenv import load_dotenv
+from imagenes import CacheImagenes
+import semantica
+import traduccion
+from historial import HistorialPosts
+from presupuesto import PRESUPUESTO
+from utils import analizar_post, LIMITE_CARACTERES_LINKEDIN
+import generacion
+import noticias
+from cliente_backend import ClienteBackend
+import coalescencia
+import circuitos
+import calendario
+from especulacion import Especulador
+from grabacion import GRABADOR
+from procesamiento import ProcesadorNoticias
+import corpus
+import analitica
+import memoria
+import monitor_salud
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import uuid
+import pandas as pd
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Modo multiusuario: con BACKEND_URL la app delega búsquedas y generación en el backend compartido
+BACKEND_URL = os.getenv("BACKEND_URL", "")
+if BACKEND_URL:
+    proveedor_noticias = motor_generacion = ClienteBackend(BACKEND_URL)
+else:
+    proveedor_noticias = noticias
+    motor_generacion = generacion
+
+def id_sesion() -> str:
+    """
+    Id aleatorio de la sesión (grabación de tráfico y límites de memoria)
+    """
+    return st.session_state.setdefault('id_sesion', uuid.uuid4().hex[:8])
+
+# Grabación opcional del tráfico (GRABAR_TRAFICO)
+GRABADOR.sesion = id_sesion
+
 # Configuración de la página
 st.set_page_config(
     page_title="Generador de Noticias LinkedIn",
@@ -21,348 +63,754 @@ st.set_page_config(
 )
 
 # Funciones auxiliares
-@st.cache_data(ttl=3600)  # Cache por 1 hora
+def mostrar_errores(mensaje: str):
+    """
+    Muestra el error de la fuente y devuelve una lista vacía. Va por fuera de
+    st.cache_data: si el fallo (p. ej. CircuitoAbierto) se capturase dentro, la
+    lista vacía quedaría en caché una hora y la fuente no se volvería a probar
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            try:
+                return funcion(*args, **kwargs)
+            except Exception as e:
+                st.error(f"{mensaje}: {str(e)}")
+                return []
+        return envoltura
+    return decorador
+
+@mostrar_errores("Error al obtener noticias")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)  # Cache por 1 hora
 def obtener_noticias_newsapi(api_key: str, categoria: str = "general", pais: str = "us", num_articulos: int = 10) -> List[Dict]:
     """
     Obtiene noticias de NewsAPI
     """
+    return proveedor_noticias.obtener_noticias_newsapi(api_key, categoria, pais, num_articulos)
+
+@mostrar_errores("Error al obtener noticias de The Guardian")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def obtener_noticias_guardian(api_key: str, seccion: str = "world", num_articulos: int = 10) -> List[Dict]:
+    """
+    Obtiene noticias de The Guardian API
+    """
+    return proveedor_noticias.obtener_noticias_guardian(api_key, seccion, num_articulos)
+
+@mostrar_errores("Error al obtener noticias de Google")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def obtener_noticias_google(query: str, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+    """
+    Obtiene noticias de Google News usando una query personalizada
+    """
+    return proveedor_noticias.obtener_noticias_google(query, num_articulos, idioma)
+
+@mostrar_errores("Error al obtener trending de Google")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def obtener_noticias_google_trending(num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+    """
+    Obtiene las noticias trending de Google News
+    """
+    return proveedor_noticias.obtener_noticias_google_trending(num_articulos, idioma)
+
+@mostrar_errores("Error al obtener noticias RSS")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def obtener_noticias_rss_bbc(query: str = "", num_articulos: int = 10) -> List[Dict]:
+    """
+    Obtiene noticias de BBC RSS como alternativa gratuita
+    """
+    return proveedor_noticias.obtener_noticias_rss_bbc(query, num_articulos)
+
+@mostrar_errores("Error al buscar noticias en The Guardian")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def buscar_noticias_guardian_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+    """
+    Busca noticias específicas en The Guardian API usando una query personalizada
+    """
+    return proveedor_noticias.buscar_noticias_guardian_personalizada(api_key, query, num_articulos)
+
+@mostrar_errores("Error al buscar noticias en NewsAPI")
+@GRABADOR.grabar
+@memoria.CACHES.acotar
+@st.cache_data(ttl=3600, max_entries=memoria.MAX_ENTRADAS_CACHE)
+def buscar_noticias_newsapi_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+    """
+    Busca noticias específicas en NewsAPI usando una query personalizada
+    """
+    return proveedor_noticias.buscar_noticias_newsapi_personalizada(api_key, query, num_articulos)
+
+# Nombres de las fuentes en los cortacircuitos (ver circuitos.py)
+NOMBRES_FUENTES = {"google": "Google News", "guardian": "The Guardian", "bbc": "BBC RSS", "newsapi": "NewsAPI"}
+
+def obtener_estado_fuentes() -> Dict[str, Dict]:
+    """
+    Estado de los cortacircuitos de las fuentes, locales o del backend compartido
+    """
+    try:
+        return proveedor_noticias.estado_fuentes()
+    except Exception:
+        return {}
+
+def generar_post_openai(client, noticia: Dict, estilo: str, tono: str, longitud: str, metricas: Optional[Dict] = None) -> str:
+    """
+    Genera un post de LinkedIn usando OpenAI
+    """
     try:
-        url = "https://newsapi.org/v2/top-headlines"
-        params = {
-            "apiKey": api_key,
-            "category": categoria,
-            "country": pais,
-            "pageSize": num_articulos,
-            "sortBy": "publishedAt"
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        return data.get("articles", [])
+        return motor_generacion.generar_post(client, "OpenAI", noticia, estilo, tono, longitud, metricas)
     
     except Exception as e:
-        st.error(f"Error al obtener noticias: {str(e)}")
-        return []
+        st.error(f"Error al generar post con OpenAI: {str(e)}")
+        return ""
 
-@st.cache_data(ttl=3600)
-def obtener_noticias_guardian(api_key: str, seccion: str = "world", num_articulos: int = 10) -> List[Dict]:
+def generar_post_groq(client, noticia: Dict, estilo: str, tono: str, longitud: str, metricas: Optional[Dict] = None) -> str:
     """
-    Obtiene noticias de The Guardian API
+    Genera un post de LinkedIn usando Groq
     """
     try:
-        url = "https://content.guardianapis.com/search"
-        params = {
-            "api-key": api_key,
-            "section": seccion,
-            "page-size": num_articulos,
-            "order-by": "newest",
-            "show-fields": "headline,trailText,bodyText,thumbnail"
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        articles = []
-        
-        for item in data.get("response", {}).get("results", []):
-            articles.append({
-                "title": item.get("webTitle", ""),
-                "description": item.get("fields", {}).get("trailText", ""),
-                "content": item.get("fields", {}).get("bodyText", "")[:500] + "...",
-                "url": item.get("webUrl", ""),
-                "publishedAt": item.get("webPublicationDate", ""),
-                "urlToImage": item.get("fields", {}).get("thumbnail", "")
-            })
-        
-        return articles
+        return motor_generacion.generar_post(client, "Groq", noticia, estilo, tono, longitud, metricas)
     
     except Exception as e:
-        st.error(f"Error al obtener noticias de The Guardian: {str(e)}")
-        return []
+        st.error(f"Error al generar post con Groq: {str(e)}")
+        return ""
 
-@st.cache_data(ttl=3600)
-def obtener_noticias_google(query: str, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+def generar_post_local(client, noticia: Dict, estilo: str, tono: str, longitud: str, metricas: Optional[Dict] = None) -> str:
     """
-    Obtiene noticias de Google News usando una query personalizada
+    Genera un post de LinkedIn con el LLM local
     """
     try:
-        from pygooglenews import GoogleNews
-        
-        # Inicializar Google News
-        gn = GoogleNews(lang=idioma, country='ES' if idioma == 'es' else 'US')
-        
-        # Buscar noticias por query
-        search_result = gn.search(query)
-        
-        articles = []
-        
-        if search_result and 'entries' in search_result:
-            for entry in search_result['entries'][:num_articulos]:
-                # Extraer imagen si existe
-                image_url = ""
-                if hasattr(entry, 'media_content') and entry.media_content:
-                    image_url = entry.media_content[0].get('url', '')
-                elif hasattr(entry, 'links'):
-                    for link in entry.links:
-                        if 'image' in link.get('type', ''):
-                            image_url = link.get('href', '')
-                            break
-                
-                articles.append({
-                    "title": entry.title,
-                    "description": entry.summary if hasattr(entry, 'summary') else entry.title,
-                    "content": (entry.summary if hasattr(entry, 'summary') else entry.title)[:500] + "...",
-                    "url": entry.link,
-                    "publishedAt": entry.published if hasattr(entry, 'published') else "",
-                    "urlToImage": image_url,
-                    "source": entry.source.title if hasattr(entry, 'source') else "Google News"
-                })
-        
-        return articles
+        return motor_generacion.generar_post(client, "Local", noticia, estilo, tono, longitud, metricas)
     
     except Exception as e:
-        st.error(f"Error al obtener noticias de Google: {str(e)}")
-        return []
+        st.error(f"Error al generar post con el LLM local: {str(e)}")
+        return ""
 
-@st.cache_data(ttl=3600)
-def obtener_noticias_google_trending(num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+def generar_variantes_openai(client, noticia: Dict, estilo: str, tono: str, longitud: str, num_variantes: int, metricas: Optional[Dict] = None) -> List[str]:
     """
-    Obtiene las noticias trending de Google News
+    Genera varias versiones del post en una sola petición usando el parámetro n de OpenAI
     """
     try:
-        from pygooglenews import GoogleNews
-        
-        # Inicializar Google News
-        gn = GoogleNews(lang=idioma, country='ES' if idioma == 'es' else 'US')
-        
-        # Obtener noticias trending
-        trending = gn.top_news()
-        
-        articles = []
-        
-        if trending and 'entries' in trending:
-            for entry in trending['entries'][:num_articulos]:
-                # Extraer imagen si existe
-                image_url = ""
-                if hasattr(entry, 'media_content') and entry.media_content:
-                    image_url = entry.media_content[0].get('url', '')
-                
-                articles.append({
-                    "title": entry.title,
-                    "description": entry.summary if hasattr(entry, 'summary') else entry.title,
-                    "content": (entry.summary if hasattr(entry, 'summary') else entry.title)[:500] + "...",
-                    "url": entry.link,
-                    "publishedAt": entry.published if hasattr(entry, 'published') else "",
-                    "urlToImage": image_url,
-                    "source": entry.source.title if hasattr(entry, 'source') else "Google News"
-                })
-        
-        return articles
+        return motor_generacion.generar_variantes(client, "OpenAI", noticia, estilo, tono, longitud, num_variantes, metricas)
     
     except Exception as e:
-        st.error(f"Error al obtener trending de Google: {str(e)}")
+        st.error(f"Error al generar variantes con OpenAI: {str(e)}")
         return []
 
-@st.cache_data(ttl=3600)
-def obtener_noticias_rss_bbc(query: str = "", num_articulos: int = 10) -> List[Dict]:
+def generar_variantes_groq(client, noticia: Dict, estilo: str, tono: str, longitud: str, num_variantes: int, metricas: Optional[Dict] = None) -> List[str]:
     """
-    Obtiene noticias de BBC RSS como alternativa gratuita
+    Genera varias versiones del post en una sola petición.
+    Groq no admite n > 1, así que se piden todas en la misma respuesta y se separan.
     """
     try:
-        import feedparser
-        
-        # URLs de RSS de BBC por categoría
-        rss_urls = {
-            "general": "http://feeds.bbci.co.uk/news/rss.xml",
-            "business": "http://feeds.bbci.co.uk/news/business/rss.xml", 
-            "technology": "http://feeds.bbci.co.uk/news/technology/rss.xml",
-            "science": "http://feeds.bbci.co.uk/news/science_and_environment/rss.xml"
-        }
-        
-        # Usar feed general por defecto
-        feed_url = rss_urls["general"]
-        
-        # Si hay query, usar búsqueda en tecnología/business
-        if query and any(word in query.lower() for word in ["tech", "ai", "digital", "business", "economy"]):
-            if any(word in query.lower() for word in ["tech", "ai", "digital", "technology"]):
-                feed_url = rss_urls["technology"]
-            else:
-                feed_url = rss_urls["business"]
-        
-        feed = feedparser.parse(feed_url)
-        articles = []
-        
-        for entry in feed.entries[:num_articulos]:
-            # Filtrar por query si se proporciona
-            if query and query.lower() not in entry.title.lower() and query.lower() not in entry.summary.lower():
-                continue
-                
-            articles.append({
-                "title": entry.title,
-                "description": entry.summary,
-                "content": entry.summary[:500] + "...",
-                "url": entry.link,
-                "publishedAt": entry.published if hasattr(entry, 'published') else "",
-                "urlToImage": ""
-            })
-        
-        return articles[:num_articulos]
+        return motor_generacion.generar_variantes(client, "Groq", noticia, estilo, tono, longitud, num_variantes, metricas)
     
     except Exception as e:
-        st.error(f"Error al obtener noticias RSS: {str(e)}")
+        st.error(f"Error al generar variantes con Groq: {str(e)}")
         return []
 
-@st.cache_data(ttl=3600)
-def buscar_noticias_guardian_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+def generar_variantes_local(client, noticia: Dict, estilo: str, tono: str, longitud: str, num_variantes: int, metricas: Optional[Dict] = None) -> List[str]:
     """
-    Busca noticias específicas en The Guardian API usando una query personalizada
+    Genera varias versiones del post en una sola petición al LLM local
     """
     try:
-        url = "https://content.guardianapis.com/search"
-        params = {
-            "api-key": api_key,
-            "q": query,
-            "page-size": num_articulos,
-            "order-by": "relevance",
-            "show-fields": "headline,trailText,bodyText,thumbnail",
-            "from-date": (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')  # Últimos 7 días
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        articles = []
-        
-        for item in data.get("response", {}).get("results", []):
-            articles.append({
-                "title": item.get("webTitle", ""),
-                "description": item.get("fields", {}).get("trailText", ""),
-                "content": item.get("fields", {}).get("bodyText", "")[:500] + "...",
-                "url": item.get("webUrl", ""),
-                "publishedAt": item.get("webPublicationDate", ""),
-                "urlToImage": item.get("fields", {}).get("thumbnail", "")
-            })
-        
-        return articles
+        return motor_generacion.generar_variantes(client, "Local", noticia, estilo, tono, longitud, num_variantes, metricas)
     
     except Exception as e:
-        st.error(f"Error al buscar noticias en The Guardian: {str(e)}")
+        st.error(f"Error al generar variantes con el LLM local: {str(e)}")
         return []
 
-@st.cache_data(ttl=3600)
-def buscar_noticias_newsapi_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+def generar_post_estructurado(client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str, metricas: Optional[Dict] = None) -> Dict:
     """
-    Busca noticias específicas en NewsAPI usando una query personalizada
+    Genera el post como JSON (gancho, cuerpo, llamada a la acción y hashtags) y lo monta
     """
     try:
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            "apiKey": api_key,
-            "q": query,
-            "pageSize": num_articulos,
-            "sortBy": "relevancy",
-            "language": "en",
-            "from": (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')  # Últimos 7 días
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        return data.get("articles", [])
+        return motor_generacion.generar_post_estructurado(client, proveedor, noticia, estilo, tono, longitud, metricas)
     
     except Exception as e:
-        st.error(f"Error al buscar noticias en NewsAPI: {str(e)}")
-        return []
+        st.error(f"Error al generar el post estructurado con {proveedor}: {str(e)}")
+        return {}
 
-def generar_post_openai(client, noticia: Dict, estilo: str, tono: str, longitud: str) -> str:
+@st.cache_resource
+def obtener_especulador() -> Especulador:
     """
-    Genera un post de LinkedIn usando OpenAI
+    Generaciones especulativas compartidas por todas las sesiones
+    """
+    return Especulador()
+
+def clave_especulacion(proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str) -> tuple:
+    return (proveedor, noticia.get('url') or noticia.get('title'), estilo, tono, longitud)
+
+def especular_post(client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str) -> None:
+    """
+    Empieza a generar el post en segundo plano; si la noticia o la configuración
+    cambian, la generación anterior se cancela
+    """
+    clave = clave_especulacion(proveedor, noticia, estilo, tono, longitud)
+    actual = st.session_state.get('especulacion')
+    if actual is not None and actual.clave == clave:
+        return
+    if actual is not None:
+        obtener_especulador().descartar(actual)
+    st.session_state.especulacion = obtener_especulador().lanzar(
+        clave,
+        lambda cancelado, metricas: motor_generacion.generar_post(client, proveedor, noticia, estilo, tono, longitud,
+                                                                  metricas, cancelado=cancelado)
+    )
+
+def descartar_especulacion() -> None:
+    """
+    Cancela la generación especulativa de la sesión, si la hay
+    """
+    actual = st.session_state.pop('especulacion', None)
+    if actual is not None:
+        obtener_especulador().descartar(actual)
+
+# Componentes de interfaz
+NOTICIAS_POR_PAGINA = 10
+
+@st.cache_resource
+def obtener_cache_imagenes() -> CacheImagenes:
+    """
+    Caché de miniaturas compartida por todas las sesiones
+    """
+    return CacheImagenes()
+
+def precargar_miniaturas(noticias: List[Dict]) -> None:
+    """
+    Descarga en segundo plano las miniaturas de una lista de resultados
+    """
+    urls = [noticia.get('urlToImage', '') for noticia in noticias]
+    threading.Thread(target=obtener_cache_imagenes().precargar, args=(urls,), daemon=True).start()
+
+def mostrar_miniatura(url: str, ancho: int, descargar: bool = False) -> None:
     """
+    Muestra la miniatura reducida desde la caché local.
+    Si aún no está disponible, el navegador la carga de forma diferida desde el origen.
+    """
+    cache = obtener_cache_imagenes()
+    datos = cache.miniatura(url, ancho) if descargar else cache.en_cache(url, ancho)
+    if datos:
+        st.image(datos, width=ancho)
+        return
+    
+    st.markdown(
+        f"<img src='{html.escape(url, quote=True)}' width='{ancho}' loading='lazy' decoding='async'>",
+        unsafe_allow_html=True
+    )
+
+def cambiar_pagina_noticias(pagina: int) -> None:
+    """
+    Callback de los botones de paginación
+    """
+    st.session_state.pagina_noticias = pagina
+
+@st.fragment
+def mostrar_noticias_paginadas():
+    """
+    Muestra solo la página visible de la lista de noticias.
+    Al ser un fragmento, cambiar de página no vuelve a ejecutar el resto de la app.
+    """
+    noticias = st.session_state.noticias
+    total_paginas = max(1, -(-len(noticias) // NOTICIAS_POR_PAGINA))
+    pagina = min(st.session_state.get('pagina_noticias', 0), total_paginas - 1)
+    
+    inicio = pagina * NOTICIAS_POR_PAGINA
+    for i in range(inicio, min(inicio + NOTICIAS_POR_PAGINA, len(noticias))):
+        noticia = noticias[i]
+        with st.expander(f"📰 {noticia['title'][:45]}..."):
+            st.write(f"**Descripción:** {noticia['description'][:150]}...")
+            if noticia.get('urlToImage'):
+                mostrar_miniatura(noticia['urlToImage'], 180)
+            
+            if st.button(f"✨ Seleccionar esta noticia", key=f"btn_{i}", use_container_width=True):
+                st.session_state.noticia_seleccionada = noticia
+                # El panel del generador está fuera del fragmento
+                st.rerun()
+    
+    if total_paginas > 1:
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            st.button("⬅️", key="pagina_anterior", disabled=pagina == 0, use_container_width=True,
+                      on_click=cambiar_pagina_noticias, args=(pagina - 1,))
+        with col_info:
+            st.caption(f"Página {pagina + 1} de {total_paginas} · {len(noticias)} noticias")
+        with col_next:
+            st.button("➡️", key="pagina_siguiente", disabled=pagina >= total_paginas - 1, use_container_width=True,
+                      on_click=cambiar_pagina_noticias, args=(pagina + 1,))
+
+@st.cache_resource
+def obtener_indice_semantico() -> "semantica.IndiceSemantico":
+    """
+    Índice semántico compartido por todas las sesiones
+    """
+    return semantica.IndiceSemantico()
+
+@st.cache_resource
+def obtener_traductor_noticias(proveedor: str, api_key: str, base_url: Optional[str] = None) -> Optional["traduccion.TraductorNoticias"]:
+    """
+    Etapa de traducción compartida: modelo local si está instalado, si no el proveedor LLM
+    """
+    if os.getenv("TRADUCTOR") == "prueba":
+        return traduccion.TraductorNoticias(traduccion.TraductorPrueba())
+    if traduccion.disponible():
+        return traduccion.TraductorNoticias(traduccion.TraductorLocal())
+    if (api_key or proveedor == "Local") and not BACKEND_URL:
+        cliente = generacion.crear_cliente(proveedor, api_key, base_url)
+        return traduccion.TraductorNoticias(traduccion.TraductorLLM(cliente, proveedor))
+    return None
+
+@st.cache_resource
+def obtener_procesador() -> ProcesadorNoticias:
+    """
+    Limpieza de HTML, palabras clave y hashtags; los lotes grandes van a un pool de procesos
+    """
+    return ProcesadorNoticias()
+
+@st.cache_resource
+def obtener_exportador() -> Optional["corpus.ExportadorParquet"]:
+    """
+    Corpus de noticias y posts en Parquet (requiere pyarrow)
+    """
+    return corpus.ExportadorParquet() if corpus.disponible() else None
+
+def procesar_noticias(noticias: List[Dict]) -> List[Dict]:
+    """
+    Limpia el HTML de las noticias, añade sus palabras clave y hashtags y las
+    encola en el corpus
+    """
+    if not noticias:
+        return noticias
     try:
-        prompt = f"""
-        Eres un experto en marketing digital y redes sociales. Tu tarea es crear un post atractivo para LinkedIn basado en la siguiente noticia.
-
-        NOTICIA:
-        Título: {noticia['title']}
-        Descripción: {noticia['description']}
-        Contenido: {noticia['content']}
-
-        INSTRUCCIONES:
-        - Estilo: {estilo}
-        - Tono: {tono}
-        - Longitud: {longitud}
-        - Incluye hashtags relevantes
-        - Haz que sea atractivo y profesional
-        - Agrega una pregunta al final para generar engagement
-        - No incluyas enlaces en el texto
-
-        Genera solo el texto del post, sin comillas ni explicaciones adicionales.
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Eres un experto creador de contenido para LinkedIn."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+        noticias = obtener_procesador().procesar(noticias)
+    except Exception as e:
+        st.warning(f"⚠️ No se pudo limpiar el texto de las noticias: {str(e)}")
+        return noticias
+    exportador = obtener_exportador()
+    if exportador:
+        try:
+            exportador.agregar_noticias(noticias)
+        except Exception as e:
+            st.warning(f"⚠️ No se pudieron guardar las noticias en el corpus: {str(e)}")
+    return noticias
+
+def traducir_noticias(noticias: List[Dict], traductor: Optional["traduccion.TraductorNoticias"]) -> List[Dict]:
+    """
+    Traduce título y descripción de las noticias en otro idioma antes de mostrarlas o indexarlas
+    """
+    if not noticias or traductor is None:
+        return noticias
+    with st.spinner("🌐 Traduciendo noticias..."):
+        return traductor.traducir_noticias(noticias)
+
+def eliminar_duplicados(noticias: List[Dict]) -> List[Dict]:
+    """
+    Elimina noticias repetidas conservando la primera aparición
+    """
+    vistas = set()
+    unicas = []
+    for noticia in noticias:
+        clave = noticia.get('url') or noticia.get('title')
+        if clave not in vistas:
+            vistas.add(clave)
+            unicas.append(noticia)
+    return unicas
+
+@st.fragment
+def mostrar_temas():
+    """
+    Agrupa los resultados actuales por temas usando los embeddings
+    """
+    with st.expander("🗂️ Agrupar por temas"):
+        if st.button("Calcular temas", key="calcular_temas", use_container_width=True):
+            with st.spinner("🧠 Agrupando noticias..."):
+                st.session_state.temas = obtener_indice_semantico().agrupar(st.session_state.noticias)
         
-        return response.choices[0].message.content.strip()
+        for grupo in st.session_state.get('temas', []):
+            st.markdown(f"**{grupo['etiqueta']}** ({len(grupo['noticias'])})")
+            for noticia in grupo['noticias'][:5]:
+                st.caption(f"• {noticia['title'][:80]}")
+
+def elegir_variante(indice: int) -> None:
+    """
+    Callback que convierte una de las versiones en el post a editar
+    """
+    st.session_state.post_generado = st.session_state.variantes[indice]
+    st.session_state.post_id = st.session_state.variantes_ids[indice]
+    st.session_state.pop('variantes', None)
+
+def mostrar_variantes():
+    """
+    Muestra las versiones generadas una junto a otra
+    """
+    st.markdown("---")
+    st.markdown("### 🆚 Compara las versiones")
     
-    except Exception as e:
-        st.error(f"Error al generar post con OpenAI: {str(e)}")
-        return ""
+    variantes = st.session_state.variantes
+    for i, (columna, variante) in enumerate(zip(st.columns(len(variantes)), variantes)):
+        with columna:
+            st.caption(f"Versión {i + 1} · {len(variante.split())} palabras")
+            st.markdown(variante)
+            st.button("✅ Usar esta", key=f"variante_{i}", use_container_width=True,
+                      on_click=elegir_variante, args=(i,))
 
-def generar_post_groq(client, noticia: Dict, estilo: str, tono: str, longitud: str) -> str:
+def guardar_edicion(post_editado: str) -> None:
     """
-    Genera un post de LinkedIn usando Groq
+    Guarda en el historial la versión editada del post, si difiere de la generada
+    """
+    if post_editado == st.session_state.post_generado or post_editado == st.session_state.get('ultima_edicion'):
+        return
+    
+    obtener_historial().registrar(
+        post_editado,
+        st.session_state.get('noticia_seleccionada'),
+        tipo="editado",
+        post_origen=st.session_state.get('post_id'),
+        **st.session_state.get('config_post', {})
+    )
+    st.session_state.ultima_edicion = post_editado
+
+@st.cache_resource
+def obtener_historial() -> HistorialPosts:
     """
+    Historial de posts compartido por todas las sesiones; de él se aprenden
+    los tokens por palabra del presupuesto de generación
+    """
+    historial = HistorialPosts()
+    PRESUPUESTO.conectar(historial)
+    return historial
+
+@st.fragment
+def mostrar_historial():
+    """
+    Búsqueda y exportación del historial de posts
+    """
+    with st.expander("📚 Historial de posts"):
+        historial = obtener_historial()
+        consulta = st.text_input("Buscar en el historial:", placeholder="Ej: inteligencia artificial banca")
+        
+        resultados = historial.buscar(consulta, 20) if consulta.strip() else historial.recientes(20)
+        if not resultados:
+            st.caption("No hay posts que coincidan.")
+        
+        for post in resultados:
+            st.markdown(f"**{post['titulo_noticia'] or 'Sin noticia'}**")
+            st.caption(f"📅 {post['creado']} · {post['tipo']} · {post['proveedor'] or '-'} · {post['estilo'] or '-'}")
+            st.text(post['texto'][:300] + ("..." if len(post['texto']) > 300 else ""))
+        
+        col_csv, col_md = st.columns(2)
+        with col_csv:
+            st.download_button(
+                "⬇️ Exportar CSV",
+                data=historial.exportar_csv,
+                file_name=f"historial_posts_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        with col_md:
+            st.download_button(
+                "⬇️ Exportar Markdown",
+                data=historial.exportar_markdown,
+                file_name=f"historial_posts_{datetime.now().strftime('%Y%m%d')}.md",
+                mime="text/markdown",
+                use_container_width=True
+            )
+        
+        mostrar_analitica(historial)
+
+def mostrar_analitica(historial: HistorialPosts):
+    """
+    Exporta noticias y posts al corpus Parquet y muestra los informes de analitica.py
+    """
+    exportador = obtener_exportador()
+    if exportador is None:
+        st.caption("📦 Instala pyarrow para exportar el corpus a Parquet y ver la analítica.")
+        return
+    if not st.button("📦 Exportar a Parquet y analizar", use_container_width=True):
+        return
     try:
-        prompt = f"""
-        Eres un experto en marketing digital y redes sociales. Tu tarea es crear un post atractivo para LinkedIn basado en la siguiente noticia.
-
-        NOTICIA:
-        Título: {noticia['title']}
-        Descripción: {noticia['description']}
-        Contenido: {noticia['content']}
-
-        INSTRUCCIONES:
-        - Estilo: {estilo}
-        - Tono: {tono}
-        - Longitud: {longitud}
-        - Incluye hashtags relevantes
-        - Haz que sea atractivo y profesional
-        - Agrega una pregunta al final para generar engagement
-        - No incluyas enlaces en el texto
-
-        Genera solo el texto del post, sin comillas ni explicaciones adicionales.
-        """
+        noticias_nuevas = exportador.volcar()
+        posts_nuevos = exportador.exportar_posts(historial)
+        df_noticias, df_posts = exportador.leer_noticias(), exportador.leer_posts()
+    except Exception as e:
+        st.error(f"❌ Error al exportar el corpus: {str(e)}")
+        return
+    st.caption(f"📦 {noticias_nuevas} noticias y {posts_nuevos} posts nuevos · "
+               f"{len(df_noticias)} noticias y {len(df_posts)} posts en {exportador.directorio}")
+    for titulo, consulta in analitica.INFORMES.values():
+        resultado = consulta(df_noticias, df_posts)
+        st.markdown(f"**{titulo}**")
+        if resultado.empty:
+            st.caption("Sin datos todavía.")
+        else:
+            st.dataframe(resultado, use_container_width=True)
+
+def abrir_borrador(borrador: Dict) -> None:
+    """
+    Lleva un borrador programado al editor
+    """
+    st.session_state.noticia_seleccionada = {"title": borrador['titulo'], "url": borrador['url'],
+                                             "description": "", "content": ""}
+    st.session_state.post_generado = borrador['texto']
+    st.session_state.post_id = borrador.get('post_id')
+    st.session_state.pop('variantes', None)
+
+def mostrar_borradores_programados():
+    """
+    Borradores preparados por el calendario de publicación (calendario.py)
+    """
+    cola = calendario.leer_cola()
+    if not cola:
+        return
+    with st.expander(f"🗓️ Borradores programados ({len(cola)})"):
+        for borrador in cola:
+            st.markdown(f"**{borrador['nombre']}** · publicar el {borrador['publicar_en'].replace('T', ' ')}")
+            st.caption(borrador['titulo'])
+            st.text(borrador['texto'][:300] + ("..." if len(borrador['texto']) > 300 else ""))
+            st.button("✏️ Abrir en el editor", key=f"borrador_{borrador['ocurrencia']}",
+                      on_click=abrir_borrador, args=(borrador,))
+
+@st.fragment
+def mostrar_post_generado():
+    """
+    Muestra el editor del post generado.
+    Al ser un fragmento, editar el texto no vuelve a renderizar la lista de noticias.
+    """
+    st.markdown("---")
+    st.markdown("### 📝 Tu Post de LinkedIn")
+
+    # Vista previa del post con diseño similar a LinkedIn
+    with st.container():
+        st.markdown("""
+        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border-left: 4px solid #0077B5;'>
+        """, unsafe_allow_html=True)
+
+        # Área de texto editable
+        post_editado = st.text_area(
+            "✏️ Edita tu post aquí:",
+            value=st.session_state.post_generado,
+            height=250,
+            help="Puedes modificar el texto antes de copiarlo"
+        )
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # Métricas del post (una sola pasada sobre el texto)
+    metricas = analizar_post(post_editado)
+    col_metric1, col_metric2, col_metric3, col_metric4, col_metric5 = st.columns(5)
+    with col_metric1:
+        st.metric("📊 Caracteres", f"{metricas['caracteres']}/{LIMITE_CARACTERES_LINKEDIN}")
+    with col_metric2:
+        st.metric("📝 Palabras", metricas['palabras'])
+    with col_metric3:
+        st.metric("🏷️ Hashtags", metricas['hashtags'])
+    with col_metric4:
+        st.metric("📏 Líneas", metricas['lineas'])
+    with col_metric5:
+        st.metric("📖 Legibilidad", metricas['legibilidad'], help="Índice Fernández Huerta: más alto es más fácil de leer")
+    
+    for aviso in metricas['avisos']:
+        st.warning(f"⚠️ {aviso}")
+    
+    with st.expander("👀 Vista antes de \"ver más\""):
+        st.text(post_editado[:metricas['pliegue']] + ("…ver más" if metricas['pliegue'] < len(post_editado) else ""))
+
+    # Opciones de acción mejoradas
+    st.markdown("### 🎯 Acciones")
+
+    col_acc1, col_acc2, col_acc3, col_acc4 = st.columns(4)
+
+    with col_acc1:
+        if st.button("📋 Copiar Post", use_container_width=True):
+            guardar_edicion(post_editado)
+            # En una aplicación real, esto copiaría al portapapeles
+            st.success("✅ ¡Post copiado!")
+            st.balloons()
+
+    with col_acc2:
+        st.download_button(
+            "💾 Descargar",
+            data=post_editado,
+            file_name=f"linkedin_post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            mime="text/plain",
+            use_container_width=True,
+            on_click=guardar_edicion,
+            args=(post_editado,)
+        )
+
+    with col_acc3:
+        if st.button("🔄 Nuevo Post", use_container_width=True):
+            st.session_state.pop('post_generado', None)
+            st.session_state.pop('variantes', None)
+            st.rerun()
+
+    with col_acc4:
+        linkedin_url = "https://www.linkedin.com/feed/"
+        st.link_button("� Ir a LinkedIn", linkedin_url, use_container_width=True)
+
+    # Consejos para LinkedIn
+    with st.expander("💡 Consejos para LinkedIn"):
+        st.markdown("""
+        **🎯 Para maximizar el engagement:**
+        - Publica entre 8-10 AM o 12-2 PM
+        - Usa 3-5 hashtags relevantes
+        - Incluye preguntas para generar comentarios
+        - Agrega emojis para mayor atractivo visual
+        - Menciona a personas relevantes (@usuario)
+        """)
+
+def mostrar_metricas_coalescencia():
+    """
+    Muestra cuántas búsquedas idénticas simultáneas se han agrupado en una sola llamada
+    """
+    with st.expander("🔁 Búsquedas compartidas"):
+        try:
+            metricas_backend = motor_generacion.metricas() if BACKEND_URL else {}
+            estadisticas = metricas_backend["por_funcion"] if BACKEND_URL else coalescencia.estadisticas()
+            subconsultas = metricas_backend.get("subconsultas", {}) if BACKEND_URL else noticias.estadisticas_subconsultas()
+        except Exception as e:
+            st.caption(f"No disponible: {str(e)}")
+            return
         
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "Eres un experto creador de contenido para LinkedIn."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
+        if subconsultas.get("aciertos"):
+            st.caption(f"🔎 Subconsultas de Google News reutilizadas: {subconsultas['aciertos']} "
+                       f"de {subconsultas['aciertos'] + subconsultas.get('fallos', 0)}")
+        
+        if not estadisticas:
+            st.caption("Todavía no hay búsquedas.")
+            return
+        
+        st.dataframe(
+            pd.DataFrame.from_dict(estadisticas, orient="index").fillna(0).astype(int),
+            use_container_width=True
         )
+
+def mostrar_salud_fuentes():
+    """
+    Estado del cortacircuitos, tasa de error y latencias recientes de cada fuente
+    """
+    with st.expander("🚦 Salud de las fuentes"):
+        estados = obtener_estado_fuentes()
+        if not estados:
+            st.caption("Todavía no hay búsquedas.")
+            return
+        
+        tabla = pd.DataFrame.from_dict(estados, orient="index")
+        tabla.index = [NOMBRES_FUENTES.get(f, f) for f in tabla.index]
+        st.dataframe(tabla, use_container_width=True)
+
+def mostrar_diagnostico_memoria():
+    """
+    Bytes de las cachés de noticias y de las sesiones, y asignaciones de tracemalloc
+    """
+    with st.expander("🧠 Memoria"):
+        estadisticas = memoria.CACHES.estadisticas()
+        if BACKEND_URL:
+            try:
+                cache_backend = motor_generacion.metricas()["cache"]
+                estadisticas["backend"] = {"entradas": cache_backend["entradas"], "bytes": cache_backend["bytes"],
+                                           "desalojos": cache_backend.get("desalojos", 0)}
+            except Exception as e:
+                st.caption(f"Caché del backend no disponible: {str(e)}")
+        caches = pd.DataFrame.from_dict(estadisticas, orient="index")
+        if not caches.empty:
+            caches["MB"] = (caches.pop("bytes") / 2 ** 20).round(2)
+            st.dataframe(caches, use_container_width=True)
+        sesiones = memoria.SESIONES.estadisticas()
+        st.caption(f"👥 {sesiones['sesiones']} sesiones · {sesiones['bytes'] / 2 ** 20:.1f} MB en su estado · "
+                   f"{sesiones.get('desalojadas', 0)} vaciadas por inactividad")
+        
+        if not memoria.DIAGNOSTICO.activo:
+            st.button("▶️ Activar tracemalloc", on_click=memoria.DIAGNOSTICO.iniciar, use_container_width=True,
+                      help="Traza las asignaciones de memoria; ralentiza la app mientras está activo")
+            return
         
-        return response.choices[0].message.content.strip()
+        st.button("⏹️ Detener tracemalloc", on_click=memoria.DIAGNOSTICO.detener, use_container_width=True)
+        if st.button("📸 Tomar instantánea", use_container_width=True):
+            instantanea = memoria.DIAGNOSTICO.instantanea()
+            st.caption(f"Memoria trazada: {instantanea['trazada'] / 2 ** 20:.1f} MB "
+                       f"(pico {instantanea['pico'] / 2 ** 20:.1f} MB)")
+            st.markdown("**Mayores asignaciones**")
+            st.dataframe(pd.DataFrame(instantanea["mayores"]), use_container_width=True, hide_index=True)
+            if instantanea["crecimiento"]:
+                st.markdown("**Crecimiento desde la instantánea anterior**")
+                st.dataframe(pd.DataFrame(instantanea["crecimiento"]), use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def obtener_monitor_salud() -> monitor_salud.MonitorSalud:
+    """
+    Monitor de salud compartido: sondea fuentes y LLM configurados en segundo
+    plano y, con PUERTO_METRICAS, sirve /metrics para Prometheus
+    """
+    monitor = monitor_salud.MonitorSalud(monitor_salud.crear_sondas(),
+                                         float(os.getenv("INTERVALO_SALUD", "60"))).iniciar()
+    if os.getenv("PUERTO_METRICAS"):
+        servidor = monitor_salud.crear_servidor_metricas(monitor, "0.0.0.0", int(os.getenv("PUERTO_METRICAS")))
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return monitor
+
+@st.fragment(run_every=30)
+def mostrar_estado_apis(proveedor_llm: str, url_llm_local: str):
+    """
+    Último resultado y disponibilidad de cada fuente y LLM según el monitor de salud
+    """
+    estado = obtener_monitor_salud().estado()
+    opcionales = {"guardian": "GUARDIAN_API_KEY", "newsapi": "NEWSAPI_KEY"}
+    for nombre in ("google", "bbc", "guardian", "newsapi", "backend", "openai", "groq", "local"):
+        titulo = monitor_salud.NOMBRES[nombre]
+        datos = estado.get(nombre)
+        if datos is None:
+            if nombre in opcionales:
+                st.info(f"ℹ️ {titulo}: No configurada (opcional)")
+            continue
+        if datos["ok"] is None:
+            st.info(f"⏳ {titulo}: Comprobando...")
+            continue
+        disponibilidad = datos["disponibilidad_1h"]
+        detalle = f"{datos['latencia_ms']:.0f} ms · {disponibilidad:.0%} disponible (1 h)"
+        if not datos["ok"]:
+            st.error(f"❌ {titulo}: {datos['error']} · {disponibilidad:.0%} disponible (1 h)")
+        elif disponibilidad < 0.9:
+            st.warning(f"⚠️ {titulo}: Intermitente · {detalle}")
+        else:
+            st.success(f"✅ {titulo}: {detalle}")
     
-    except Exception as e:
-        st.error(f"Error al generar post con Groq: {str(e)}")
-        return ""
+    if proveedor_llm == "Local":
+        if "local" not in estado:
+            st.info(f"🖥️ LLM local: {url_llm_local}")
+    elif not any(estado.get(nombre) for nombre in ("openai", "groq")):
+        st.error("❌ LLM API: No configurada (requerida)")
+
+def registrar_actividad_sesion():
+    """
+    Marca la sesión como activa y vacía el estado de las que llevan tiempo inactivas
+    """
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        memoria.SESIONES.tocar(id_sesion(), ctx.session_state)
+    memoria.SESIONES.desalojar_inactivas()
+
+def acotar_estado_sesion():
+    """
+    Descarta lo más prescindible del estado de la sesión si supera SESION_MAX_MB
+    """
+    ctx = get_script_run_ctx()
+    if ctx is not None and memoria.SESIONES.acotar(id_sesion(), ctx.session_state):
+        st.toast("🧹 Se han descartado resultados antiguos para liberar memoria")
 
 # Función principal de la aplicación
 def main():
+    registrar_actividad_sesion()
+    
     # Título y descripción
     st.title("📰 Generador de Noticias para LinkedIn")
     st.markdown("""
@@ -378,8 +826,8 @@ def main():
         st.subheader("APIs de Noticias")
         
         # Determinar fuentes disponibles
-        guardian_available = os.getenv("GUARDIAN_API_KEY") and os.getenv("GUARDIAN_API_KEY") != "tu_guardian_key_aqui"
-        newsapi_available = os.getenv("NEWSAPI_KEY") and os.getenv("NEWSAPI_KEY") != "tu_newsapi_key_aqui"
+        guardian_available = monitor_salud.clave_configurada("GUARDIAN_API_KEY")
+        newsapi_available = monitor_salud.clave_configurada("NEWSAPI_KEY")
         
         opciones_fuente = []
         if guardian_available and newsapi_available:
@@ -458,17 +906,23 @@ def main():
         
         proveedor_llm = st.selectbox(
             "Proveedor LLM:",
-            ["OpenAI", "Groq"]
+            ["OpenAI", "Groq", "Local"],
+            help="Local usa un modelo en tu CPU a través de un servidor compatible con OpenAI (servidor_llm_local.py o llama-server)"
         )
         
+        openai_key = groq_key = ""
         if proveedor_llm == "OpenAI":
             openai_key = st.text_input("OpenAI API Key", 
                                       value=os.getenv("OPENAI_API_KEY", ""), 
                                       type="password")
-        else:
+        elif proveedor_llm == "Groq":
             groq_key = st.text_input("Groq API Key", 
                                     value=os.getenv("GROQ_API_KEY", ""), 
                                     type="password")
+        else:
+            url_llm_local = st.text_input("URL del servidor local",
+                                         value=generacion.URL_LOCAL,
+                                         help="Sin red ni modelo: python servidor_llm_local.py --eco")
         
         # Configuración de estilo
         st.subheader("Personalización del Contenido")
@@ -490,43 +944,56 @@ def main():
         
         num_articulos = st.slider("Número de noticias a obtener:", 5, 20, 10)
         
-        # Estado de las API keys
-        st.subheader("📊 Estado de APIs")
+        busqueda_semantica = False
+        if semantica.disponible():
+            busqueda_semantica = st.checkbox(
+                "🧠 Búsqueda semántica",
+                help="Ordena los resultados por similitud de significado (funciona entre idiomas) y permite agruparlos por temas"
+            )
         
-        # Fuentes gratuitas siempre disponibles
-        st.success("✅ Google News: Disponible (gratuito, sin API)")
-        st.success("✅ BBC RSS: Disponible (gratuito, sin API)")
+        # Con backend compartido no hay forma de cancelar la generación en su cola:
+        # cada especulación descartada ocuparía un hueco de las peticiones reales
+        generacion_especulativa = st.checkbox(
+            "⚡ Generación especulativa",
+            disabled=bool(BACKEND_URL),
+            help="Empieza a generar el post al seleccionar la noticia; se cancela si cambias la noticia o la configuración"
+                 + (" (no disponible con backend compartido)" if BACKEND_URL else "")
+        ) and not BACKEND_URL
+        if generacion_especulativa:
+            estadisticas_especulacion = obtener_especulador().estadisticas()
+            if estadisticas_especulacion.get("tasa_acierto") is not None:
+                st.caption(f"Aciertos: {estadisticas_especulacion['tasa_acierto']:.0%} · "
+                           f"tokens desperdiciados: {estadisticas_especulacion.get('tokens_desperdiciados', 0)}")
         
-        # Verificar Guardian API
-        guardian_configured = os.getenv("GUARDIAN_API_KEY") and os.getenv("GUARDIAN_API_KEY") != "tu_guardian_key_aqui"
-        if guardian_configured:
-            st.success("✅ Guardian API: Activa")
-        else:
-            st.info("ℹ️ Guardian API: No configurada (opcional)")
-            
-        # Verificar NewsAPI
-        newsapi_configured = os.getenv("NEWSAPI_KEY") and os.getenv("NEWSAPI_KEY") != "tu_newsapi_key_aqui"
-        if newsapi_configured:
-            st.success("✅ NewsAPI: Activa")
-        else:
-            st.info("ℹ️ NewsAPI: No configurada (opcional)")
-            
-        # Verificar LLM APIs
-        openai_configured = os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_KEY") != "tu_openai_api_key_aqui"
-        groq_configured = os.getenv("GROQ_API_KEY") and os.getenv("GROQ_API_KEY") != "tu_groq_api_key_aqui"
-        
-        if openai_configured:
-            st.success("✅ OpenAI API: Activa")
-        elif groq_configured:
-            st.success("✅ Groq API: Activa")
-        else:
-            st.error("❌ LLM API: No configurada (requerida)")
+        modo_estructurado = st.checkbox(
+            "🧩 Salida estructurada (JSON)",
+            help="El modelo devuelve gancho, cuerpo, llamada a la acción y hashtags por separado y el post se monta después; "
+                 "las respuestas inválidas se reparan sin regenerar el post"
+        )
+        
+        traductor = None
+        if st.checkbox("🌐 Traducir noticias al español",
+                       help="Traduce una sola vez el título y la descripción de las noticias en otro idioma (con caché)"):
+            traductor = obtener_traductor_noticias(proveedor_llm, openai_key or groq_key,
+                                                   url_llm_local if proveedor_llm == "Local" else None)
+            if traductor is None:
+                st.info("ℹ️ Instala transformers o configura la API del LLM para traducir.")
+        
+        # Estado de las APIs según el monitor de salud
+        st.subheader("📊 Estado de APIs")
+        mostrar_estado_apis(proveedor_llm, url_llm_local if proveedor_llm == "Local" else "")
+        openai_configured = monitor_salud.clave_configurada("OPENAI_API_KEY")
+        groq_configured = monitor_salud.clave_configurada("GROQ_API_KEY")
         
         # Recomendación basada en configuración
         if (openai_configured or groq_configured):
             st.success("🎉 ¡Configuración perfecta! Usa Google News para las mejores noticias.")
         else:
             st.warning("⚠️ Configura una API de LLM (Groq recomendado) para generar posts.")
+        
+        mostrar_metricas_coalescencia()
+        mostrar_salud_fuentes()
+        mostrar_diagnostico_memoria()
     
     # Contenido principal
     col1, col2 = st.columns([1, 2])
@@ -555,39 +1022,63 @@ def main():
             st.session_state.prompt_busqueda = prompt_busqueda
             noticias = []
             
+            # Fuentes que participan en la búsqueda según la selección y las keys configuradas
+            fuentes_busqueda = []
+            if fuente_noticias in ["Google News", "Todas", "Todas las gratuitas"]:
+                fuentes_busqueda.append("google")
+            if fuente_noticias in ["The Guardian", "Todas", "Todas las gratuitas"] and 'guardian_key' in locals() and guardian_key and guardian_key.strip() and guardian_key != "tu_guardian_key_aqui":
+                fuentes_busqueda.append("guardian")
+            if fuente_noticias in ["BBC RSS", "Todas", "Todas las gratuitas"]:
+                fuentes_busqueda.append("bbc")
+            if fuente_noticias in ["NewsAPI", "Todas"] and 'newsapi_key' in locals() and newsapi_key and newsapi_key.strip() and newsapi_key != "tu_newsapi_key_aqui":
+                fuentes_busqueda.append("newsapi")
+            
+            # Las fuentes con el circuito abierto no se consultan y su parte pasa a las que funcionan
+            reparto = circuitos.repartir(num_articulos, fuentes_busqueda, obtener_estado_fuentes())
+            desactivadas = [NOMBRES_FUENTES[f] for f in fuentes_busqueda if not reparto[f]]
+            if desactivadas:
+                st.info(f"⏸️ Fuentes desactivadas temporalmente por fallos recientes: {', '.join(desactivadas)}")
+            
             with st.spinner("🔍 Buscando noticias relevantes..."):
                 # Google News (siempre disponible)
-                if fuente_noticias in ["Google News", "Todas", "Todas las gratuitas"]:
+                if reparto.get("google"):
                     st.info("🔍 Buscando en Google News...")
                     idioma = idioma_google if 'idioma_google' in locals() else 'es'
-                    noticias_google = obtener_noticias_google(prompt_busqueda, 
-                                                            num_articulos//3 if "Todas" in fuente_noticias else num_articulos, 
-                                                            idioma)
+                    noticias_google = obtener_noticias_google(prompt_busqueda, reparto["google"], idioma)
                     noticias.extend(noticias_google)
                 
                 # The Guardian API
-                if fuente_noticias in ["The Guardian", "Todas", "Todas las gratuitas"] and 'guardian_key' in locals() and guardian_key and guardian_key.strip() and guardian_key != "tu_guardian_key_aqui":
+                if reparto.get("guardian"):
                     try:
-                        noticias_guardian = buscar_noticias_guardian_personalizada(guardian_key, prompt_busqueda, 
-                                                                                 num_articulos//3 if "Todas" in fuente_noticias else num_articulos)
+                        noticias_guardian = buscar_noticias_guardian_personalizada(guardian_key, prompt_busqueda, reparto["guardian"])
                         noticias.extend(noticias_guardian)
                     except Exception as e:
                         st.warning("⚠️ Error con The Guardian API.")
                 
                 # BBC RSS (backup gratuito)
-                if fuente_noticias in ["BBC RSS", "Todas", "Todas las gratuitas"]:
-                    noticias_rss = obtener_noticias_rss_bbc(prompt_busqueda, 
-                                                          num_articulos//3 if "Todas" in fuente_noticias else num_articulos)
+                if reparto.get("bbc"):
+                    noticias_rss = obtener_noticias_rss_bbc(prompt_busqueda, reparto["bbc"])
                     noticias.extend(noticias_rss)
                 
                 # NewsAPI (si está configurada)
-                if fuente_noticias in ["NewsAPI", "Todas"] and 'newsapi_key' in locals() and newsapi_key and newsapi_key.strip() and newsapi_key != "tu_newsapi_key_aqui":
-                    noticias_newsapi = buscar_noticias_newsapi_personalizada(newsapi_key, prompt_busqueda, 
-                                                                           num_articulos//3 if fuente_noticias == "Todas" else num_articulos)
+                if reparto.get("newsapi"):
+                    noticias_newsapi = buscar_noticias_newsapi_personalizada(newsapi_key, prompt_busqueda, reparto["newsapi"])
                     noticias.extend(noticias_newsapi)
             
+            noticias = traducir_noticias(procesar_noticias(noticias), traductor)
+            
+            if noticias and busqueda_semantica:
+                with st.spinner("🧠 Ordenando por relevancia semántica..."):
+                    indice = obtener_indice_semantico()
+                    # Incluye noticias ya ingeridas en búsquedas anteriores
+                    relacionadas = indice.buscar(prompt_busqueda, num_articulos)
+                    noticias = indice.ordenar_por_relevancia(prompt_busqueda, eliminar_duplicados(noticias + relacionadas))
+            
             if noticias:
                 st.session_state.noticias = noticias
+                st.session_state.pagina_noticias = 0
+                st.session_state.pop('temas', None)
+                precargar_miniaturas(noticias)
                 st.success(f"✅ {len(noticias)} noticias encontradas sobre: '{prompt_busqueda[:50]}...'")
             else:
                 # Verificar qué APIs están disponibles para dar mejor feedback
@@ -612,17 +1103,24 @@ def main():
                 noticias_trending = obtener_noticias_google_trending(num_articulos, idioma)
                 noticias.extend(noticias_trending)
                 
-                # También obtener de otras fuentes si están disponibles
-                if fuente_noticias in ["NewsAPI", "Todas"] and 'newsapi_key' in locals() and newsapi_key and newsapi_key.strip() and newsapi_key != "tu_newsapi_key_aqui":
+                # También obtener de otras fuentes si están disponibles y su circuito no está abierto
+                estados = obtener_estado_fuentes()
+                abiertas = {f for f, e in estados.items() if e.get("estado") == circuitos.ABIERTO}
+                if fuente_noticias in ["NewsAPI", "Todas"] and "newsapi" not in abiertas and 'newsapi_key' in locals() and newsapi_key and newsapi_key.strip() and newsapi_key != "tu_newsapi_key_aqui":
                     noticias_newsapi = obtener_noticias_newsapi(newsapi_key, categoria_news, pais_news, num_articulos//3)
                     noticias.extend(noticias_newsapi)
                 
-                if fuente_noticias in ["The Guardian", "Todas", "Todas las gratuitas"] and 'guardian_key' in locals() and guardian_key and guardian_key.strip() and guardian_key != "tu_guardian_key_aqui":
+                if fuente_noticias in ["The Guardian", "Todas", "Todas las gratuitas"] and "guardian" not in abiertas and 'guardian_key' in locals() and guardian_key and guardian_key.strip() and guardian_key != "tu_guardian_key_aqui":
                     noticias_guardian = obtener_noticias_guardian(guardian_key, seccion_guardian, num_articulos//3)
                     noticias.extend(noticias_guardian)
             
+            noticias = traducir_noticias(procesar_noticias(noticias), traductor)
+            
             if noticias:
                 st.session_state.noticias = noticias
+                st.session_state.pagina_noticias = 0
+                st.session_state.pop('temas', None)
+                precargar_miniaturas(noticias)
                 st.success(f"✅ {len(noticias)} noticias generales obtenidas")
             else:
                 # Verificar qué APIs están disponibles
@@ -649,15 +1147,10 @@ def main():
             elif st.session_state.get('modo_busqueda') == "trending":
                 st.info("🔥 Mostrando noticias trending de Google News")
             
-            for i, noticia in enumerate(st.session_state.noticias):
-                with st.expander(f"📰 {noticia['title'][:45]}..."):
-                    st.write(f"**Descripción:** {noticia['description'][:150]}...")
-                    if noticia.get('urlToImage'):
-                        st.image(noticia['urlToImage'], width=180)
-                    
-                    if st.button(f"✨ Seleccionar esta noticia", key=f"btn_{i}", use_container_width=True):
-                        st.session_state.noticia_seleccionada = noticia
-                        st.success("✅ Noticia seleccionada")
+            if busqueda_semantica:
+                mostrar_temas()
+            
+            mostrar_noticias_paginadas()
     
     with col2:
         st.header("✨ Generador de Posts LinkedIn")
@@ -673,7 +1166,7 @@ def main():
                 
                 with col_img:
                     if noticia.get('urlToImage'):
-                        st.image(noticia['urlToImage'], width=150)
+                        mostrar_miniatura(noticia['urlToImage'], 150, descargar=True)
                 
                 with col_text:
                     st.markdown(f"**{noticia['title']}**")
@@ -692,6 +1185,12 @@ def main():
             elif proveedor_llm == "Groq" and 'groq_key' in locals() and groq_key:
                 client = Groq(api_key=groq_key)
                 llm_configurado = True
+            elif proveedor_llm == "Local" and not BACKEND_URL:
+                client = generacion.crear_cliente("Local", base_url=url_llm_local)
+                llm_configurado = True
+            elif BACKEND_URL:
+                # El backend compartido aporta sus propias API keys del LLM
+                llm_configurado = True
             
             if llm_configurado:
                 # Mostrar configuración actual
@@ -705,90 +1204,85 @@ def main():
                 
                 st.markdown("### 🚀 Generar Publicación")
                 
+                num_variantes = st.select_slider(
+                    "Versiones a comparar:",
+                    options=[1, 2, 3],
+                    value=1,
+                    help="Genera varias versiones en una sola petición al LLM"
+                )
+                
+                # La especulación solo cubre el post único en texto libre con un cliente del LLM de esta sesión o del backend
+                if generacion_especulativa and num_variantes == 1 and not modo_estructurado:
+                    especular_post(client, proveedor_llm, noticia, estilo, tono, longitud)
+                else:
+                    descartar_especulacion()
+                
                 if st.button("🤖 Crear Post de LinkedIn", type="primary", use_container_width=True):
                     with st.spinner("🧠 Generando contenido optimizado para LinkedIn..."):
-                        if proveedor_llm == "OpenAI":
-                            post_generado = generar_post_openai(client, noticia, estilo, tono, longitud)
+                        metricas = {}
+                        config_post = {"estilo": estilo, "tono": tono, "longitud": longitud, "proveedor": proveedor_llm}
+                        st.session_state.config_post = config_post
+                        
+                        if num_variantes > 1:
+                            if proveedor_llm == "OpenAI":
+                                variantes = generar_variantes_openai(client, noticia, estilo, tono, longitud, num_variantes, metricas)
+                            elif proveedor_llm == "Local":
+                                variantes = generar_variantes_local(client, noticia, estilo, tono, longitud, num_variantes, metricas)
+                            else:
+                                variantes = generar_variantes_groq(client, noticia, estilo, tono, longitud, num_variantes, metricas)
+                            
+                            if variantes:
+                                st.session_state.variantes = variantes
+                                st.session_state.variantes_ids = [
+                                    obtener_historial().registrar(variante, noticia, metricas=metricas, **config_post)
+                                    for variante in variantes
+                                ]
+                                st.session_state.pop('post_generado', None)
+                                st.success(f"✅ ¡{len(variantes)} versiones generadas!")
                         else:
-                            post_generado = generar_post_groq(client, noticia, estilo, tono, longitud)
+                            post_generado = None
+                            especulacion = st.session_state.get('especulacion')
+                            if modo_estructurado:
+                                partes_post = generar_post_estructurado(client, proveedor_llm, noticia, estilo, tono, longitud, metricas)
+                                post_generado = partes_post.get('texto')
+                            elif generacion_especulativa:
+                                if especulacion is not None and not especulacion.usada and especulacion.clave == clave_especulacion(proveedor_llm, noticia, estilo, tono, longitud):
+                                    post_generado = obtener_especulador().usar(especulacion, metricas)
+                                else:
+                                    obtener_especulador().fallo()
+                            
+                            if not post_generado and not modo_estructurado:
+                                if proveedor_llm == "OpenAI":
+                                    post_generado = generar_post_openai(client, noticia, estilo, tono, longitud, metricas)
+                                elif proveedor_llm == "Local":
+                                    post_generado = generar_post_local(client, noticia, estilo, tono, longitud, metricas)
+                                else:
+                                    post_generado = generar_post_groq(client, noticia, estilo, tono, longitud, metricas)
+                            
+                            if post_generado:
+                                st.session_state.post_generado = post_generado
+                                st.session_state.post_id = obtener_historial().registrar(post_generado, noticia, metricas=metricas, **config_post)
+                                st.session_state.pop('variantes', None)
+                                st.success("✅ ¡Post generado exitosamente!")
+                        
+                        GRABADOR.generacion(config_post, num_variantes, metricas,
+                                            especulativa=generacion_especulativa, estructurada=modo_estructurado)
                         
-                        if post_generado:
-                            st.session_state.post_generado = post_generado
-                            st.success("✅ ¡Post generado exitosamente!")
+                        ratio = generacion.ratio_cache([metricas])
+                        if ratio is not None:
+                            st.caption(f"⚡ {ratio:.0%} del prompt servido desde la caché del proveedor")
+                        if metricas.get('parada_temprana'):
+                            st.caption("✂️ Generación detenida al final de frase al alcanzar la longitud elegida")
+                        if metricas.get('reparaciones'):
+                            st.caption("🩹 La respuesta JSON se reparó pidiendo solo los campos que faltaban")
+
+                # Mostrar versiones para comparar
+                if 'variantes' in st.session_state:
+                    mostrar_variantes()
                 
                 # Mostrar post generado
                 if 'post_generado' in st.session_state:
-                    st.markdown("---")
-                    st.markdown("### 📝 Tu Post de LinkedIn")
-                    
-                    # Vista previa del post con diseño similar a LinkedIn
-                    with st.container():
-                        st.markdown("""
-                        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border-left: 4px solid #0077B5;'>
-                        """, unsafe_allow_html=True)
-                        
-                        # Área de texto editable
-                        post_editado = st.text_area(
-                            "✏️ Edita tu post aquí:",
-                            value=st.session_state.post_generado,
-                            height=250,
-                            help="Puedes modificar el texto antes de copiarlo"
-                        )
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Métricas del post
-                    col_metric1, col_metric2, col_metric3, col_metric4 = st.columns(4)
-                    with col_metric1:
-                        st.metric("📊 Caracteres", len(post_editado))
-                    with col_metric2:
-                        st.metric("📝 Palabras", len(post_editado.split()))
-                    with col_metric3:
-                        hashtags_count = len([palabra for palabra in post_editado.split() if palabra.startswith('#')])
-                        st.metric("🏷️ Hashtags", hashtags_count)
-                    with col_metric4:
-                        lineas = len(post_editado.split('\n'))
-                        st.metric("📏 Líneas", lineas)
-                    
-                    # Opciones de acción mejoradas
-                    st.markdown("### 🎯 Acciones")
-                    
-                    col_acc1, col_acc2, col_acc3, col_acc4 = st.columns(4)
-                    
-                    with col_acc1:
-                        if st.button("📋 Copiar Post", use_container_width=True):
-                            # En una aplicación real, esto copiaría al portapapeles
-                            st.success("✅ ¡Post copiado!")
-                            st.balloons()
-                    
-                    with col_acc2:
-                        st.download_button(
-                            "💾 Descargar",
-                            data=post_editado,
-                            file_name=f"linkedin_post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                            mime="text/plain",
-                            use_container_width=True
-                        )
-                    
-                    with col_acc3:
-                        if st.button("🔄 Nuevo Post", use_container_width=True):
-                            st.session_state.pop('post_generado', None)
-                            st.rerun()
-                    
-                    with col_acc4:
-                        linkedin_url = "https://www.linkedin.com/feed/"
-                        st.link_button("� Ir a LinkedIn", linkedin_url, use_container_width=True)
-                    
-                    # Consejos para LinkedIn
-                    with st.expander("💡 Consejos para LinkedIn"):
-                        st.markdown("""
-                        **🎯 Para maximizar el engagement:**
-                        - Publica entre 8-10 AM o 12-2 PM
-                        - Usa 3-5 hashtags relevantes
-                        - Incluye preguntas para generar comentarios
-                        - Agrega emojis para mayor atractivo visual
-                        - Menciona a personas relevantes (@usuario)
-                        """)
+                    mostrar_post_generado()
             
             else:
                 st.warning("⚠️ Por favor, configura tu API key del LLM en el sidebar.")
@@ -859,6 +1353,10 @@ def main():
             st.success("🚀 **Nuevo:** Ahora con Google News integrado para las noticias más relevantes y actuales")
             st.info("👈 ¡Comienza escribiendo tu búsqueda o prueba las noticias trending de Google!")
     
+    mostrar_borradores_programados()
+    mostrar_historial()
+    acotar_estado_sesion()
+    
     # Footer
     st.markdown("---")
     st.markdown(
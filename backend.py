@@ -0,0 +1,226 @@
+"""
+Backend compartido para el modo multiusuario.
+
+Centraliza las búsquedas de noticias, su caché y la cola de generación de
+posts, de modo que las sesiones de Streamlit actúan como clientes ligeros.
+Las búsquedas idénticas que llegan a la vez comparten una única llamada a la
+fuente.
+
+Uso:
+    python backend.py --puerto 8700 --max-generaciones 4
+    BACKEND_URL=http://127.0.0.1:8700 streamlit run app.py
+"""
+
+import argparse
+import inspect
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+import generacion
+import noticias
+import memoria
+from coalescencia import SingleFlight
+from consultas import CacheConsultas
+from monitor_salud import MonitorSalud, crear_sondas, responder_metricas
+
+# Funciones de noticias que expone el backend y la variable de entorno de su API key
+FUNCIONES_NOTICIAS = {
+    "obtener_noticias_newsapi": "NEWSAPI_KEY",
+    "obtener_noticias_guardian": "GUARDIAN_API_KEY",
+    "obtener_noticias_google": None,
+    "obtener_noticias_google_trending": None,
+    "obtener_noticias_rss_bbc": None,
+    "buscar_noticias_guardian_personalizada": "GUARDIAN_API_KEY",
+    "buscar_noticias_newsapi_personalizada": "NEWSAPI_KEY",
+}
+
+
+# Campos obligatorios del cuerpo de cada tipo de generación
+CAMPOS_GENERACION = ("proveedor", "noticia", "estilo", "tono", "longitud")
+
+
+class PeticionInvalida(ValueError):
+    """Cuerpo de la petición incompleto o con valores no admitidos (HTTP 400)"""
+
+
+class Backend:
+    """Fetchers, caché y cola de generación compartidos por todas las sesiones"""
+
+    def __init__(self, ttl: float = 3600, max_generaciones: int = 4,
+                 fuentes: Optional[Dict[str, Callable[..., List[Dict]]]] = None,
+                 motor_generacion=generacion, max_entradas: int = memoria.MAX_ENTRADAS_CACHE,
+                 max_bytes: int = memoria.MAX_BYTES_CACHE):
+        self.ttl = ttl
+        self.fuentes = fuentes or {nombre: getattr(noticias, nombre) for nombre in FUNCIONES_NOTICIAS}
+        self.motor_generacion = motor_generacion
+        self.metricas = Counter()
+        # LRU acotada: la instancia compartida no se reinicia y cada consulta distinta es una entrada
+        self._cache = CacheConsultas(ttl, max_entradas, max_bytes)
+        self._vuelos = SingleFlight()
+        self._lock = threading.Lock()
+        self._clientes: Dict[str, object] = {}
+        self._cola_generacion = ThreadPoolExecutor(max_workers=max_generaciones, thread_name_prefix="generacion")
+
+    def buscar(self, funcion: str, argumentos: Dict) -> List[Dict]:
+        """
+        Ejecuta una función de noticias con caché y coalescencia de peticiones
+        """
+        if funcion not in self.fuentes:
+            raise KeyError(f"Función de noticias desconocida: {funcion}")
+
+        # La API key la pone el backend; nunca forma parte de la clave de caché
+        argumentos = {k: v for k, v in argumentos.items() if k != "api_key"}
+        try:
+            inspect.signature(self.fuentes[funcion]).bind(**argumentos)
+        except TypeError as e:
+            raise PeticionInvalida(f"Argumentos no válidos para {funcion}: {e}")
+        clave = (funcion, tuple(sorted(argumentos.items())))
+
+        with self._lock:
+            self.metricas["busquedas"] += 1
+        guardado = self._cache.obtener(clave)
+        if guardado is not None:
+            with self._lock:
+                self.metricas["aciertos_cache"] += 1
+            return guardado
+
+        variable_key = FUNCIONES_NOTICIAS.get(funcion)
+        if variable_key:
+            argumentos = dict(argumentos, api_key=os.getenv(variable_key, ""))
+
+        return self._vuelos.ejecutar(funcion, clave, self._consultar_fuente, funcion, clave, argumentos)
+
+    def _consultar_fuente(self, funcion: str, clave: tuple, argumentos: Dict) -> List[Dict]:
+        resultado = self.fuentes[funcion](**argumentos)
+        self._cache.guardar(clave, resultado)
+        return resultado
+
+    def resumen_metricas(self) -> Dict:
+        """Métricas del backend más llamadas reales y coalescidas por función"""
+        with self._lock:
+            resumen = dict(self.metricas)
+        vuelos = self._vuelos.estadisticas()
+        resumen["llamadas_fuente"] = sum(e.get("llamadas", 0) for e in vuelos.values())
+        resumen["coalescidas"] = sum(e.get("coalescidas", 0) for e in vuelos.values())
+        resumen["errores_fuente"] = sum(e.get("errores", 0) for e in vuelos.values())
+        resumen["por_funcion"] = vuelos
+        resumen["subconsultas"] = noticias.estadisticas_subconsultas()
+        resumen["cache"] = self._cache.estadisticas()
+        return resumen
+
+    def _cliente(self, proveedor: str):
+        if proveedor not in self._clientes:
+            self._clientes[proveedor] = self.motor_generacion.crear_cliente(proveedor)
+        return self._clientes[proveedor]
+
+    def generar(self, tipo: str, datos: Dict) -> Dict:
+        """Encola una generación y espera su resultado"""
+        faltan = [c for c in CAMPOS_GENERACION + (("num_variantes",) if tipo == "variantes" else ()) if c not in datos]
+        if faltan:
+            raise PeticionInvalida(f"Faltan campos: {', '.join(faltan)}")
+        modelos = getattr(self.motor_generacion, "MODELOS", None)
+        if modelos is not None and datos["proveedor"] not in modelos:
+            raise PeticionInvalida(f"Proveedor desconocido: {datos['proveedor']}")
+
+        def tarea():
+            metricas = {}
+            cliente = self._cliente(datos["proveedor"])
+            argumentos = (cliente, datos["proveedor"], datos["noticia"], datos["estilo"], datos["tono"], datos["longitud"])
+            if tipo == "variantes":
+                resultado = self.motor_generacion.generar_variantes(*argumentos, datos["num_variantes"], metricas)
+            elif tipo == "estructurado":
+                resultado = self.motor_generacion.generar_post_estructurado(*argumentos, metricas)
+            else:
+                resultado = self.motor_generacion.generar_post(*argumentos, metricas)
+            return {"resultado": resultado, "metricas": metricas}
+
+        with self._lock:
+            self.metricas["generaciones"] += 1
+        return self._cola_generacion.submit(tarea).result()
+
+
+class ServidorHTTP(ThreadingHTTPServer):
+    """Servidor con hilos y una cola de conexiones acorde a un pico de usuarios"""
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def crear_servidor(backend: Backend, host: str = "127.0.0.1", puerto: int = 8700,
+                   monitor: Optional[MonitorSalud] = None) -> ServidorHTTP:
+    """Servidor HTTP con JSON sobre el backend (y /metrics de Prometheus si hay monitor de salud)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, estado: int, cuerpo) -> None:
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            if self.path == "/metricas":
+                return self._responder(200, backend.resumen_metricas())
+            if self.path == "/fuentes":
+                return self._responder(200, noticias.estado_fuentes())
+            if self.path == "/salud":
+                return self._responder(200, {"estado": "ok"})
+            if self.path == "/metrics" and monitor is not None:
+                return responder_metricas(self, monitor)
+            self._responder(404, {"error": "No encontrado"})
+
+        def do_POST(self):
+            try:
+                partes = self.path.strip("/").split("/")
+                if partes[0] == "noticias" and len(partes) == 2 and partes[1] in backend.fuentes:
+                    tipo = None
+                elif partes[0] in ("generar", "variantes", "estructurado") and len(partes) == 1:
+                    tipo = partes[0]
+                else:
+                    return self._responder(404, {"error": "No encontrado"})
+                datos = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(datos, dict):
+                    raise PeticionInvalida("El cuerpo debe ser un objeto JSON")
+                if tipo is None:
+                    return self._responder(200, backend.buscar(partes[1], datos))
+                self._responder(200, backend.generar(tipo, datos))
+            except (PeticionInvalida, json.JSONDecodeError) as e:
+                self._responder(400, {"error": str(e)})
+            except Exception as e:
+                self._responder(502, {"error": str(e)})
+
+    return ServidorHTTP((host, puerto), Handler)
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Backend compartido del generador de noticias")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8700)
+    parser.add_argument("--ttl", type=float, default=3600, help="Segundos de caché de las búsquedas")
+    parser.add_argument("--max-generaciones", type=int, default=4, help="Generaciones simultáneas")
+    parser.add_argument("--intervalo-salud", type=float, default=60, help="Segundos entre comprobaciones de salud")
+    args = parser.parse_args()
+
+    monitor = MonitorSalud(crear_sondas(), args.intervalo_salud).iniciar()
+    servidor = crear_servidor(Backend(args.ttl, args.max_generaciones), args.host, args.puerto, monitor)
+    print(f"🚀 Backend escuchando en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Calendario de publicación con generación anticipada de borradores.
+
+Lee un plan semanal (la sección "Flujo de Trabajo Semanal" de
+GUIA_USO_SEMANAL.md o un JSON con la misma información) y, con antelación a
+cada hora de publicación, busca noticias del tema y genera un borrador que
+queda en cola. Las preparaciones se escalonan para no agotar a la vez las
+cuotas de noticias y del LLM, se registra la duración de cada ejecución y al
+arrancar se recuperan las preparaciones que no llegaron a ejecutarse.
+
+Uso:
+    python calendario.py --proveedor Groq
+    python calendario.py --plan plan.json --antelacion 6
+    python calendario.py --cola     # muestra los borradores listos
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+import schedule
+from dotenv import load_dotenv
+
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+DIAS_SCHEDULE = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Longitudes abreviadas de la guía y su opción equivalente en la app
+LONGITUDES = {
+    "corto": "Corto (100-200 palabras)",
+    "medio": "Medio (200-300 palabras)",
+    "largo": "Largo (300-500 palabras)"
+}
+
+CAMPOS_GUIA = {"tema sugerido": "tema", "estilo": "estilo", "tono": "tono", "longitud": "longitud"}
+
+_SECCION_DIA = re.compile(r"^###\s+\*\*\W*\s*(\w+)\s*-\s*(.+?)\*\*\s*$")
+_CAMPO = re.compile(r"^-\s+\*\*(.+?):\*\*\s*`?\"?(.+?)\"?`?\s*$")
+
+
+def _sin_tildes(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn")
+
+
+def _indice_dia(dia: str) -> int:
+    return [_sin_tildes(d) for d in DIAS].index(_sin_tildes(dia.lower()))
+
+
+def leer_plan_markdown(ruta: str = "GUIA_USO_SEMANAL.md", hora: str = "09:00") -> List[Dict]:
+    """
+    Extrae del markdown de la guía las franjas "### **<emoji> <Día> - <Nombre>**"
+    con sus líneas de tema, estilo, tono y longitud
+    """
+    plan = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            seccion = _SECCION_DIA.match(linea)
+            if seccion:
+                try:
+                    _indice_dia(seccion.group(1))
+                except ValueError:
+                    continue
+                plan.append({"dia": seccion.group(1).lower(), "hora": hora, "nombre": seccion.group(2).strip()})
+                continue
+            campo = _CAMPO.match(linea)
+            if campo and plan and campo.group(1).lower() in CAMPOS_GUIA:
+                plan[-1][CAMPOS_GUIA[campo.group(1).lower()]] = campo.group(2).strip()
+    return [normalizar_franja(franja) for franja in plan if "tema" in franja]
+
+
+def normalizar_franja(franja: Dict) -> Dict:
+    """Completa una franja del plan con valores por defecto y un identificador estable"""
+    franja = dict(franja)
+    franja.setdefault("hora", "09:00")
+    franja.setdefault("estilo", "Profesional")
+    franja.setdefault("tono", "Neutral")
+    franja["longitud"] = LONGITUDES.get(franja.get("longitud", "medio").lower(), franja.get("longitud"))
+    franja.setdefault("nombre", franja["tema"])
+    franja.setdefault("id", re.sub(r"\W+", "-", _sin_tildes(f"{franja['dia']} {franja['nombre']}").lower()).strip("-"))
+    return franja
+
+
+def cargar_plan(ruta: str, hora: str = "09:00") -> List[Dict]:
+    """Carga el plan desde un JSON (lista de franjas) o desde el markdown de la guía"""
+    if ruta.endswith(".json"):
+        with open(ruta, encoding="utf-8") as f:
+            return [normalizar_franja(franja) for franja in json.load(f)]
+    return leer_plan_markdown(ruta, hora)
+
+
+def leer_cola(ruta_estado: str = ".cache/calendario.json") -> List[Dict]:
+    """Borradores listos pendientes de publicar, del más próximo al más lejano"""
+    try:
+        with open(ruta_estado, encoding="utf-8") as f:
+            borradores = json.load(f).get("borradores", {}).values()
+    except (OSError, ValueError):
+        return []
+    ahora = datetime.now().isoformat(timespec="seconds")
+    return sorted((b for b in borradores if b["estado"] == "listo" and b["publicar_en"] >= ahora),
+                  key=lambda b: b["publicar_en"])
+
+
+def crear_preparador(client, proveedor: str, historial=None, fuente=None,
+                     num_articulos: int = 10, idioma: str = "es") -> Callable[[Dict, Set[str]], Dict]:
+    """
+    Función que busca noticias del tema de una franja, elige la primera no usada
+    en borradores anteriores y genera el post
+    """
+    import generacion
+    import noticias
+    fuente = fuente or noticias
+
+    def preparar(franja: Dict, urls_usadas: Set[str]) -> Dict:
+        resultados = fuente.obtener_noticias_google(franja["tema"], num_articulos, idioma)
+        candidatas = [n for n in resultados if n.get("url") not in urls_usadas] or resultados
+        if not candidatas:
+            raise RuntimeError(f"Sin noticias para '{franja['tema']}'")
+        noticia = candidatas[0]
+
+        metricas = {}
+        texto = generacion.generar_post(client, proveedor, noticia, franja["estilo"], franja["tono"],
+                                        franja["longitud"], metricas)
+        post_id = None
+        if historial is not None:
+            post_id = historial.registrar(texto, noticia, tipo="programado", estilo=franja["estilo"],
+                                          tono=franja["tono"], longitud=franja["longitud"],
+                                          proveedor=proveedor, metricas=metricas)
+        return {"texto": texto, "noticia": noticia, "post_id": post_id, "metricas": metricas}
+
+    return preparar
+
+
+class Calendario:
+    """Prepara borradores antes de cada franja del plan y guarda la cola en disco"""
+
+    def __init__(self, plan: List[Dict], preparar: Callable[[Dict, Set[str]], Dict],
+                 antelacion_horas: float = 12, separacion_minutos: float = 15,
+                 ruta_estado: str = ".cache/calendario.json", max_ejecuciones: int = 200):
+        self.plan = plan
+        self.preparar = preparar
+        self.antelacion = timedelta(hours=antelacion_horas)
+        self.separacion = timedelta(minutes=separacion_minutos)
+        self.ruta_estado = ruta_estado
+        self.max_ejecuciones = max_ejecuciones
+        self._lock = threading.Lock()
+        self._estado = self._cargar()
+
+    def _cargar(self) -> Dict:
+        try:
+            with open(self.ruta_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"borradores": {}, "ejecuciones": []}
+
+    def _guardar(self) -> None:
+        os.makedirs(os.path.dirname(self.ruta_estado) or ".", exist_ok=True)
+        tmp = self.ruta_estado + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._estado, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.ruta_estado)
+
+    def proxima_publicacion(self, franja: Dict, desde: datetime) -> datetime:
+        """Siguiente fecha de publicación de la franja a partir de 'desde'"""
+        hora, minuto = (int(p) for p in franja["hora"].split(":"))
+        candidata = desde.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        candidata += timedelta(days=(_indice_dia(franja["dia"]) - desde.weekday()) % 7)
+        return candidata if candidata >= desde else candidata + timedelta(days=7)
+
+    def momento_preparacion(self, franja: Dict, publicacion: datetime) -> datetime:
+        """Cada franja se prepara con la antelación fijada más un desfase propio para repartir la carga"""
+        return publicacion - self.antelacion - self.separacion * self.plan.index(franja)
+
+    @staticmethod
+    def ocurrencia(franja: Dict, publicacion: datetime) -> str:
+        return f"{franja['id']}@{publicacion.date().isoformat()}"
+
+    def pendientes(self, ahora: Optional[datetime] = None) -> List[tuple]:
+        """Franjas cuyo momento de preparación ya pasó y que aún no tienen borrador"""
+        ahora = ahora or datetime.now()
+        pendientes = []
+        for franja in self.plan:
+            publicacion = self.proxima_publicacion(franja, ahora)
+            if self.momento_preparacion(franja, publicacion) <= ahora \
+                    and self.ocurrencia(franja, publicacion) not in self._estado["borradores"]:
+                pendientes.append((franja, publicacion))
+        return sorted(pendientes, key=lambda p: p[1])
+
+    def ejecutar(self, franja: Dict, publicacion: datetime) -> Optional[Dict]:
+        """Prepara el borrador de una ocurrencia y registra su duración"""
+        clave = self.ocurrencia(franja, publicacion)
+        with self._lock:
+            urls_usadas = {b["url"] for b in self._estado["borradores"].values()}
+
+        inicio = time.perf_counter()
+        ejecucion = {"ocurrencia": clave, "inicio": datetime.now().isoformat(timespec="seconds")}
+        borrador = None
+        try:
+            resultado = self.preparar(franja, urls_usadas)
+            borrador = {
+                "ocurrencia": clave,
+                "franja": franja["id"],
+                "nombre": franja["nombre"],
+                "publicar_en": publicacion.isoformat(timespec="seconds"),
+                "preparado_en": datetime.now().isoformat(timespec="seconds"),
+                "estado": "listo",
+                "texto": resultado["texto"],
+                "titulo": resultado["noticia"].get("title", ""),
+                "url": resultado["noticia"].get("url", ""),
+                "post_id": resultado.get("post_id")
+            }
+            ejecucion["correcta"] = True
+        except Exception as e:
+            ejecucion.update(correcta=False, error=str(e))
+        ejecucion["duracion_s"] = round(time.perf_counter() - inicio, 2)
+
+        with self._lock:
+            if borrador:
+                self._estado["borradores"][clave] = borrador
+            self._estado["ejecuciones"] = (self._estado["ejecuciones"] + [ejecucion])[-self.max_ejecuciones:]
+            self._guardar()
+        return borrador
+
+    def reanudar(self, pausa_segundos: float = 30) -> int:
+        """
+        Ejecuta las preparaciones perdidas (p. ej. con el proceso parado),
+        dejando una pausa entre ellas. Devuelve cuántos borradores se prepararon
+        """
+        preparados = 0
+        for i, (franja, publicacion) in enumerate(self.pendientes()):
+            if i:
+                time.sleep(pausa_segundos)
+            preparados += self.ejecutar(franja, publicacion) is not None
+        return preparados
+
+    def _tarea_programada(self, franja: Dict) -> None:
+        publicacion = self.proxima_publicacion(franja, datetime.now())
+        if self.ocurrencia(franja, publicacion) not in self._estado["borradores"]:
+            self.ejecutar(franja, publicacion)
+
+    def programar(self, planificador=schedule) -> None:
+        """Registra en schedule un trabajo semanal por franja en su momento de preparación"""
+        for franja in self.plan:
+            referencia = self.proxima_publicacion(franja, datetime.now())
+            preparacion = self.momento_preparacion(franja, referencia)
+            trabajo = getattr(planificador.every(), DIAS_SCHEDULE[preparacion.weekday()])
+            trabajo.at(preparacion.strftime("%H:%M")).do(self._tarea_programada, franja).tag(franja["id"])
+
+    def cola(self) -> List[Dict]:
+        """Borradores listos pendientes de publicar"""
+        return leer_cola(self.ruta_estado)
+
+    def marcar_publicado(self, ocurrencia: str) -> None:
+        with self._lock:
+            if ocurrencia in self._estado["borradores"]:
+                self._estado["borradores"][ocurrencia]["estado"] = "publicado"
+                self._guardar()
+
+    def tiempos_ejecucion(self) -> Dict[str, Dict]:
+        """Ejecuciones, errores y duración media y máxima por franja"""
+        resumen: Dict[str, Dict] = {}
+        for ejecucion in self._estado["ejecuciones"]:
+            datos = resumen.setdefault(ejecucion["ocurrencia"].split("@")[0],
+                                       {"ejecuciones": 0, "errores": 0, "duraciones": []})
+            datos["ejecuciones"] += 1
+            datos["errores"] += not ejecucion["correcta"]
+            datos["duraciones"].append(ejecucion["duracion_s"])
+        return {
+            franja: {"ejecuciones": d["ejecuciones"], "errores": d["errores"],
+                     "media_s": round(sum(d["duraciones"]) / len(d["duraciones"]), 2),
+                     "max_s": max(d["duraciones"])}
+            for franja, d in resumen.items()
+        }
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Calendario de publicación con borradores anticipados")
+    parser.add_argument("--plan", default="GUIA_USO_SEMANAL.md", help="Guía en markdown o JSON con las franjas")
+    parser.add_argument("--hora", default="09:00", help="Hora de publicación para las franjas de la guía")
+    parser.add_argument("--proveedor", choices=["OpenAI", "Groq", "Local"], default="Groq")
+    parser.add_argument("--antelacion", type=float, default=12, help="Horas de antelación de cada borrador")
+    parser.add_argument("--separacion", type=float, default=15, help="Minutos entre las preparaciones de cada franja")
+    parser.add_argument("--cola", action="store_true", help="Muestra los borradores listos y sale")
+    args = parser.parse_args()
+
+    if args.cola:
+        for borrador in leer_cola():
+            print(f"🗓️ {borrador['publicar_en']} · {borrador['nombre']} · {borrador['titulo']}")
+        return
+
+    import generacion
+    from historial import HistorialPosts
+    from presupuesto import PRESUPUESTO
+
+    plan = cargar_plan(args.plan, args.hora)
+    historial = HistorialPosts()
+    PRESUPUESTO.conectar(historial)
+    preparar = crear_preparador(generacion.crear_cliente(args.proveedor), args.proveedor, historial)
+    calendario = Calendario(plan, preparar, args.antelacion, args.separacion)
+
+    print(f"📅 {len(plan)} franjas: " + ", ".join(f"{f['dia']} {f['hora']} ({f['nombre']})" for f in plan))
+    recuperados = calendario.reanudar()
+    if recuperados:
+        print(f"♻️ {recuperados} borradores pendientes preparados al arrancar")
+
+    calendario.programar()
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(30)
+    except KeyboardInterrupt:
+        print(f"⏱️ Tiempos de ejecución: {calendario.tiempos_ejecucion()}")
+
+
+if __name__ == "__main__":
+    main()
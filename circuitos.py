@@ -0,0 +1,172 @@
+"""
+Cortacircuitos por fuente de noticias.
+
+Cada fuente lleva una ventana de sus últimas llamadas (éxito y latencia). Tras
+varios fallos seguidos, o si la tasa de error de la ventana supera el umbral,
+el circuito se abre y las llamadas fallan al instante sin esperar a la fuente.
+Pasado un tiempo pasa a semiabierto y deja pasar una llamada de prueba: si
+funciona se cierra y si falla vuelve a abrirse.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+from grabacion import GRABADOR
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    """La fuente está desactivada temporalmente por fallos recientes"""
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Circuito:
+    """Cortacircuitos con ventana deslizante de resultados y latencias"""
+
+    def __init__(self, nombre: str, ventana: int = 20, fallos_seguidos: int = 3,
+                 tasa_error: float = 0.5, min_llamadas: int = 5, espera_apertura: float = 30.0):
+        self.nombre = nombre
+        self.fallos_seguidos = fallos_seguidos
+        self.tasa_error = tasa_error
+        self.min_llamadas = min_llamadas
+        self.espera_apertura = espera_apertura
+        self._llamadas = deque(maxlen=ventana)  # (correcta, latencia_ms)
+        self._consecutivos = 0
+        self._estado = CERRADO
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado_actual()
+
+    def _estado_actual(self) -> str:
+        if self._estado == ABIERTO and time.monotonic() - self._abierto_desde >= self.espera_apertura:
+            self._estado = SEMIABIERTO
+        return self._estado
+
+    def _permitir(self) -> None:
+        with self._lock:
+            estado = self._estado_actual()
+            if estado == ABIERTO or (estado == SEMIABIERTO and self._prueba_en_curso):
+                raise CircuitoAbierto(f"{self.nombre} desactivada temporalmente por fallos recientes")
+            if estado == SEMIABIERTO:
+                self._prueba_en_curso = True
+
+    def _registrar(self, correcta: bool, latencia_ms: float) -> None:
+        GRABADOR.fuente(self.nombre, latencia_ms, correcta)
+        with self._lock:
+            self._llamadas.append((correcta, latencia_ms))
+            self._consecutivos = 0 if correcta else self._consecutivos + 1
+            if self._estado == SEMIABIERTO:
+                self._prueba_en_curso = False
+                if correcta:
+                    # La prueba ha ido bien: se olvida el historial de fallos
+                    self._estado = CERRADO
+                    self._llamadas.clear()
+                    self._llamadas.append((correcta, latencia_ms))
+                else:
+                    self._abrir()
+                return
+
+            errores = sum(1 for ok, _ in self._llamadas if not ok)
+            if self._consecutivos >= self.fallos_seguidos or (
+                    len(self._llamadas) >= self.min_llamadas and errores / len(self._llamadas) >= self.tasa_error):
+                self._abrir()
+
+    def _abrir(self) -> None:
+        self._estado = ABIERTO
+        self._abierto_desde = time.monotonic()
+
+    def ejecutar(self, funcion: Callable, *args, **kwargs):
+        """Llama a la fuente si el circuito lo permite y registra el resultado"""
+        self._permitir()
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException:
+            self._registrar(False, (time.perf_counter() - inicio) * 1000)
+            raise
+        self._registrar(True, (time.perf_counter() - inicio) * 1000)
+        return resultado
+
+    def resumen(self) -> Dict:
+        """Estado, tasa de error y percentiles de latencia de la ventana"""
+        with self._lock:
+            estado = self._estado_actual()
+            llamadas = list(self._llamadas)
+        latencias = [latencia for _, latencia in llamadas]
+        return {
+            "estado": estado,
+            "llamadas": len(llamadas),
+            "tasa_error": round(sum(1 for ok, _ in llamadas if not ok) / len(llamadas), 2) if llamadas else 0.0,
+            "p50_ms": round(_percentil(latencias, 50), 1) if latencias else None,
+            "p95_ms": round(_percentil(latencias, 95), 1) if latencias else None
+        }
+
+
+# Circuitos compartidos por todas las funciones de noticias del proceso
+CIRCUITOS: Dict[str, Circuito] = {}
+_LOCK = threading.Lock()
+
+
+def circuito(nombre: str) -> Circuito:
+    with _LOCK:
+        if nombre not in CIRCUITOS:
+            CIRCUITOS[nombre] = Circuito(nombre)
+        return CIRCUITOS[nombre]
+
+
+def proteger(nombre: str) -> Callable:
+    """Decorador que hace pasar las llamadas a una fuente por su circuito"""
+    def decorador(funcion: Callable) -> Callable:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            return circuito(nombre).ejecutar(funcion, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def estadisticas() -> Dict[str, Dict]:
+    """Resumen de todos los circuitos"""
+    with _LOCK:
+        circuitos = list(CIRCUITOS.values())
+    return {c.nombre: c.resumen() for c in circuitos}
+
+
+def repartir(num_articulos: int, fuentes: List[str], estados: Dict[str, Dict]) -> Dict[str, int]:
+    """
+    Reparte num_articulos entre las fuentes según su salud: las abiertas no
+    reciben nada, las semiabiertas un artículo (la llamada de prueba) y el resto
+    se divide entre las cerradas, dando el sobrante a las de menor latencia
+    """
+    estado = {f: estados.get(f, {}).get("estado", CERRADO) for f in fuentes}
+    sanas = sorted((f for f in fuentes if estado[f] == CERRADO),
+                   key=lambda f: estados.get(f, {}).get("p50_ms") or 0)
+    en_prueba = [f for f in fuentes if estado[f] == SEMIABIERTO]
+
+    reparto = {f: 0 for f in fuentes}
+    if not sanas:
+        for i in range(num_articulos):
+            if en_prueba:
+                reparto[en_prueba[i % len(en_prueba)]] += 1
+        return reparto
+
+    for f in en_prueba:
+        reparto[f] = 1
+    restantes = max(0, num_articulos - len(en_prueba))
+    for i, f in enumerate(sanas):
+        reparto[f] = restantes // len(sanas) + (1 if i < restantes % len(sanas) else 0)
+    return reparto
@@ -0,0 +1,91 @@
+"""
+Cliente del backend compartido (ver backend.py).
+
+Expone las mismas funciones que los módulos noticias y generacion, de modo que
+la app puede usar uno u otro indistintamente.
+"""
+
+from typing import Dict, List, Optional
+
+import requests
+
+
+class ErrorBackend(Exception):
+    """Error devuelto por el backend compartido"""
+
+
+class ClienteBackend:
+    """Cliente HTTP ligero del backend"""
+
+    def __init__(self, url: str, timeout: float = 120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._sesion = requests.Session()
+
+    def _post(self, ruta: str, datos: Dict):
+        response = self._sesion.post(f"{self.url}{ruta}", json=datos, timeout=self.timeout)
+        if response.status_code != 200:
+            # Un proxy delante del backend puede responder con HTML en lugar de JSON
+            try:
+                mensaje = response.json().get("error", response.text)
+            except (ValueError, AttributeError):
+                mensaje = response.text[:200] or f"HTTP {response.status_code}"
+            raise ErrorBackend(mensaje)
+        return response.json()
+
+    def _noticias(self, funcion: str, **argumentos) -> List[Dict]:
+        return self._post(f"/noticias/{funcion}", argumentos)
+
+    # Las API keys de las fuentes las aporta el backend
+    def obtener_noticias_newsapi(self, api_key: str, categoria: str = "general", pais: str = "us", num_articulos: int = 10) -> List[Dict]:
+        return self._noticias("obtener_noticias_newsapi", categoria=categoria, pais=pais, num_articulos=num_articulos)
+
+    def obtener_noticias_guardian(self, api_key: str, seccion: str = "world", num_articulos: int = 10) -> List[Dict]:
+        return self._noticias("obtener_noticias_guardian", seccion=seccion, num_articulos=num_articulos)
+
+    def obtener_noticias_google(self, query: str, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+        return self._noticias("obtener_noticias_google", query=query, num_articulos=num_articulos, idioma=idioma)
+
+    def obtener_noticias_google_trending(self, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+        return self._noticias("obtener_noticias_google_trending", num_articulos=num_articulos, idioma=idioma)
+
+    def obtener_noticias_rss_bbc(self, query: str = "", num_articulos: int = 10) -> List[Dict]:
+        return self._noticias("obtener_noticias_rss_bbc", query=query, num_articulos=num_articulos)
+
+    def buscar_noticias_guardian_personalizada(self, api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+        return self._noticias("buscar_noticias_guardian_personalizada", query=query, num_articulos=num_articulos)
+
+    def buscar_noticias_newsapi_personalizada(self, api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+        return self._noticias("buscar_noticias_newsapi_personalizada", query=query, num_articulos=num_articulos)
+
+    # El cliente del LLM también vive en el backend; client y cancelado se ignoran (por eso la app
+    # desactiva la generación especulativa con backend)
+    def generar_post(self, client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str,
+                     metricas: Optional[Dict] = None, cancelado=None) -> str:
+        respuesta = self._post("/generar", {"proveedor": proveedor, "noticia": noticia, "estilo": estilo,
+                                            "tono": tono, "longitud": longitud})
+        if metricas is not None:
+            metricas.update(respuesta["metricas"])
+        return respuesta["resultado"]
+
+    def generar_variantes(self, client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str,
+                          num_variantes: int, metricas: Optional[Dict] = None) -> List[str]:
+        respuesta = self._post("/variantes", {"proveedor": proveedor, "noticia": noticia, "estilo": estilo,
+                                              "tono": tono, "longitud": longitud, "num_variantes": num_variantes})
+        if metricas is not None:
+            metricas.update(respuesta["metricas"])
+        return respuesta["resultado"]
+
+    def generar_post_estructurado(self, client, proveedor: str, noticia: Dict, estilo: str, tono: str,
+                                  longitud: str, metricas: Optional[Dict] = None) -> Dict:
+        respuesta = self._post("/estructurado", {"proveedor": proveedor, "noticia": noticia, "estilo": estilo,
+                                                 "tono": tono, "longitud": longitud})
+        if metricas is not None:
+            metricas.update(respuesta["metricas"])
+        return respuesta["resultado"]
+
+    def metricas(self) -> Dict:
+        return self._sesion.get(f"{self.url}/metricas", timeout=self.timeout).json()
+
+    def estado_fuentes(self) -> Dict[str, Dict]:
+        return self._sesion.get(f"{self.url}/fuentes", timeout=self.timeout).json()
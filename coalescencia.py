@@ -0,0 +1,79 @@
+"""
+Coalescencia de peticiones (single-flight).
+
+Si llegan a la vez varias llamadas idénticas (misma función y mismos
+argumentos), solo la primera llega a la fuente; el resto espera su resultado y
+lo comparte. Se cuentan las llamadas reales y las coalescidas por función.
+"""
+
+import copy
+import functools
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Agrupa llamadas idénticas concurrentes en una sola ejecución"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo: Dict[Hashable, Future] = {}
+        self._estadisticas: Dict[str, Counter] = defaultdict(Counter)
+
+    def ejecutar(self, nombre: str, clave: Hashable, funcion: Callable, *args, **kwargs):
+        """
+        Ejecuta funcion(*args, **kwargs) salvo que ya haya una llamada en curso
+        con la misma clave, en cuyo caso espera y devuelve su resultado
+        """
+        clave = (nombre, clave)
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_vuelo[clave] = futuro
+                self._estadisticas[nombre]["llamadas"] += 1
+            else:
+                self._estadisticas[nombre]["coalescidas"] += 1
+
+        if not lider:
+            # Copia superficial para que ningún llamante modifique la lista de otro
+            return copy.copy(futuro.result())
+
+        try:
+            resultado = funcion(*args, **kwargs)
+            futuro.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            with self._lock:
+                self._estadisticas[nombre]["errores"] += 1
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+
+    def estadisticas(self) -> Dict[str, Dict[str, int]]:
+        """Llamadas reales, coalescidas y errores por función"""
+        with self._lock:
+            return {nombre: dict(contador) for nombre, contador in self._estadisticas.items()}
+
+
+# Grupo compartido por todas las funciones de noticias del proceso
+GRUPO = SingleFlight()
+
+
+def coalescer(funcion: Callable) -> Callable:
+    """Decorador que aplica single-flight sobre GRUPO usando los argumentos como clave"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        clave = (args, tuple(sorted(kwargs.items())))
+        return GRUPO.ejecutar(funcion.__name__, clave, funcion, *args, **kwargs)
+    return envoltura
+
+
+def estadisticas() -> Dict[str, Dict[str, int]]:
+    """Estadísticas de coalescencia del grupo compartido"""
+    return GRUPO.estadisticas()
@@ -0,0 +1,170 @@
+"""
+Planificador de consultas para Google News.
+
+Una descripción larga ("Nuevas tecnologías en salud") se convierte en varias
+subconsultas de palabras clave: todas las palabras clave juntas, variantes con
+sinónimos del idioma de búsqueda y pares de términos consecutivos. Las
+subconsultas se lanzan en paralelo, cada una con su propia caché (de modo que
+búsquedas distintas que comparten subconsultas reutilizan el trabajo), y los
+resultados se combinan con fusión de rangos recíprocos (RRF).
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+from memoria import tamano_bytes
+
+PALABRAS_VACIAS = {
+    "es": {"el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "a", "en", "y", "o", "u",
+           "e", "que", "por", "para", "con", "sin", "sobre", "entre", "hacia", "desde", "su", "sus", "lo", "se",
+           "es", "son", "como", "más", "mas", "muy", "nuevo", "nueva", "nuevos", "nuevas", "últimas", "ultimas",
+           "noticias", "noticia", "actualidad", "hoy"},
+    "en": {"the", "a", "an", "of", "in", "on", "at", "to", "for", "and", "or", "with", "by", "from", "about",
+           "is", "are", "its", "their", "new", "latest", "news", "today", "recent"},
+}
+
+# Sinónimos por idioma, indexados por la raíz sin tildes ni plural (ver raiz)
+SINONIMOS = {
+    "es": {
+        "tecnologia": ["tecnológica", "innovación"],
+        "salud": ["sanidad", "medicina"],
+        "ia": ["inteligencia artificial"],
+        "empresa": ["negocio", "compañía"],
+        "economia": ["mercado", "finanzas"],
+        "empleo": ["trabajo", "mercado laboral"],
+        "ciberseguridad": ["seguridad informática"],
+        "sostenibilidad": ["medio ambiente", "ESG"],
+        "educacion": ["formación", "enseñanza"],
+        "energia": ["renovables", "eléctrica"],
+    },
+    "en": {
+        "technology": ["tech", "innovation"],
+        "tech": ["technology"],
+        "health": ["healthcare", "medicine"],
+        "ai": ["artificial intelligence"],
+        "business": ["companies", "industry"],
+        "economy": ["markets", "finance"],
+        "job": ["employment", "labor market"],
+        "cybersecurity": ["security", "infosec"],
+        "sustainability": ["climate", "ESG"],
+        "education": ["learning", "schools"],
+        "energy": ["renewables", "power"],
+    },
+}
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def raiz(palabra: str) -> str:
+    """Minúsculas, sin tildes y sin plural simple, para buscar sinónimos"""
+    palabra = "".join(c for c in unicodedata.normalize("NFD", palabra.lower()) if unicodedata.category(c) != "Mn")
+    if len(palabra) > 4 and palabra.endswith("es") and palabra[-3] not in "aeiou":
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+
+def palabras_clave(texto: str, idioma: str = "es") -> List[str]:
+    """Palabras con contenido del texto, en orden y sin repetir"""
+    vacias = PALABRAS_VACIAS.get(idioma, set()) | PALABRAS_VACIAS["en"]
+    claves = []
+    for palabra in _PALABRA.findall(texto or ""):
+        minuscula = palabra.lower()
+        if minuscula in vacias or (len(palabra) < 3 and not palabra.isupper()):
+            continue
+        if minuscula not in (c.lower() for c in claves):
+            claves.append(palabra)
+    return claves
+
+
+def planificar(consulta: str, idioma: str = "es", max_subconsultas: int = 4) -> List[str]:
+    """
+    Subconsultas para una búsqueda: las consultas cortas se usan tal cual y las
+    largas se expanden en palabras clave, sinónimos y pares de términos
+    """
+    consulta = (consulta or "").strip()
+    claves = palabras_clave(consulta, idioma)
+    if len(claves) <= 1:
+        return [consulta] if consulta else []
+
+    subconsultas = [" ".join(claves)]
+    sinonimos = SINONIMOS.get(idioma, {})
+    for i, clave in enumerate(claves):
+        # Un sinónimo por término para dejar sitio a los pares
+        if raiz(clave) in sinonimos:
+            subconsultas.append(" ".join(claves[:i] + sinonimos[raiz(clave)][:1] + claves[i + 1:]))
+    # Pares consecutivos: menos restrictivos cuando hay muchas palabras clave
+    if len(claves) > 2:
+        subconsultas += [f"{a} {b}" for a, b in zip(claves, claves[1:])]
+
+    return list(dict.fromkeys(subconsultas))[:max_subconsultas]
+
+
+def fusion_rrf(listas: List[List[Dict]], k: int = 60,
+               clave: Callable[[Dict], Hashable] = lambda n: n.get("url") or n.get("title")) -> List[Dict]:
+    """
+    Fusión de rangos recíprocos: cada noticia suma 1 / (k + posición) en cada
+    lista en la que aparece; se ordenan por la suma
+    """
+    puntuaciones: Dict[Hashable, float] = {}
+    noticias: Dict[Hashable, Dict] = {}
+    for lista in listas:
+        for posicion, noticia in enumerate(lista, start=1):
+            identificador = clave(noticia)
+            puntuaciones[identificador] = puntuaciones.get(identificador, 0.0) + 1.0 / (k + posicion)
+            noticias.setdefault(identificador, noticia)
+    return [noticias[i] for i in sorted(puntuaciones, key=puntuaciones.get, reverse=True)]
+
+
+class CacheConsultas:
+    """Caché LRU con caducidad y límite de entradas y de bytes (tamaño serializado)"""
+
+    def __init__(self, ttl: float = 900.0, max_entradas: int = 256, max_bytes: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        # clave -> (caduca, resultado, bytes)
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._estadisticas = Counter()
+
+    def _quitar(self, clave: Hashable) -> None:
+        self._bytes -= self._entradas.pop(clave)[2]
+
+    def obtener(self, clave: Hashable) -> Optional[List[Dict]]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self._estadisticas["fallos"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._estadisticas["aciertos"] += 1
+            return list(entrada[1])
+
+    def guardar(self, clave: Hashable, resultado: List[Dict]) -> None:
+        tamano = tamano_bytes(resultado) if self.max_bytes is not None else 0
+        ahora = time.monotonic()
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            for caducada in [c for c, e in self._entradas.items() if e[0] < ahora]:
+                self._quitar(caducada)
+            self._entradas[clave] = (ahora + self.ttl, list(resultado), tamano)
+            self._bytes += tamano
+            while len(self._entradas) > 1 and (len(self._entradas) > self.max_entradas or
+                                               (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._quitar(next(iter(self._entradas)))
+                self._estadisticas["desalojos"] += 1
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Aciertos, fallos, desalojos, entradas guardadas y sus bytes (si hay límite de bytes)"""
+        with self._lock:
+            return dict(self._estadisticas, entradas=len(self._entradas), bytes=self._bytes)
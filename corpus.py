@@ -0,0 +1,175 @@
+"""
+Exportación del corpus de noticias y del historial de posts a Parquet (opcional).
+
+Las noticias que devuelven las búsquedas se acumulan en memoria y se vuelcan
+por lotes a un dataset Parquet particionado por día de ingesta; los posts del
+historial se exportan de forma incremental a partir del último id exportado.
+Cada volcado escribe ficheros nuevos y nunca reescribe los anteriores, de modo
+que exportar es barato aunque el corpus crezca. analitica.py consulta estos
+datasets. Requiere pyarrow (pip install pyarrow).
+"""
+
+import atexit
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from historial import COLUMNAS as COLUMNAS_POSTS
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DIRECTORIO = os.path.join(".cache", "corpus")
+
+COLUMNAS_NOTICIAS = ["fecha", "ingerida", "publicada", "fuente", "titulo", "descripcion", "url", "palabras_clave",
+                     "hashtags"]
+
+COLUMNAS_ENTERAS_POSTS = ["id", "post_origen", "tokens_prompt", "tokens_respuesta", "tokens_cacheados"]
+
+# Esquemas fijos: cada volcado es un fichero aparte y el tipo no puede depender
+# de lo que pandas deduzca de un lote (una columna sin valores sería "null")
+if pa is not None:
+    ESQUEMA_NOTICIAS = pa.schema([
+        ("fecha", pa.string()), ("ingerida", pa.string()), ("publicada", pa.string()), ("fuente", pa.string()),
+        ("titulo", pa.string()), ("descripcion", pa.string()), ("url", pa.string()),
+        ("palabras_clave", pa.list_(pa.string())), ("hashtags", pa.list_(pa.string())),
+    ])
+    ESQUEMA_POSTS = pa.schema(
+        [(columna, pa.int64() if columna in COLUMNAS_ENTERAS_POSTS else
+          pa.float64() if columna == "latencia_ms" else pa.string())
+         for columna in COLUMNAS_POSTS] + [("fecha", pa.string())]
+    )
+
+
+def disponible() -> bool:
+    """Indica si está instalado pyarrow para escribir Parquet"""
+    return pa is not None
+
+
+class ExportadorParquet:
+    """Escritura incremental (solo añadir) del corpus de noticias y de los posts"""
+
+    def __init__(self, directorio: str = DIRECTORIO, tam_lote: int = 500):
+        self.directorio = directorio
+        self.tam_lote = tam_lote
+        self.ruta_noticias = os.path.join(directorio, "noticias")
+        self.ruta_posts = os.path.join(directorio, "posts")
+        self._ruta_estado = os.path.join(directorio, "estado.json")
+        self._lock = threading.Lock()
+        self._pendientes: List[Dict] = []
+        self._urls: Optional[Set[str]] = None
+        atexit.register(self.volcar)
+
+    def _urls_exportadas(self) -> Set[str]:
+        # Solo se lee la columna url del dataset, una vez por proceso
+        if self._urls is None:
+            self._urls = set()
+            if os.path.isdir(self.ruta_noticias):
+                tabla = self._dataset(self.ruta_noticias, ESQUEMA_NOTICIAS).to_table(columns=["url"])
+                self._urls = set(tabla.column("url").to_pylist())
+        return self._urls
+
+    def agregar_noticias(self, noticias: List[Dict]) -> int:
+        """Encola las noticias que aún no están en el corpus; vuelca al llegar a tam_lote"""
+        if not disponible():
+            return 0
+        ahora = datetime.now()
+        with self._lock:
+            urls = self._urls_exportadas()
+            nuevas = 0
+            for noticia in noticias:
+                url = noticia.get("url")
+                if not url or url in urls:
+                    continue
+                urls.add(url)
+                self._pendientes.append({
+                    "fecha": ahora.strftime("%Y-%m-%d"),
+                    "ingerida": ahora.isoformat(timespec="seconds"),
+                    "publicada": noticia.get("publishedAt") or "",
+                    "fuente": str(noticia.get("source") or ""),
+                    "titulo": noticia.get("title") or "",
+                    "descripcion": noticia.get("description") or "",
+                    "url": url,
+                    "palabras_clave": list(noticia.get("palabras_clave") or []),
+                    "hashtags": list(noticia.get("hashtags") or []),
+                })
+                nuevas += 1
+            lleno = len(self._pendientes) >= self.tam_lote
+        if lleno:
+            self.volcar()
+        return nuevas
+
+    def volcar(self) -> int:
+        """Escribe las noticias pendientes como ficheros nuevos del dataset"""
+        if not disponible():
+            return 0
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, []
+            if not pendientes:
+                return 0
+            df = pd.DataFrame(pendientes, columns=COLUMNAS_NOTICIAS)
+            self._escribir(df, self.ruta_noticias, ESQUEMA_NOTICIAS)
+            return len(df)
+
+    def _leer_estado(self) -> Dict:
+        try:
+            with open(self._ruta_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def exportar_posts(self, historial) -> int:
+        """Añade al dataset los posts del historial posteriores al último exportado"""
+        if not disponible():
+            return 0
+        with self._lock:
+            estado = self._leer_estado()
+            df = historial.posts_desde(estado.get("ultimo_post", 0))
+            if df.empty:
+                return 0
+            df["fecha"] = df["creado"].str[:10]
+            df[COLUMNAS_ENTERAS_POSTS] = df[COLUMNAS_ENTERAS_POSTS].astype("Int64")
+            df["latencia_ms"] = df["latencia_ms"].astype("float64")
+            self._escribir(df[ESQUEMA_POSTS.names], self.ruta_posts, ESQUEMA_POSTS)
+            estado["ultimo_post"] = int(df["id"].max())
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta_estado, "w", encoding="utf-8") as f:
+                json.dump(estado, f)
+            return len(df)
+
+    @staticmethod
+    def _escribir(df: pd.DataFrame, ruta: str, esquema: "pa.Schema") -> None:
+        # Un nombre único por volcado: los ficheros existentes no se tocan
+        pq.write_to_dataset(pa.Table.from_pandas(df, schema=esquema, preserve_index=False), ruta,
+                            partition_cols=["fecha"],
+                            basename_template=f"parte-{uuid.uuid4().hex}-{{i}}.parquet",
+                            existing_data_behavior="overwrite_or_ignore")
+
+    @staticmethod
+    def _dataset(ruta: str, esquema: "pa.Schema") -> "ds.Dataset":
+        particion = ds.partitioning(pa.schema([esquema.field("fecha")]), flavor="hive")
+        return ds.dataset(ruta, schema=esquema, format="parquet", partitioning=particion)
+
+    def leer_noticias(self) -> pd.DataFrame:
+        """Corpus de noticias exportado (vacío si aún no hay)"""
+        return self._leer(self.ruta_noticias, ESQUEMA_NOTICIAS if disponible() else None, COLUMNAS_NOTICIAS)
+
+    def leer_posts(self) -> pd.DataFrame:
+        """Posts exportados (vacío si aún no hay)"""
+        return self._leer(self.ruta_posts, ESQUEMA_POSTS if disponible() else None, COLUMNAS_POSTS + ["fecha"])
+
+    def _leer(self, ruta: str, esquema: Optional["pa.Schema"], columnas: List[str]) -> pd.DataFrame:
+        if esquema is None or not os.path.isdir(ruta):
+            return pd.DataFrame(columns=columnas)
+        # Int64 de pandas para que los enteros con nulos no pasen a float
+        return self._dataset(ruta, esquema).to_table().to_pandas(
+            types_mapper={pa.int64(): pd.Int64Dtype()}.get)
@@ -0,0 +1,101 @@
+"""
+Generación especulativa de posts.
+
+Al seleccionar una noticia se empieza a generar el post en segundo plano con la
+configuración actual. Si al pulsar "Crear Post" la noticia y la configuración
+siguen siendo las mismas, se aprovecha ese resultado (o se espera lo que le
+quede); si cambian, la generación en curso se cancela. Se cuentan aciertos,
+fallos y tokens desperdiciados (prompt y respuesta de las canceladas y de las
+terminadas que no se usaron) para saber si compensa.
+"""
+
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+
+class Especulacion:
+    """Una generación lanzada por adelantado para una noticia y configuración"""
+
+    def __init__(self, clave: Hashable, futuro: Future, cancelado: threading.Event, metricas: Dict):
+        self.clave = clave
+        self.futuro = futuro
+        self.cancelado = cancelado
+        self.metricas = metricas
+        self.usada = False
+
+
+class Especulador:
+    """Ejecuta las especulaciones de todas las sesiones y lleva sus estadísticas"""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="especulacion")
+        self._lock = threading.Lock()
+        self._estadisticas = Counter()
+
+    def _sumar(self, **valores) -> None:
+        with self._lock:
+            self._estadisticas.update(valores)
+
+    def lanzar(self, clave: Hashable, generar: Callable[[threading.Event, Dict], str]) -> Especulacion:
+        """Empieza a generar en segundo plano; generar(cancelado, metricas) devuelve el post"""
+        cancelado = threading.Event()
+        metricas: Dict = {}
+        futuro = self._executor.submit(generar, cancelado, metricas)
+        self._sumar(lanzadas=1)
+        return Especulacion(clave, futuro, cancelado, metricas)
+
+    def descartar(self, especulacion: Especulacion) -> None:
+        """
+        Cancela una especulación que ya no sirve y cuenta como desperdiciados sus
+        tokens de prompt y de respuesta, tanto si se corta a medias como si ya
+        había terminado sin llegar a usarse
+        """
+        if especulacion.usada:
+            return
+        especulacion.cancelado.set()
+        if especulacion.futuro.cancel():
+            # No llegó a empezar: no consumió tokens
+            self._sumar(canceladas=1)
+            return
+
+        def contabilizar(futuro: Future):
+            tokens = (especulacion.metricas.get("tokens_prompt") or 0) + \
+                (especulacion.metricas.get("tokens_respuesta") or 0)
+            if futuro.exception() is None:
+                self._sumar(descartadas=1, tokens_desperdiciados=tokens)
+            else:
+                self._sumar(canceladas=1, tokens_desperdiciados=tokens)
+
+        especulacion.futuro.add_done_callback(contabilizar)
+
+    def usar(self, especulacion: Especulacion, metricas: Optional[Dict] = None,
+             timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Devuelve el post especulado (esperando si aún se está generando) o None
+        si falló o se canceló; las métricas de la llamada se copian en 'metricas'
+        """
+        try:
+            texto = especulacion.futuro.result(timeout=timeout)
+        except Exception:
+            self._sumar(fallos=1)
+            return None
+        especulacion.usada = True
+        if metricas is not None:
+            metricas.update(especulacion.metricas)
+        self._sumar(aciertos=1, tokens_aprovechados=(especulacion.metricas.get("tokens_prompt") or 0)
+                    + (especulacion.metricas.get("tokens_respuesta") or 0))
+        return texto
+
+    def fallo(self) -> None:
+        """Registra una generación que no pudo aprovechar ninguna especulación"""
+        self._sumar(fallos=1)
+
+    def estadisticas(self) -> Dict:
+        """Lanzadas, canceladas, descartadas, aciertos, fallos, tasa de acierto y tokens aprovechados/desperdiciados"""
+        with self._lock:
+            resumen = dict(self._estadisticas)
+        intentos = resumen.get("aciertos", 0) + resumen.get("fallos", 0)
+        resumen["tasa_acierto"] = round(resumen.get("aciertos", 0) / intentos, 2) if intentos else None
+        return resumen
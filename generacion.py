@@ -0,0 +1,352 @@
+"""
+Construcción de prompts y parámetros comunes de generación de posts.
+
+No depende de Streamlit, de modo que la app y los procesos por lotes comparten
+exactamente el mismo prompt.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from presupuesto import PRESUPUESTO, contar_palabras, rango_palabras, recortar_a_frase, termina_frase
+import salida_estructurada
+
+MODELOS = {
+    "OpenAI": "gpt-3.5-turbo",
+    "Groq": "llama-3.1-8b-instant",
+    "Local": os.getenv("LOCAL_LLM_MODEL", "local")
+}
+
+# Servidor local compatible con OpenAI (servidor_llm_local.py o llama-server de llama.cpp)
+URL_LOCAL = os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8080")
+
+# Parámetros extra por proveedor: cache_prompt pide a llama.cpp reutilizar la caché KV del prefijo
+OPCIONES_PROVEEDOR = {
+    "Local": {"extra_body": {"cache_prompt": True}}
+}
+
+MENSAJE_SISTEMA = "Eres un experto creador de contenido para LinkedIn."
+
+
+# Parte fija del prompt: va siempre al principio para que los proveedores (y llama.cpp)
+# puedan reutilizar su caché de prefijo entre noticias distintas
+INSTRUCCIONES_FIJAS = """Eres un experto en marketing digital y redes sociales. Tu tarea es crear un post atractivo para LinkedIn basado en la noticia que aparece al final.
+
+INSTRUCCIONES:
+- Incluye hashtags relevantes
+- Haz que sea atractivo y profesional
+- Agrega una pregunta al final para generar engagement
+- No incluyas enlaces en el texto
+"""
+
+# El formato de la respuesta va detrás del prefijo: cambia entre texto y JSON
+FORMATO_TEXTO = """
+FORMATO DE RESPUESTA:
+Genera solo el texto del post, sin comillas ni explicaciones adicionales.
+"""
+
+
+def construir_prefijo(estilo: str, tono: str, longitud: str) -> str:
+    """
+    Parte estable del prompt: instrucciones comunes y definición de estilo
+    """
+    return f"""{INSTRUCCIONES_FIJAS}
+ESTILO:
+- Estilo: {estilo}
+- Tono: {tono}
+- Longitud: {longitud}
+"""
+
+
+def construir_sufijo(noticia: Dict) -> str:
+    """
+    Parte variable del prompt: la noticia
+    """
+    return f"""
+NOTICIA:
+Título: {noticia['title']}
+Descripción: {noticia['description']}
+Contenido: {noticia['content']}
+"""
+
+
+def construir_prompt(noticia: Dict, estilo: str, tono: str, longitud: str) -> str:
+    """
+    Construye el prompt de generación de posts (prefijo estable + noticia)
+    """
+    return construir_prefijo(estilo, tono, longitud) + FORMATO_TEXTO + construir_sufijo(noticia)
+
+
+def construir_prompt_variantes(noticia: Dict, estilo: str, tono: str, longitud: str, num_variantes: int) -> str:
+    """
+    Prompt que pide varias versiones del post en una sola respuesta
+    """
+    return construir_prefijo(estilo, tono, longitud) + FORMATO_TEXTO + f"""
+Escribe {num_variantes} versiones distintas del post (cambia el gancho inicial y el enfoque).
+Empieza cada versión con una línea que contenga solo "=== VARIANTE N ===", donde N es su número.
+""" + construir_sufijo(noticia)
+
+
+def construir_prompt_estructurado(noticia: Dict, estilo: str, tono: str, longitud: str) -> str:
+    """
+    Prompt que pide el post como JSON con sus partes por separado
+    """
+    return construir_prefijo(estilo, tono, longitud) + salida_estructurada.INSTRUCCIONES_JSON + construir_sufijo(noticia)
+
+
+def separar_variantes(texto: str, num_variantes: int) -> List[str]:
+    """
+    Separa una respuesta con varias versiones del post en candidatos independientes
+    """
+    marcador = re.compile(r'^\s*=+\s*VARIANTE\s*\d+\s*=*\s*$', re.MULTILINE | re.IGNORECASE)
+    primero = marcador.search(texto)
+    if primero:
+        # Descarta cualquier preámbulo anterior a la primera versión
+        texto = texto[primero.start():]
+    
+    partes = marcador.split(texto)
+    variantes = [parte.strip() for parte in partes if parte.strip()]
+    return variantes[:num_variantes]
+
+
+def crear_cliente(proveedor: str, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """Crea el cliente del proveedor (base_url permite apuntar a un servidor local)"""
+    if proveedor == "Local":
+        import openai
+        return openai.OpenAI(api_key=api_key or "local", base_url=f"{base_url or URL_LOCAL}/v1")
+
+    if proveedor == "OpenAI":
+        import openai
+        return openai.OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                             base_url=f"{base_url}/v1" if base_url else None)
+
+    from groq import Groq
+    return Groq(api_key=api_key or os.getenv("GROQ_API_KEY"), base_url=base_url)
+
+
+def tokens_cacheados(uso) -> Optional[int]:
+    """
+    Tokens del prompt servidos desde la caché del proveedor
+    (usage.prompt_tokens_details.cached_tokens, como objeto o como diccionario)
+    """
+    if isinstance(uso, dict):
+        detalles = uso.get('prompt_tokens_details') or {}
+        return detalles.get('cached_tokens')
+    detalles = getattr(uso, 'prompt_tokens_details', None)
+    return getattr(detalles, 'cached_tokens', None)
+
+
+def ratio_cache(usos: List[Dict]) -> Optional[float]:
+    """
+    Fracción de tokens de prompt cacheados sobre una lista de métricas
+    (solo cuenta las respuestas en las que el proveedor informa del dato)
+    """
+    con_dato = [m for m in usos if m.get('tokens_cacheados') is not None and m.get('tokens_prompt')]
+    if not con_dato:
+        return None
+    return sum(m['tokens_cacheados'] for m in con_dato) / sum(m['tokens_prompt'] for m in con_dato)
+
+
+def extraer_metricas(response, inicio: float, modelo: str, uso=None) -> Dict:
+    """
+    Latencia y uso de tokens de una respuesta del LLM
+    """
+    uso = uso if uso is not None else getattr(response, 'usage', None)
+    return {
+        "modelo": modelo,
+        "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "tokens_prompt": getattr(uso, 'prompt_tokens', None),
+        "tokens_respuesta": getattr(uso, 'completion_tokens', None),
+        "tokens_cacheados": tokens_cacheados(uso)
+    }
+
+
+class GeneracionCancelada(Exception):
+    """La generación se interrumpió antes de terminar"""
+
+
+def _completar_cancelable(client, proveedor: str, mensajes: List[Dict], cancelado: threading.Event,
+                          metricas: Optional[Dict], palabras_objetivo: Optional[int] = None, **opciones) -> str:
+    """
+    Pide la respuesta en streaming y corta la conexión en cuanto se activa
+    'cancelado', de modo que el proveedor deja de generar tokens. Con
+    'palabras_objetivo' también corta en el primer final de frase a partir de
+    esa cantidad de palabras.
+    """
+    if proveedor in ("OpenAI", "Local"):
+        opciones["stream_options"] = {"include_usage": True}
+
+    inicio = time.perf_counter()
+    stream = client.chat.completions.create(model=MODELOS[proveedor], messages=mensajes, stream=True, **opciones)
+    partes = []
+    uso = None
+    parada_temprana = False
+    try:
+        for chunk in stream:
+            if cancelado.is_set():
+                break
+            if chunk.choices and chunk.choices[0].delta.content:
+                fragmento = chunk.choices[0].delta.content
+                partes.append(fragmento)
+                # Solo se recuentan las palabras cuando el fragmento puede cerrar una frase
+                if palabras_objetivo and re.search(r"[.!?…]", fragmento):
+                    texto = "".join(partes)
+                    if termina_frase(texto) and contar_palabras(texto) >= palabras_objetivo:
+                        parada_temprana = True
+                        break
+            # OpenAI envía el uso en el último fragmento; Groq en x_groq
+            uso = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None) or uso
+    finally:
+        stream.close()
+
+    if metricas is not None:
+        metricas.update(extraer_metricas(None, inicio, MODELOS[proveedor], uso))
+        if metricas["tokens_respuesta"] is None:
+            # Sin uso informado, cada fragmento equivale aproximadamente a un token
+            metricas["tokens_respuesta"] = len(partes)
+        if metricas["tokens_prompt"] is None:
+            # El uso llega en el último fragmento: si se corta antes, el prompt (que el proveedor ya procesó) se estima
+            palabras = sum(contar_palabras(m["content"]) for m in mensajes)
+            metricas["tokens_prompt"] = round(palabras * PRESUPUESTO.tokens_por_palabra(MODELOS[proveedor]))
+        metricas["parada_temprana"] = parada_temprana
+    if cancelado.is_set():
+        raise GeneracionCancelada()
+    return "".join(partes).strip()
+
+
+def _texto_completo(choice) -> str:
+    """Texto de una respuesta; si se cortó por max_tokens se quita la frase a medias"""
+    texto = choice.message.content.strip()
+    return recortar_a_frase(texto) if getattr(choice, 'finish_reason', None) == "length" else texto
+
+
+def generar_post(client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str,
+                 metricas: Optional[Dict] = None, cancelado: Optional[threading.Event] = None) -> str:
+    """
+    Genera un post de LinkedIn con el proveedor indicado.
+    max_tokens sale del presupuesto de la longitud elegida. Con 'cancelado' la
+    respuesta llega en streaming, se corta en un final de frase al alcanzar el
+    máximo de palabras y puede interrumpirse (lanza GeneracionCancelada).
+    """
+    prompt = construir_prompt(noticia, estilo, tono, longitud)
+    mensajes = [
+        {"role": "system", "content": MENSAJE_SISTEMA},
+        {"role": "user", "content": prompt}
+    ]
+
+    max_tokens = PRESUPUESTO.max_tokens(longitud, MODELOS[proveedor])
+
+    if cancelado is not None:
+        return _completar_cancelable(client, proveedor, mensajes, cancelado, metricas,
+                                     palabras_objetivo=rango_palabras(longitud)[1], max_tokens=max_tokens,
+                                     temperature=0.7, **OPCIONES_PROVEEDOR.get(proveedor, {}))
+
+    inicio = time.perf_counter()
+    response = client.chat.completions.create(
+        model=MODELOS[proveedor],
+        messages=mensajes,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        **OPCIONES_PROVEEDOR.get(proveedor, {})
+    )
+
+    if metricas is not None:
+        metricas.update(extraer_metricas(response, inicio, MODELOS[proveedor]))
+
+    return _texto_completo(response.choices[0])
+
+
+def generar_variantes(client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str,
+                      num_variantes: int, metricas: Optional[Dict] = None) -> List[str]:
+    """
+    Genera varias versiones del post en una sola petición.
+    OpenAI usa el parámetro n; Groq y el servidor local no admiten n > 1, así que
+    se piden todas en la misma respuesta y se separan.
+    """
+    max_tokens = PRESUPUESTO.max_tokens(longitud, MODELOS[proveedor])
+    if proveedor == "OpenAI":
+        prompt = construir_prompt(noticia, estilo, tono, longitud)
+        opciones = {"max_tokens": max_tokens, "n": num_variantes}
+    else:
+        prompt = construir_prompt_variantes(noticia, estilo, tono, longitud, num_variantes)
+        # Unos tokens más por variante para el marcador "=== VARIANTE N ==="
+        opciones = {"max_tokens": (max_tokens + 10) * num_variantes, **OPCIONES_PROVEEDOR.get(proveedor, {})}
+
+    inicio = time.perf_counter()
+    response = client.chat.completions.create(
+        model=MODELOS[proveedor],
+        messages=[
+            {"role": "system", "content": MENSAJE_SISTEMA},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.9,
+        **opciones
+    )
+
+    if metricas is not None:
+        metricas.update(extraer_metricas(response, inicio, MODELOS[proveedor]))
+
+    if proveedor == "OpenAI":
+        return [_texto_completo(choice) for choice in response.choices]
+    variantes = separar_variantes(response.choices[0].message.content, num_variantes)
+    if getattr(response.choices[0], 'finish_reason', None) == "length" and variantes:
+        variantes[-1] = recortar_a_frase(variantes[-1])
+    return variantes
+
+
+def generar_post_estructurado(client, proveedor: str, noticia: Dict, estilo: str, tono: str, longitud: str,
+                              metricas: Optional[Dict] = None) -> Dict:
+    """
+    Genera el post como JSON (gancho, cuerpo, cta, hashtags) y lo monta.
+    Si la respuesta no es válida se hace una única llamada de reparación que
+    pide solo los campos que fallan. Devuelve los campos más "texto".
+    """
+    opciones = dict(OPCIONES_PROVEEDOR.get(proveedor, {}),
+                    response_format=salida_estructurada.FORMATO_RESPUESTA[proveedor])
+    # La reparación usa el mismo presupuesto: en el peor caso reescribe el cuerpo entero
+    max_tokens = PRESUPUESTO.max_tokens(longitud, MODELOS[proveedor]) + salida_estructurada.TOKENS_JSON
+    mensajes = [
+        {"role": "system", "content": MENSAJE_SISTEMA},
+        {"role": "user", "content": construir_prompt_estructurado(noticia, estilo, tono, longitud)}
+    ]
+
+    inicio = time.perf_counter()
+    response = client.chat.completions.create(
+        model=MODELOS[proveedor],
+        messages=mensajes,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        **opciones
+    )
+    if metricas is not None:
+        metricas.update(extraer_metricas(response, inicio, MODELOS[proveedor]))
+
+    respuesta = response.choices[0].message.content or ""
+    post, errores = salida_estructurada.validar(salida_estructurada.extraer_json(respuesta))
+    if errores:
+        inicio = time.perf_counter()
+        reparacion = client.chat.completions.create(
+            model=MODELOS[proveedor],
+            messages=[{"role": "user", "content": salida_estructurada.prompt_reparacion(respuesta, post, errores)}],
+            max_tokens=max_tokens,
+            temperature=0,
+            **opciones
+        )
+        if metricas is not None:
+            extra = extraer_metricas(reparacion, inicio, MODELOS[proveedor])
+            for clave in ("latencia_ms", "tokens_prompt", "tokens_respuesta"):
+                if extra[clave] is not None:
+                    metricas[clave] = (metricas.get(clave) or 0) + extra[clave]
+            metricas["reparaciones"] = 1
+        reparado = salida_estructurada.extraer_json(reparacion.choices[0].message.content) or {}
+        post, errores = salida_estructurada.validar(
+            reparado if not post["cuerpo"] else dict(post, **{c: reparado.get(c) for c in errores})
+        )
+        if errores:
+            raise salida_estructurada.SalidaInvalida(f"Campos sin reparar: {', '.join(errores)}")
+
+    post["texto"] = salida_estructurada.ensamblar(post)
+    return post
@@ -0,0 +1,167 @@
+"""
+Grabación anónima del tráfico real (opcional).
+
+Con GRABAR_TRAFICO=<ruta> la app añade a un JSONL compacto (gzip si la ruta
+acaba en .gz) las búsquedas que hacen los usuarios, las generaciones con su
+configuración y la latencia de cada llamada a las fuentes. Las consultas se
+anonimizan palabra a palabra con un hash con sal: se conservan las palabras
+vacías y los términos con sinónimos (no identifican a nadie) y la igualdad
+entre consultas, que es lo que determina la reutilización de cachés. Las API
+keys nunca se graban. reproducir_trafico.py reproduce el registro contra
+fuentes simuladas.
+"""
+
+import atexit
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from consultas import PALABRAS_VACIAS, SINONIMOS, raiz
+
+VERSION = 1
+
+# Argumentos que se anonimizan y los que no se graban nunca
+ARGUMENTOS_TEXTO = {"query"}
+ARGUMENTOS_OMITIDOS = {"api_key"}
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+_CONSERVADAS = set().union(*PALABRAS_VACIAS.values()) | {r for s in SINONIMOS.values() for r in s}
+
+
+class GrabadorTrafico:
+    """Añade eventos al registro de tráfico si está activado"""
+
+    def __init__(self, ruta: Optional[str] = None, sal: Optional[str] = None):
+        self.ruta = ruta
+        self.sal = (sal or os.urandom(16).hex()).encode("utf-8")
+        # La app lo sustituye por una función que devuelve el id (anónimo) de la sesión
+        self.sesion: Callable[[], str] = lambda: ""
+        self._lock = threading.Lock()
+        self._archivo = None
+        # Sin cerrar, un registro .gz queda sin el final del flujo comprimido
+        atexit.register(self.cerrar)
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.ruta)
+
+    def anonimizar(self, texto: str) -> str:
+        """Sustituye cada palabra identificable por un hash corto estable dentro del registro"""
+        def sustituir(coincidencia):
+            palabra = coincidencia.group(0)
+            if palabra.lower() in _CONSERVADAS or raiz(palabra) in _CONSERVADAS:
+                return palabra.lower()
+            return "w" + hashlib.sha256(self.sal + palabra.lower().encode("utf-8")).hexdigest()[:8]
+        return _PALABRA.sub(sustituir, texto or "")
+
+    def _escribir(self, evento: Dict) -> None:
+        evento = dict(evento, t=round(time.time(), 3))
+        linea = json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._archivo is None:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                nuevo = not os.path.exists(self.ruta)
+                abrir = gzip.open if self.ruta.endswith(".gz") else open
+                if not nuevo and abrir is gzip.open:
+                    _recuperar_gzip(self.ruta)
+                self._archivo = abrir(self.ruta, "at", encoding="utf-8")
+                if nuevo:
+                    self._archivo.write(json.dumps({"e": "cabecera", "v": VERSION}) + "\n")
+            self._archivo.write(linea)
+            self._archivo.flush()
+
+    def cerrar(self) -> None:
+        """Cierra el registro (se llama al salir del proceso)"""
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def busqueda(self, funcion: str, argumentos: Dict, latencia_ms: float, resultados: int) -> None:
+        """Llamada de un usuario a una función de noticias (incluidas las servidas desde caché)"""
+        if not self.activo:
+            return
+        args = {k: (self.anonimizar(v) if k in ARGUMENTOS_TEXTO else v)
+                for k, v in argumentos.items() if k not in ARGUMENTOS_OMITIDOS}
+        self._escribir({"e": "busqueda", "s": self.sesion(), "f": funcion, "a": args,
+                        "ms": round(latencia_ms, 1), "n": resultados})
+
+    def generacion(self, config: Dict, num_variantes: int, metricas: Dict, **modos) -> None:
+        """Generación de posts con su configuración, latencia y tokens"""
+        if not self.activo:
+            return
+        self._escribir({"e": "generacion", "s": self.sesion(), "c": config, "v": num_variantes, "m": modos,
+                        "ms": metricas.get("latencia_ms"), "tp": metricas.get("tokens_prompt"),
+                        "tr": metricas.get("tokens_respuesta")})
+
+    def fuente(self, nombre: str, latencia_ms: float, correcta: bool) -> None:
+        """Llamada real a una fuente de noticias (ver circuitos.py)"""
+        if not self.activo:
+            return
+        self._escribir({"e": "fuente", "f": nombre, "ms": round(latencia_ms, 1), "ok": correcta})
+
+    def grabar(self, funcion: Callable) -> Callable:
+        """Decorador que graba cada llamada a una función de noticias con su latencia"""
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not self.activo:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            resultado = funcion(*args, **kwargs)
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            self.busqueda(funcion.__name__, dict(argumentos.arguments),
+                          (time.perf_counter() - inicio) * 1000, len(resultado or []))
+            return resultado
+        return envoltura
+
+
+def _recuperar_gzip(ruta: str) -> None:
+    """
+    Reescribe un .gz que un proceso terminado dejó sin cerrar: si se le añade un
+    miembro nuevo detrás, lo grabado después no se puede descomprimir
+    """
+    try:
+        with gzip.open(ruta, "rb") as f:
+            while f.read(1 << 20):
+                pass
+        return
+    except EOFError:
+        pass
+    temporal = ruta + ".tmp"
+    with gzip.open(ruta, "rt", encoding="utf-8") as origen, gzip.open(temporal, "wt", encoding="utf-8") as destino:
+        try:
+            for linea in origen:
+                if linea.endswith("\n"):
+                    destino.write(linea)
+        except EOFError:
+            pass
+    os.replace(temporal, ruta)
+
+
+def leer(ruta: str) -> Iterator[Dict]:
+    """Eventos de un registro de tráfico, sin la cabecera"""
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8") as f:
+        try:
+            for linea in f:
+                if linea.strip():
+                    evento = json.loads(linea)
+                    if evento.get("e") != "cabecera":
+                        yield evento
+        except EOFError:
+            # gzip de un proceso que terminó sin cerrarlo: se lee hasta el último volcado
+            return
+
+
+# Grabador del proceso; solo escribe si se define GRABAR_TRAFICO
+GRABADOR = GrabadorTrafico(os.getenv("GRABAR_TRAFICO"), os.getenv("GRABAR_TRAFICO_SAL"))
@@ -0,0 +1,177 @@
+"""
+Historial persistente de posts generados y editados (SQLite + índice FTS5)
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    creado TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    texto TEXT NOT NULL,
+    post_origen INTEGER REFERENCES posts(id),
+    titulo_noticia TEXT,
+    url_noticia TEXT,
+    fuente TEXT,
+    estilo TEXT,
+    tono TEXT,
+    longitud TEXT,
+    proveedor TEXT,
+    modelo TEXT,
+    latencia_ms REAL,
+    tokens_prompt INTEGER,
+    tokens_respuesta INTEGER,
+    tokens_cacheados INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_creado ON posts(creado);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    texto, titulo_noticia,
+    content='posts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts(rowid, texto, titulo_noticia) VALUES (new.id, new.texto, new.titulo_noticia);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, texto, titulo_noticia) VALUES ('delete', old.id, old.texto, old.titulo_noticia);
+END;
+"""
+
+COLUMNAS = ["id", "creado", "tipo", "texto", "post_origen", "titulo_noticia", "url_noticia", "fuente",
+            "estilo", "tono", "longitud", "proveedor", "modelo", "latencia_ms", "tokens_prompt", "tokens_respuesta",
+            "tokens_cacheados"]
+
+
+class HistorialPosts:
+    """Almacén local de todos los posts generados y sus ediciones"""
+
+    def __init__(self, ruta: str = "historial_posts.db"):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        # Una conexión compartida entre los hilos de Streamlit, serializada con el lock
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+            # Historiales creados antes de registrar los tokens cacheados
+            existentes = {fila["name"] for fila in self._conexion.execute("PRAGMA table_info(posts)")}
+            if "tokens_cacheados" not in existentes:
+                self._conexion.execute("ALTER TABLE posts ADD COLUMN tokens_cacheados INTEGER")
+
+    def registrar(self, texto: str, noticia: Optional[Dict] = None, tipo: str = "generado",
+                  post_origen: Optional[int] = None, estilo: str = "", tono: str = "", longitud: str = "",
+                  proveedor: str = "", metricas: Optional[Dict] = None) -> int:
+        """
+        Guarda un post en el historial.
+
+        Args:
+            texto: Texto del post
+            noticia: Noticia de origen
+            tipo: "generado" o "editado"
+            post_origen: Id del post generado del que procede una edición
+            metricas: Latencia y uso de tokens de la llamada al LLM
+
+        Returns:
+            Id del post guardado
+        """
+        noticia = noticia or {}
+        metricas = metricas or {}
+        fila = (
+            datetime.now().isoformat(timespec="seconds"), tipo, texto, post_origen,
+            noticia.get("title", ""), noticia.get("url", ""), noticia.get("source", ""),
+            estilo, tono, longitud, proveedor, metricas.get("modelo", ""),
+            metricas.get("latencia_ms"), metricas.get("tokens_prompt"), metricas.get("tokens_respuesta"),
+            metricas.get("tokens_cacheados")
+        )
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                f"INSERT INTO posts ({', '.join(COLUMNAS[1:])}) VALUES ({', '.join('?' * len(fila))})",
+                fila
+            )
+            return cursor.lastrowid
+
+    def buscar(self, consulta: str, limite: int = 50) -> List[Dict]:
+        """Búsqueda de texto completo, ordenada por relevancia"""
+        # Cada término se trata como prefijo literal para no exponer la sintaxis de FTS5
+        terminos = [t.replace('"', '""') for t in consulta.split()]
+        if not terminos:
+            return self.recientes(limite)
+
+        expresion = " ".join(f'"{t}"*' for t in terminos)
+        with self._lock:
+            filas = self._conexion.execute(
+                """
+                SELECT posts.* FROM posts_fts
+                JOIN posts ON posts.id = posts_fts.rowid
+                WHERE posts_fts MATCH ?
+                ORDER BY bm25(posts_fts)
+                LIMIT ?
+                """,
+                (expresion, limite)
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def recientes(self, limite: int = 50) -> List[Dict]:
+        """Últimos posts guardados"""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT * FROM posts ORDER BY id DESC LIMIT ?", (limite,)
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def muestras_generacion(self, limite: int = 500) -> List[Dict]:
+        """Últimos posts generados con su modelo y tokens de respuesta (ver presupuesto.py)"""
+        with self._lock:
+            filas = self._conexion.execute(
+                """
+                SELECT creado, titulo_noticia, modelo, texto, tokens_respuesta FROM posts
+                WHERE tipo != 'editado' AND tokens_respuesta IS NOT NULL
+                ORDER BY id DESC LIMIT ?
+                """,
+                (limite,)
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Todo el historial como DataFrame"""
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM posts ORDER BY id", self._conexion)
+
+    def posts_desde(self, id_minimo: int = 0) -> pd.DataFrame:
+        """Posts con id mayor que id_minimo (exportación incremental, ver corpus.py)"""
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM posts WHERE id > ? ORDER BY id", self._conexion,
+                                     params=(id_minimo,))
+
+    def exportar_csv(self, ruta: Optional[str] = None) -> str:
+        """Exporta el historial a CSV"""
+        csv = self.a_dataframe().to_csv(index=False)
+        if ruta:
+            with open(ruta, "w", encoding="utf-8", newline="") as f:
+                f.write(csv)
+        return csv
+
+    def exportar_markdown(self, ruta: Optional[str] = None) -> str:
+        """Exporta el historial a Markdown, un apartado por post"""
+        df = self.a_dataframe()
+        bloques = ["# Historial de posts de LinkedIn\n"]
+        for fila in df.itertuples(index=False):
+            detalles = " · ".join(str(v) for v in (fila.creado, fila.tipo, fila.proveedor, fila.estilo, fila.tono) if v)
+            bloques.append(f"## {fila.titulo_noticia or 'Sin noticia'}\n\n_{detalles}_\n\n{fila.texto}\n")
+        markdown = "\n---\n\n".join(bloques)
+
+        if ruta:
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(markdown)
+        return markdown
@@ -0,0 +1,164 @@
+"""
+Proxy local de miniaturas: descarga cada imagen una sola vez, la reduce al
+ancho de visualización y la guarda en una caché en disco con límite de tamaño
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional: sin él se guarda la imagen original
+    Image = None
+
+ANCHOS_MINIATURA = (150, 180)
+
+
+class CacheImagenes:
+    """Caché de miniaturas direccionada por contenido con expulsión LRU"""
+
+    def __init__(self, directorio: str = ".cache/miniaturas", max_bytes: int = 50 * 1024 * 1024,
+                 timeout: float = 5.0, max_workers: int = 8):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._ruta_indice = os.path.join(directorio, "indice.json")
+        os.makedirs(directorio, exist_ok=True)
+        self._indice = self._cargar_indice()
+
+    def _cargar_indice(self) -> Dict[str, str]:
+        """Carga el mapa url -> hash de contenido"""
+        try:
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_indice(self) -> None:
+        tmp = self._ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f)
+        os.replace(tmp, self._ruta_indice)
+
+    def _ruta(self, hash_contenido: str, ancho: int) -> str:
+        return os.path.join(self.directorio, f"{hash_contenido}_{ancho}.jpg")
+
+    @staticmethod
+    def _redimensionar(datos: bytes, ancho: int) -> bytes:
+        """Reduce la imagen al ancho indicado manteniendo la proporción"""
+        if Image is None:
+            return datos
+
+        imagen = Image.open(io.BytesIO(datos))
+        if imagen.width > ancho:
+            alto = max(1, round(imagen.height * ancho / imagen.width))
+            imagen = imagen.resize((ancho, alto), Image.LANCZOS)
+
+        salida = io.BytesIO()
+        imagen.convert("RGB").save(salida, format="JPEG", quality=85, optimize=True)
+        return salida.getvalue()
+
+    def en_cache(self, url: str, ancho: int) -> Optional[bytes]:
+        """Devuelve la miniatura si ya está en disco, sin tocar la red"""
+        hash_contenido = self._indice.get(url)
+        if not hash_contenido:
+            return None
+
+        ruta = self._ruta(hash_contenido, ancho)
+        try:
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            os.utime(ruta)  # Marca de uso reciente para la expulsión LRU
+            return datos
+        except OSError:
+            return None
+
+    def obtener(self, url: str, anchos: Iterable[int] = ANCHOS_MINIATURA) -> Dict[int, bytes]:
+        """
+        Descarga la imagen (si no está en caché) y genera las miniaturas de cada ancho
+        """
+        anchos = tuple(anchos)
+        resultado = {}
+        for ancho in anchos:
+            datos = self.en_cache(url, ancho)
+            if datos is not None:
+                resultado[ancho] = datos
+        if len(resultado) == len(anchos):
+            return resultado
+
+        try:
+            response = requests.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            original = response.content
+            hash_contenido = hashlib.sha256(original).hexdigest()
+
+            for ancho in anchos:
+                if ancho in resultado:
+                    continue
+                ruta = self._ruta(hash_contenido, ancho)
+                if not os.path.exists(ruta):
+                    with open(ruta + ".tmp", "wb") as f:
+                        f.write(self._redimensionar(original, ancho))
+                    os.replace(ruta + ".tmp", ruta)
+                with open(ruta, "rb") as f:
+                    resultado[ancho] = f.read()
+        except Exception:
+            return resultado
+
+        with self._lock:
+            self._indice[url] = hash_contenido
+            self._guardar_indice()
+            self._expulsar()
+
+        return resultado
+
+    def miniatura(self, url: str, ancho: int) -> Optional[bytes]:
+        """Devuelve la miniatura de un ancho concreto, descargándola si hace falta"""
+        datos = self.en_cache(url, ancho)
+        if datos is None:
+            datos = self.obtener(url).get(ancho)
+        return datos
+
+    def precargar(self, urls: Iterable[str], anchos: Iterable[int] = ANCHOS_MINIATURA) -> None:
+        """Descarga en paralelo las miniaturas de una lista de resultados"""
+        pendientes = list(dict.fromkeys(url for url in urls if url and url not in self._indice))
+        if not pendientes:
+            return
+
+        anchos = tuple(anchos)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda url: self.obtener(url, anchos), pendientes))
+
+    def tamano_total(self) -> int:
+        """Bytes ocupados por las miniaturas en disco"""
+        return sum(e.stat().st_size for e in os.scandir(self.directorio) if e.name.endswith(".jpg"))
+
+    def _expulsar(self) -> None:
+        """Elimina las miniaturas menos usadas hasta respetar max_bytes"""
+        entradas = [e for e in os.scandir(self.directorio) if e.name.endswith(".jpg")]
+        total = sum(e.stat().st_size for e in entradas)
+        if total <= self.max_bytes:
+            return
+
+        entradas.sort(key=lambda e: e.stat().st_mtime)
+        eliminados = set()
+        for entrada in entradas:
+            if total <= self.max_bytes:
+                break
+            total -= entrada.stat().st_size
+            os.remove(entrada.path)
+            eliminados.add(entrada.name.rsplit("_", 1)[0])
+
+        # Olvida las URLs cuyo contenido ya no tiene ninguna miniatura en disco
+        restantes = {e.name.rsplit("_", 1)[0] for e in os.scandir(self.directorio) if e.name.endswith(".jpg")}
+        self._indice = {url: h for url, h in self._indice.items() if h not in eliminados or h in restantes}
+        self._guardar_indice()
@@ -0,0 +1,189 @@
+"""
+Ingesta incremental con marcas de agua por fuente.
+
+Para cada fuente y consulta se guarda la fecha de publicación más reciente vista,
+los identificadores ya procesados y los últimos artículos normalizados. Así las
+siguientes peticiones solo piden lo publicado desde la marca (cuando la API lo
+permite) y no vuelven a normalizar lo que ya se conoce. Cada fuente y consulta es
+una fila de SQLite: tras una búsqueda solo se reescribe la suya.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+
+def parsear_fecha(texto: str) -> Optional[datetime]:
+    """Convierte fechas ISO 8601 o RFC 822 (RSS) a datetime con zona horaria"""
+    if not texto:
+        return None
+    try:
+        fecha = datetime.fromisoformat(texto.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            fecha = parsedate_to_datetime(texto)
+        except (TypeError, ValueError):
+            return None
+    return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
+
+
+def vigentes(articulos: List[Dict], ventana_dias: Optional[int]) -> List[Dict]:
+    """Artículos publicados dentro de los últimos ventana_dias (los que no tienen fecha se conservan)"""
+    if ventana_dias is None:
+        return articulos
+    limite = datetime.now(timezone.utc) - timedelta(days=ventana_dias)
+    resultado = []
+    for articulo in articulos:
+        fecha = parsear_fecha(articulo.get("publishedAt", ""))
+        if fecha is None or fecha >= limite:
+            resultado.append(articulo)
+    return resultado
+
+
+class RegistroIncremental:
+    """Marcas de agua, identificadores vistos y últimos artículos por fuente"""
+
+    def __init__(self, ruta: str = ".cache/marcas_agua.db", max_vistos: int = 2000,
+                 max_articulos: int = 100, max_claves: int = 500):
+        self.ruta = ruta
+        self.max_vistos = max_vistos
+        self.max_articulos = max_articulos
+        self.max_claves = max_claves
+        self._lock = threading.Lock()
+        # La escritura en disco va fuera de self._lock para no bloquear a las demás fuentes
+        self._lock_disco = threading.Lock()
+        # La base de datos se abre en el primer uso: importar el módulo no crea ficheros
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._estados: Optional[Dict[str, Dict]] = None
+        # Número de uso creciente: orden LRU y orden de las escrituras de una misma clave
+        self._uso = 0
+
+    def _abrir(self) -> None:
+        """Carga las marcas de la base de datos (con self._lock tomado)"""
+        if self._estados is not None:
+            return
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        with self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS marcas (clave TEXT PRIMARY KEY, estado TEXT NOT NULL, uso INTEGER NOT NULL)"
+            )
+        filas = self._conexion.execute("SELECT clave, estado FROM marcas ORDER BY uso").fetchall()
+        self._estados = {clave: json.loads(estado) for clave, estado in filas}
+        self._uso = self._conexion.execute("SELECT COALESCE(MAX(uso), 0) FROM marcas").fetchone()[0]
+
+    def _guardar(self, clave: str, estado: Dict, uso: int, desalojadas: List[str]) -> None:
+        fila = json.dumps(estado, ensure_ascii=False)
+        with self._lock_disco, self._conexion:
+            # Si otra búsqueda de la misma clave ya escribió un estado posterior, no se pisa
+            self._conexion.execute(
+                """
+                INSERT INTO marcas (clave, estado, uso) VALUES (?, ?, ?)
+                ON CONFLICT(clave) DO UPDATE SET estado = excluded.estado, uso = excluded.uso
+                WHERE excluded.uso > marcas.uso
+                """,
+                (clave, fila, uso)
+            )
+            self._conexion.executemany("DELETE FROM marcas WHERE clave = ? AND uso < ?",
+                                       [(vieja, uso) for vieja in desalojadas])
+
+    @staticmethod
+    def _clave(fuente: str, consulta: str) -> str:
+        return f"{fuente}|{consulta}"
+
+    def _estado(self, fuente: str, consulta: str) -> Dict:
+        self._abrir()
+        return self._estados.get(self._clave(fuente, consulta), {"marca": "", "vistos": [], "articulos": []})
+
+    def marca(self, fuente: str, consulta: str) -> Optional[datetime]:
+        """Fecha de publicación más reciente vista para la fuente y consulta"""
+        with self._lock:
+            return parsear_fecha(self._estado(fuente, consulta)["marca"])
+
+    def desde(self, fuente: str, consulta: str, num_articulos: int, ventana_dias: int = 7) -> Optional[datetime]:
+        """
+        Fecha desde la que pedir novedades, o None si hace falta una descarga completa
+        (primera vez, o se piden más artículos de los que siguen dentro de la ventana)
+        """
+        with self._lock:
+            estado = self._estado(fuente, consulta)
+            if len(vigentes(estado["articulos"], ventana_dias)) < num_articulos:
+                return None
+            marca = parsear_fecha(estado["marca"])
+        if marca is None:
+            return None
+        return max(marca, datetime.now(timezone.utc) - timedelta(days=ventana_dias))
+
+    def conocidos(self, fuente: str, consulta: str) -> set:
+        """Identificadores ya procesados (se usan para no volver a normalizar entradas)"""
+        with self._lock:
+            return set(self._estado(fuente, consulta)["vistos"])
+
+    def dato(self, fuente: str, consulta: str, nombre: str, defecto=None):
+        """Dato auxiliar guardado junto a la marca (p. ej. ETag de un feed)"""
+        with self._lock:
+            return self._estado(fuente, consulta).get(nombre, defecto)
+
+    def fusionar(self, fuente: str, consulta: str, nuevos: List[Dict], ids_nuevos: List[str],
+                 num_articulos: Optional[int] = None, ventana_dias: Optional[int] = None,
+                 orden: Optional[List[str]] = None, **datos) -> List[Dict]:
+        """
+        Añade los artículos nuevos a los ya conocidos, avanza la marca de agua y
+        devuelve los num_articulos más recientes (los nuevos primero).
+
+        Con ventana_dias se descartan los artículos publicados antes de la ventana.
+        Con orden (las URLs de la respuesta en el orden de la API) se respeta ese
+        orden, p. ej. el de relevancia, en lugar de poner primero los nuevos.
+        """
+        with self._lock:
+            clave = self._clave(fuente, consulta)
+            estado = self._estado(fuente, consulta)
+
+            urls = set()
+            articulos = []
+            for articulo in nuevos + estado["articulos"]:
+                url = articulo.get("url") or articulo.get("title")
+                if url not in urls:
+                    urls.add(url)
+                    articulos.append(articulo)
+            articulos = vigentes(articulos, ventana_dias)
+            if orden is not None:
+                rango = {url: i for i, url in enumerate(orden)}
+                articulos.sort(key=lambda a: rango.get(a.get("url") or a.get("title"), len(rango)))
+
+            fechas = [f for f in (parsear_fecha(a.get("publishedAt", "")) for a in nuevos) if f]
+            marca = parsear_fecha(estado["marca"])
+            if fechas and (marca is None or max(fechas) > marca):
+                marca = max(fechas)
+
+            vistos = list(dict.fromkeys(ids_nuevos + estado["vistos"]))[:self.max_vistos]
+            # Reinsertar la clave la mueve al final: el orden del dict sirve de LRU
+            self._estados.pop(clave, None)
+            # Los estados se sustituyen, nunca se modifican: se puede serializar fuera del lock
+            nuevo = self._estados[clave] = dict(
+                estado,
+                marca=marca.isoformat() if marca else "",
+                vistos=vistos,
+                articulos=articulos[:self.max_articulos],
+                **datos
+            )
+            desalojadas = []
+            while len(self._estados) > self.max_claves:
+                vieja = next(iter(self._estados))
+                self._estados.pop(vieja)
+                desalojadas.append(vieja)
+            self._uso += 1
+            uso = self._uso
+
+        self._guardar(clave, nuevo, uso, desalojadas)
+
+        return articulos[:num_articulos] if num_articulos else articulos
+
+
+# Registro compartido por las funciones de noticias del proceso
+REGISTRO = RegistroIncremental()
@@ -0,0 +1,197 @@
+"""
+Generación masiva de posts con las Batch API de OpenAI y Groq.
+
+Las peticiones se escriben en un JSONL, se envían al endpoint asíncrono del
+proveedor (precio de lote y sin consumir la cuota interactiva), se espera a que
+termine el lote y los resultados se guardan en el historial de posts.
+
+Uso:
+    python lotes.py trabajos.json --proveedor Groq
+    python lotes.py trabajos.json --proveedor Groq --base-url http://127.0.0.1:8600  # servidor local de pruebas
+
+trabajos.json es una lista de objetos con "noticia", "estilo", "tono" y "longitud".
+"""
+
+import argparse
+import io
+import json
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from generacion import MODELOS, MENSAJE_SISTEMA, construir_prompt, crear_cliente, ratio_cache, tokens_cacheados
+from historial import HistorialPosts
+from presupuesto import PRESUPUESTO
+
+ENDPOINT = "/v1/chat/completions"
+ESTADOS_FINALES = {"completed", "failed", "expired", "cancelled"}
+
+
+def crear_peticiones(trabajos: List[Dict], proveedor: str, max_tokens: Optional[int] = None,
+                     temperature: float = 0.7) -> List[Dict]:
+    """
+    Convierte los trabajos en líneas de petición del formato Batch.
+    Sin max_tokens, cada petición usa el presupuesto de su longitud.
+    Se agrupan por estilo, tono y longitud para que las peticiones con el mismo
+    prefijo de prompt vayan seguidas y aprovechen la caché del proveedor.
+    """
+    peticiones = []
+    orden = sorted(range(len(trabajos)),
+                   key=lambda i: (trabajos[i]["estilo"], trabajos[i]["tono"], trabajos[i]["longitud"]))
+    for i in orden:
+        trabajo = trabajos[i]
+        prompt = construir_prompt(trabajo["noticia"], trabajo["estilo"], trabajo["tono"], trabajo["longitud"])
+        peticiones.append({
+            "custom_id": trabajo.get("id", f"post-{i}"),
+            "method": "POST",
+            "url": ENDPOINT,
+            "body": {
+                "model": MODELOS[proveedor],
+                "messages": [
+                    {"role": "system", "content": MENSAJE_SISTEMA},
+                    {"role": "user", "content": prompt}
+                ],
+                "max_tokens": max_tokens or PRESUPUESTO.max_tokens(trabajo["longitud"], MODELOS[proveedor]),
+                "temperature": temperature
+            }
+        })
+    return peticiones
+
+
+def escribir_jsonl(peticiones: List[Dict], ruta: Optional[str] = None) -> bytes:
+    """Serializa las peticiones en JSONL (y las guarda si se indica ruta)"""
+    contenido = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in peticiones).encode("utf-8")
+    if ruta:
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+    return contenido
+
+
+def enviar_lote(client, contenido: bytes, descripcion: str = "") -> str:
+    """Sube el JSONL y crea el lote. Devuelve el id del lote"""
+    archivo = client.files.create(file=("lote.jsonl", io.BytesIO(contenido)), purpose="batch")
+    opciones = {"metadata": {"descripcion": descripcion}} if descripcion else {}
+    lote = client.batches.create(
+        input_file_id=archivo.id,
+        endpoint=ENDPOINT,
+        completion_window="24h",
+        **opciones
+    )
+    return lote.id
+
+
+def esperar_lote(client, lote_id: str, intervalo: float = 60.0, timeout: float = 24 * 3600):
+    """Consulta el estado del lote hasta que termina"""
+    limite = time.monotonic() + timeout
+    while True:
+        lote = client.batches.retrieve(lote_id)
+        if lote.status in ESTADOS_FINALES:
+            return lote
+        if time.monotonic() > limite:
+            raise TimeoutError(f"El lote {lote_id} sigue en estado '{lote.status}'")
+        time.sleep(intervalo)
+
+
+def descargar_resultados(client, lote) -> Dict[str, Dict]:
+    """
+    Descarga la salida del lote.
+
+    Returns:
+        Diccionario custom_id -> {"texto", "uso"} o {"error"}
+    """
+    resultados = {}
+    for file_id in (lote.output_file_id, getattr(lote, "error_file_id", None)):
+        if not file_id:
+            continue
+        for linea in client.files.content(file_id).read().decode("utf-8").splitlines():
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            respuesta = registro.get("response") or {}
+            cuerpo = respuesta.get("body") or {}
+            if respuesta.get("status_code") == 200 and cuerpo.get("choices"):
+                resultados[registro["custom_id"]] = {
+                    "texto": cuerpo["choices"][0]["message"]["content"].strip(),
+                    "uso": cuerpo.get("usage", {})
+                }
+            else:
+                resultados[registro["custom_id"]] = {"error": registro.get("error") or cuerpo.get("error")}
+    return resultados
+
+
+def fusionar_en_historial(historial: HistorialPosts, trabajos: List[Dict], resultados: Dict[str, Dict],
+                          proveedor: str) -> int:
+    """Guarda en el historial los posts generados por el lote"""
+    guardados = 0
+    for i, trabajo in enumerate(trabajos):
+        resultado = resultados.get(trabajo.get("id", f"post-{i}"), {})
+        if not resultado.get("texto"):
+            continue
+        uso = resultado.get("uso", {})
+        historial.registrar(
+            resultado["texto"],
+            trabajo["noticia"],
+            estilo=trabajo["estilo"],
+            tono=trabajo["tono"],
+            longitud=trabajo["longitud"],
+            proveedor=f"{proveedor} (lote)",
+            metricas={
+                "modelo": MODELOS[proveedor],
+                "tokens_prompt": uso.get("prompt_tokens"),
+                "tokens_respuesta": uso.get("completion_tokens"),
+                "tokens_cacheados": tokens_cacheados(uso)
+            }
+        )
+        guardados += 1
+    return guardados
+
+
+def generar_en_lote(trabajos: List[Dict], proveedor: str = "Groq", client=None,
+                    historial: Optional[HistorialPosts] = None, intervalo: float = 60.0) -> Dict[str, Dict]:
+    """Ejecuta el ciclo completo: JSONL, envío, espera y fusión en el historial"""
+    client = client or crear_cliente(proveedor)
+    historial = historial or HistorialPosts()
+    PRESUPUESTO.conectar(historial)
+    lote_id = enviar_lote(client, escribir_jsonl(crear_peticiones(trabajos, proveedor)),
+                          descripcion=f"{len(trabajos)} posts de LinkedIn")
+    lote = esperar_lote(client, lote_id, intervalo=intervalo)
+    resultados = descargar_resultados(client, lote)
+    fusionar_en_historial(historial, trabajos, resultados, proveedor)
+    return resultados
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Genera posts de LinkedIn en lote")
+    parser.add_argument("trabajos", help="JSON con la lista de trabajos")
+    parser.add_argument("--proveedor", choices=["OpenAI", "Groq"], default="Groq")
+    parser.add_argument("--base-url", help="URL alternativa del proveedor (p. ej. el servidor local)")
+    parser.add_argument("--intervalo", type=float, default=60.0, help="Segundos entre consultas de estado")
+    parser.add_argument("--guardar-jsonl", help="Guarda también el JSONL enviado")
+    args = parser.parse_args()
+
+    with open(args.trabajos, encoding="utf-8") as f:
+        trabajos = json.load(f)
+
+    if args.guardar_jsonl:
+        escribir_jsonl(crear_peticiones(trabajos, args.proveedor), args.guardar_jsonl)
+
+    client = crear_cliente(args.proveedor, base_url=args.base_url)
+    print(f"📦 Enviando {len(trabajos)} trabajos a {args.proveedor}...")
+    resultados = generar_en_lote(trabajos, args.proveedor, client=client, intervalo=args.intervalo)
+
+    correctos = sum(1 for r in resultados.values() if r.get("texto"))
+    print(f"✅ {correctos}/{len(trabajos)} posts generados y guardados en el historial")
+
+    ratio = ratio_cache([
+        {"tokens_prompt": r["uso"].get("prompt_tokens"), "tokens_cacheados": tokens_cacheados(r["uso"])}
+        for r in resultados.values() if r.get("uso")
+    ])
+    if ratio is not None:
+        print(f"⚡ Tokens de prompt servidos desde caché: {ratio:.0%}")
+
+
+if __name__ == "__main__":
+    main()
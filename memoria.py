@@ -0,0 +1,234 @@
+"""
+Límites y diagnóstico de memoria para instancias de larga duración.
+
+Las cachés de las funciones de noticias (st.cache_data) guardan una entrada
+por cada combinación de consulta, número de artículos e idioma, y cada sesión
+guarda en st.session_state sus noticias, variantes y posts. En una instancia
+compartida que no se reinicia ambas cosas solo crecen. Este módulo:
+
+- Contabiliza los bytes de cada entrada de las cachés (su tamaño serializado,
+  que es lo que guarda st.cache_data) y desaloja las menos usadas al superar
+  el máximo de entradas o de bytes.
+- Acota los bytes del estado de cada sesión y vacía el de las sesiones que
+  llevan demasiado tiempo inactivas.
+- Toma instantáneas de tracemalloc bajo demanda para la vista de diagnóstico.
+
+Límites configurables por entorno: CACHE_MAX_ENTRADAS, CACHE_MAX_MB,
+SESION_MAX_MB y SESION_INACTIVA_MIN.
+"""
+
+import functools
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, List, MutableMapping, Optional
+
+MAX_ENTRADAS_CACHE = int(os.getenv("CACHE_MAX_ENTRADAS", "64"))
+MAX_BYTES_CACHE = int(float(os.getenv("CACHE_MAX_MB", "64")) * 2 ** 20)
+MAX_BYTES_SESION = int(float(os.getenv("SESION_MAX_MB", "16")) * 2 ** 20)
+SESION_INACTIVA_S = float(os.getenv("SESION_INACTIVA_MIN", "30")) * 60
+
+# Claves del estado de sesión que se pueden descartar, de la más fácil de
+# recalcular a la que más se nota perder
+CLAVES_DESECHABLES = ("temas", "variantes", "variantes_ids", "ultima_edicion", "noticias", "pagina_noticias",
+                      "noticia_seleccionada", "post_generado", "post_id", "config_post")
+
+
+def tamano_bytes(valor) -> int:
+    """Bytes del valor serializado (aproximación con sys.getsizeof si no se puede serializar)"""
+    try:
+        return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(valor)
+
+
+class CachesAcotadas:
+    """
+    Contabilidad por entrada de varias funciones con st.cache_data y
+    desalojo LRU (con .clear(*args)) al superar los límites de cada una
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_CACHE, max_bytes: int = MAX_BYTES_CACHE,
+                 ttl: float = 3600.0):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # nombre -> clave -> (caduca, bytes, args, kwargs)
+        self._entradas: Dict[str, "OrderedDict[Hashable, tuple]"] = {}
+        self._desalojos = Counter()
+
+    def acotar(self, funcion: Callable) -> Callable:
+        """Decorador para colocar sobre @st.cache_data"""
+        nombre = getattr(funcion, "__name__", repr(funcion))
+        with self._lock:
+            self._entradas.setdefault(nombre, OrderedDict())
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            resultado = funcion(*args, **kwargs)
+            clave = (args, tuple(kwargs.items()))
+            ahora = time.monotonic()
+            with self._lock:
+                entradas = self._entradas[nombre]
+                # Las entradas caducadas ya no están en la caché de Streamlit
+                for vieja in [c for c, e in entradas.items() if e[0] < ahora]:
+                    del entradas[vieja]
+                if clave in entradas:
+                    entradas.move_to_end(clave)
+                    return resultado
+                entradas[clave] = (ahora + self.ttl, tamano_bytes(resultado), args, kwargs)
+                sobrantes = []
+                total = sum(e[1] for e in entradas.values())
+                while len(entradas) > 1 and (len(entradas) > self.max_entradas or total > self.max_bytes):
+                    _, (_, tamano, args_viejos, kwargs_viejos) = entradas.popitem(last=False)
+                    total -= tamano
+                    sobrantes.append((args_viejos, kwargs_viejos))
+                self._desalojos[nombre] += len(sobrantes)
+            for args_viejos, kwargs_viejos in sobrantes:
+                funcion.clear(*args_viejos, **kwargs_viejos)
+            return resultado
+        return envoltura
+
+    def estadisticas(self) -> Dict[str, Dict]:
+        """Entradas, bytes y desalojos de cada caché"""
+        with self._lock:
+            return {nombre: {"entradas": len(entradas), "bytes": sum(e[1] for e in entradas.values()),
+                             "desalojos": self._desalojos[nombre]}
+                    for nombre, entradas in self._entradas.items()}
+
+
+class SesionesAcotadas:
+    """Límite de bytes por sesión y vaciado de las sesiones inactivas"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES_SESION, inactiva_s: float = SESION_INACTIVA_S):
+        self.max_bytes = max_bytes
+        self.inactiva_s = inactiva_s
+        self._lock = threading.Lock()
+        # id de sesión -> (última actividad, referencia débil a su estado, bytes medidos)
+        self._sesiones: Dict[str, tuple] = {}
+        # id de sesión -> clave -> (firma del valor, bytes): solo se vuelve a serializar lo que cambia
+        self._medidas: Dict[str, Dict[str, tuple]] = {}
+        self._estadisticas = Counter()
+
+    def tocar(self, id_sesion: str, estado: MutableMapping) -> None:
+        """Registra actividad de la sesión al empezar cada ejecución del script"""
+        with self._lock:
+            anterior = self._sesiones.get(id_sesion)
+            self._sesiones[id_sesion] = (time.monotonic(), weakref.ref(estado), anterior[2] if anterior else 0)
+
+    def acotar(self, id_sesion: str, estado: MutableMapping) -> List[str]:
+        """
+        Descarta claves desechables del estado de la sesión hasta que quepa en
+        max_bytes; devuelve las claves descartadas. Se llama en cada ejecución
+        del script, así que solo se serializan los valores nuevos o cambiados
+        """
+        with self._lock:
+            medidas = self._medidas.setdefault(id_sesion, {})
+        tamanos = {}
+        for clave in CLAVES_DESECHABLES:
+            if clave not in estado:
+                medidas.pop(clave, None)
+                continue
+            valor = estado[clave]
+            firma = (id(valor), len(valor) if hasattr(valor, "__len__") else None)
+            if clave not in medidas or medidas[clave][0] != firma:
+                medidas[clave] = (firma, tamano_bytes(valor))
+            tamanos[clave] = medidas[clave][1]
+        total = sum(tamanos.values())
+        descartadas = []
+        for clave in CLAVES_DESECHABLES:
+            if total <= self.max_bytes:
+                break
+            if clave in tamanos:
+                del estado[clave]
+                medidas.pop(clave, None)
+                total -= tamanos[clave]
+                descartadas.append(clave)
+        with self._lock:
+            if id_sesion in self._sesiones:
+                self._sesiones[id_sesion] = self._sesiones[id_sesion][:2] + (total,)
+            self._estadisticas["claves_descartadas"] += len(descartadas)
+        return descartadas
+
+    def desalojar_inactivas(self) -> int:
+        """Vacía el estado de las sesiones inactivas más de inactiva_s; devuelve cuántas"""
+        limite = time.monotonic() - self.inactiva_s
+        with self._lock:
+            inactivas = [(i, s[1]) for i, s in self._sesiones.items() if s[0] < limite or s[1]() is None]
+            for id_sesion, _ in inactivas:
+                del self._sesiones[id_sesion]
+                self._medidas.pop(id_sesion, None)
+        desalojadas = 0
+        for _, referencia in inactivas:
+            estado = referencia()
+            if estado is None:
+                continue
+            for clave in CLAVES_DESECHABLES:
+                if clave in estado:
+                    del estado[clave]
+            desalojadas += 1
+        with self._lock:
+            self._estadisticas["desalojadas"] += desalojadas
+        return desalojadas
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Sesiones activas, bytes medidos en total y desalojos"""
+        with self._lock:
+            return dict(self._estadisticas, sesiones=len(self._sesiones),
+                        bytes=sum(s[2] for s in self._sesiones.values()))
+
+
+class DiagnosticoMemoria:
+    """Instantáneas de tracemalloc con el crecimiento desde la anterior"""
+
+    def __init__(self, marcos: int = 10):
+        self.marcos = marcos
+        self._anterior: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def iniciar(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.marcos)
+
+    def detener(self) -> None:
+        with self._lock:
+            self._anterior = None
+        tracemalloc.stop()
+
+    def instantanea(self, top: int = 15) -> Dict:
+        """Memoria trazada total y pico, y las líneas que más memoria ocupan y más han crecido"""
+        if not tracemalloc.is_tracing():
+            return {}
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        actual = tracemalloc.take_snapshot().filter_traces(filtros)
+        with self._lock:
+            anterior, self._anterior = self._anterior, actual
+        trazada, pico = tracemalloc.get_traced_memory()
+
+        def fila(estadistica) -> Dict:
+            marco = estadistica.traceback[0]
+            return {"linea": f"{marco.filename}:{marco.lineno}", "bytes": estadistica.size,
+                    "crecimiento": getattr(estadistica, "size_diff", 0), "bloques": estadistica.count}
+
+        return {
+            "trazada": trazada,
+            "pico": pico,
+            "mayores": [fila(e) for e in actual.statistics("lineno")[:top]],
+            "crecimiento": [fila(e) for e in actual.compare_to(anterior, "lineno")[:top]] if anterior else [],
+        }
+
+
+# Instancias del proceso, compartidas por todas las sesiones de la app
+CACHES = CachesAcotadas()
+SESIONES = SesionesAcotadas()
+DIAGNOSTICO = DiagnosticoMemoria()
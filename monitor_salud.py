@@ -0,0 +1,313 @@
+"""
+Monitor continuo de la salud de las fuentes de noticias y los proveedores LLM.
+
+Cada intervalo sondea a la vez todas las fuentes y proveedores configurados con
+peticiones ligeras (una noticia, solo las cabeceras de los feeds, la lista de
+modelos en lugar de una generación) y guarda por sonda un histograma de
+latencias, los recuentos de éxitos y fallos y los últimos resultados para la
+disponibilidad en el tiempo. Las métricas se exponen en formato Prometheus
+(GET /metrics) y como estado para el sidebar.
+
+Todas las URLs se pueden redirigir a servidor_fuentes_local.py para probarlo
+sin red ni API keys.
+
+Uso:
+    python monitor_salud.py                      # una comprobación y sale
+    python monitor_salud.py --puerto 9101        # comprueba cada 60 s y sirve /metrics
+    python monitor_salud.py --simulado --fallar newsapi
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from generacion import URL_LOCAL
+
+URLS = {
+    "guardian": "https://content.guardianapis.com",
+    "newsapi": "https://newsapi.org",
+    "google": "https://news.google.com",
+    "bbc": "http://feeds.bbci.co.uk",
+    "openai": "https://api.openai.com",
+    "groq": "https://api.groq.com/openai",
+}
+
+# Límites superiores (s) de las cubetas del histograma de latencias
+CUBETAS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+NOMBRES = {"guardian": "The Guardian", "newsapi": "NewsAPI", "google": "Google News", "bbc": "BBC RSS",
+           "openai": "OpenAI", "groq": "Groq", "local": "LLM local", "backend": "Backend"}
+
+
+def clave_configurada(variable: str, entorno: Optional[Mapping[str, str]] = None) -> bool:
+    """Indica si la variable tiene una API key real (no el valor de ejemplo de .env)"""
+    valor = (entorno if entorno is not None else os.environ).get(variable, "")
+    return bool(valor) and not (valor.startswith("tu_") and valor.endswith("_aqui"))
+
+
+class Sonda:
+    """Petición ligera que indica si una fuente o proveedor responde"""
+
+    def __init__(self, nombre: str, tipo: str, url: str, params: Optional[Dict] = None,
+                 cabeceras: Optional[Dict] = None):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.url = url
+        self.params = params or {}
+        self.cabeceras = cabeceras or {}
+
+    def ejecutar(self, sesion: requests.Session, timeout: float) -> Dict:
+        """Resultado de la sonda: correcta, latencia hasta las cabeceras y error"""
+        inicio = time.perf_counter()
+        try:
+            # stream: no se descarga el cuerpo, basta con el estado
+            with sesion.get(self.url, params=self.params, headers=self.cabeceras, timeout=timeout,
+                            stream=True) as respuesta:
+                latencia = time.perf_counter() - inicio
+                if respuesta.status_code >= 400:
+                    return {"ok": False, "latencia": latencia, "error": f"HTTP {respuesta.status_code}"}
+                return {"ok": True, "latencia": latencia, "error": ""}
+        except requests.RequestException as e:
+            # Solo el tipo: el mensaje incluye la URL y con ella la API key de The Guardian
+            return {"ok": False, "latencia": time.perf_counter() - inicio, "error": type(e).__name__}
+
+
+def crear_sondas(entorno: Optional[Mapping[str, str]] = None, urls: Optional[Dict[str, str]] = None) -> List[Sonda]:
+    """Sondas de las fuentes gratuitas y de las fuentes y proveedores con API key configurada"""
+    entorno = entorno if entorno is not None else os.environ
+    urls = dict(URLS, **(urls or {}))
+    sondas = [
+        Sonda("google", "noticias", f"{urls['google']}/rss", {"hl": "es", "gl": "ES", "ceid": "ES:es"}),
+        Sonda("bbc", "noticias", f"{urls['bbc']}/news/rss.xml"),
+    ]
+    if clave_configurada("GUARDIAN_API_KEY", entorno):
+        sondas.append(Sonda("guardian", "noticias", f"{urls['guardian']}/search",
+                            {"api-key": entorno["GUARDIAN_API_KEY"], "page-size": 1}))
+    if clave_configurada("NEWSAPI_KEY", entorno):
+        sondas.append(Sonda("newsapi", "noticias", f"{urls['newsapi']}/v2/top-headlines",
+                            {"country": "us", "pageSize": 1}, {"X-Api-Key": entorno["NEWSAPI_KEY"]}))
+    for nombre, variable in (("openai", "OPENAI_API_KEY"), ("groq", "GROQ_API_KEY")):
+        if clave_configurada(variable, entorno):
+            sondas.append(Sonda(nombre, "llm", f"{urls[nombre]}/v1/models",
+                                cabeceras={"Authorization": f"Bearer {entorno[variable]}"}))
+    if entorno.get("LOCAL_LLM_URL") or "local" in urls:
+        sondas.append(Sonda("local", "llm", f"{urls.get('local', entorno.get('LOCAL_LLM_URL', URL_LOCAL))}/v1/models"))
+    if entorno.get("BACKEND_URL") or "backend" in urls:
+        sondas.append(Sonda("backend", "backend", f"{urls.get('backend', entorno.get('BACKEND_URL'))}/salud"))
+    return sondas
+
+
+class RegistroSonda:
+    """Histograma de latencias, recuentos y últimos resultados de una sonda"""
+
+    def __init__(self, historial: int = 1440):
+        self.cubetas = [0] * len(CUBETAS)
+        self.suma = 0.0
+        self.correctas = 0
+        self.fallidas = 0
+        self.ultimo: Optional[Dict] = None
+        # (instante, correcta, latencia) de las últimas comprobaciones
+        self.resultados = deque(maxlen=historial)
+
+    def anotar(self, resultado: Dict) -> None:
+        latencia = resultado["latencia"]
+        for i, limite in enumerate(CUBETAS):
+            if latencia <= limite:
+                self.cubetas[i] += 1
+        self.suma += latencia
+        if resultado["ok"]:
+            self.correctas += 1
+        else:
+            self.fallidas += 1
+        self.ultimo = dict(resultado, instante=time.time())
+        self.resultados.append((self.ultimo["instante"], resultado["ok"], latencia))
+
+    def disponibilidad(self, ventana_s: float) -> Optional[float]:
+        """Proporción de comprobaciones correctas en los últimos ventana_s segundos"""
+        desde = time.time() - ventana_s
+        recientes = [ok for instante, ok, _ in self.resultados if instante >= desde]
+        return sum(recientes) / len(recientes) if recientes else None
+
+
+class MonitorSalud:
+    """Sondea todas las fuentes a la vez cada 'intervalo' segundos en un hilo de fondo"""
+
+    def __init__(self, sondas: List[Sonda], intervalo: float = 60.0, timeout: float = 5.0):
+        self.sondas = sondas
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.registros = {sonda.nombre: RegistroSonda() for sonda in sondas}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._sesion = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(sondas)), thread_name_prefix="sonda")
+
+    def comprobar(self) -> Dict[str, Dict]:
+        """Ejecuta todas las sondas en paralelo y anota sus resultados"""
+        futuros = {sonda.nombre: self._executor.submit(sonda.ejecutar, self._sesion, self.timeout)
+                   for sonda in self.sondas}
+        resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+        with self._lock:
+            for nombre, resultado in resultados.items():
+                self.registros[nombre].anotar(resultado)
+        return resultados
+
+    def _bucle(self) -> None:
+        self.comprobar()
+        while not self._parar.wait(self.intervalo):
+            self.comprobar()
+
+    def iniciar(self) -> "MonitorSalud":
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, daemon=True, name="monitor-salud")
+            self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(self.timeout + 1)
+            self._hilo = None
+        self._executor.shutdown(wait=False)
+
+    def estado(self) -> Dict[str, Dict]:
+        """Último resultado y disponibilidad de la última hora y del último día por sonda"""
+        tipos = {sonda.nombre: sonda.tipo for sonda in self.sondas}
+        with self._lock:
+            estado = {}
+            for nombre, registro in self.registros.items():
+                ultimo = registro.ultimo or {}
+                estado[nombre] = {
+                    "tipo": tipos[nombre],
+                    "ok": ultimo.get("ok"),
+                    "latencia_ms": round(ultimo["latencia"] * 1000, 1) if ultimo else None,
+                    "error": ultimo.get("error", ""),
+                    "comprobado": ultimo.get("instante"),
+                    "disponibilidad_1h": registro.disponibilidad(3600),
+                    "disponibilidad_24h": registro.disponibilidad(86400),
+                }
+            return estado
+
+    def prometheus(self) -> str:
+        """Métricas en el formato de texto de Prometheus"""
+        tipos = {sonda.nombre: sonda.tipo for sonda in self.sondas}
+        lineas = [
+            "# HELP salud_arriba 1 si la última comprobación fue correcta",
+            "# TYPE salud_arriba gauge",
+        ]
+        with self._lock:
+            registros = list(self.registros.items())
+            for nombre, registro in registros:
+                if registro.ultimo is not None:
+                    lineas.append(f'salud_arriba{{sonda="{nombre}",tipo="{tipos[nombre]}"}} {int(registro.ultimo["ok"])}')
+            lineas += ["# HELP salud_comprobaciones_total Comprobaciones por resultado",
+                       "# TYPE salud_comprobaciones_total counter"]
+            for nombre, registro in registros:
+                lineas.append(f'salud_comprobaciones_total{{sonda="{nombre}",resultado="ok"}} {registro.correctas}')
+                lineas.append(f'salud_comprobaciones_total{{sonda="{nombre}",resultado="error"}} {registro.fallidas}')
+            lineas += ["# HELP salud_latencia_segundos Latencia de las sondas hasta las cabeceras",
+                       "# TYPE salud_latencia_segundos histogram"]
+            for nombre, registro in registros:
+                for limite, cantidad in zip(CUBETAS, registro.cubetas):
+                    lineas.append(f'salud_latencia_segundos_bucket{{sonda="{nombre}",le="{limite}"}} {cantidad}')
+                total = registro.correctas + registro.fallidas
+                lineas.append(f'salud_latencia_segundos_bucket{{sonda="{nombre}",le="+Inf"}} {total}')
+                lineas.append(f'salud_latencia_segundos_sum{{sonda="{nombre}"}} {registro.suma:.6f}')
+                lineas.append(f'salud_latencia_segundos_count{{sonda="{nombre}"}} {total}')
+        return "\n".join(lineas) + "\n"
+
+
+def responder_metricas(handler: BaseHTTPRequestHandler, monitor: MonitorSalud) -> None:
+    """Escribe la respuesta de GET /metrics en un handler de http.server"""
+    datos = monitor.prometheus().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    handler.send_header("Content-Length", str(len(datos)))
+    handler.end_headers()
+    handler.wfile.write(datos)
+
+
+def crear_servidor_metricas(monitor: MonitorSalud, host: str = "127.0.0.1", puerto: int = 9101) -> ThreadingHTTPServer:
+    """Servidor con GET /metrics (Prometheus) y GET /salud (JSON)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                return responder_metricas(self, monitor)
+            estado, cuerpo = (200, monitor.estado()) if self.path == "/salud" else (404, {"error": "No encontrado"})
+            datos = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+    servidor = ThreadingHTTPServer((host, puerto), Handler)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def imprimir_estado(monitor: MonitorSalud) -> int:
+    """Tabla con el resultado de cada sonda; devuelve cuántas fallan"""
+    estado = monitor.estado()
+    print(f"{'Sonda':<14}{'Tipo':<10}{'Estado':<8}{'Latencia (ms)':>15}  Error")
+    for nombre, datos in estado.items():
+        icono = "✅" if datos["ok"] else "❌"
+        print(f"{NOMBRES.get(nombre, nombre):<14}{datos['tipo']:<10}{icono:<8}{datos['latencia_ms'] or 0:>15.0f}  {datos['error']}")
+    return sum(1 for datos in estado.values() if not datos["ok"])
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Monitor de salud de las fuentes de noticias y los LLM")
+    parser.add_argument("--puerto", type=int, help="Sirve /metrics y comprueba de forma continua")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--intervalo", type=float, default=60.0, help="Segundos entre comprobaciones")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--simulado", action="store_true",
+                        help="Sondea servidor_fuentes_local.py en lugar de los servicios reales")
+    parser.add_argument("--fallar", nargs="*", default=[], help="Con --simulado, fuentes que fallan")
+    args = parser.parse_args()
+
+    entorno, urls = os.environ, None
+    if args.simulado:
+        from servidor_fuentes_local import ServidorFuentesLocal
+        simulado = ServidorFuentesLocal(fallos=set(args.fallar)).iniciar()
+        urls = dict.fromkeys(list(URLS) + ["local"], simulado.url)
+        urls["groq"] = f"{simulado.url}/openai"
+        entorno = {"GUARDIAN_API_KEY": "prueba", "NEWSAPI_KEY": "prueba", "OPENAI_API_KEY": "prueba",
+                   "GROQ_API_KEY": "prueba"}
+
+    monitor = MonitorSalud(crear_sondas(entorno, urls), args.intervalo, args.timeout)
+    if args.puerto is None:
+        monitor.comprobar()
+        fallos = imprimir_estado(monitor)
+        print(f"\n📊 {len(monitor.sondas) - fallos}/{len(monitor.sondas)} servicios respondiendo")
+        raise SystemExit(1 if fallos else 0)
+
+    servidor = crear_servidor_metricas(monitor, args.host, args.puerto)
+    monitor.iniciar()
+    print(f"🩺 Monitor cada {args.intervalo:g} s; métricas en http://{args.host}:{servidor.server_address[1]}/metrics")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        monitor.detener()
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Normalización en streaming de las respuestas de las fuentes.
+
+Las respuestas JSON (The Guardian, NewsAPI) y los feeds RSS se leen de forma
+incremental desde la conexión y se emiten artículo a artículo, recortando los
+textos en cuanto se leen. Así la memoria depende del tamaño de un artículo y no
+del de la página completa. Para el JSON se usa ijson si está instalado; si no,
+se carga la respuesta entera como antes.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, Optional
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+MAX_TEXTO = 500  # Caracteres de contenido que se conservan por artículo
+
+
+def disponible() -> bool:
+    """Indica si el JSON se puede leer de forma incremental"""
+    return ijson is not None
+
+
+def recortar(texto: Optional[str], limite: int = MAX_TEXTO) -> str:
+    """Recorta un texto al límite añadiendo puntos suspensivos"""
+    return (texto or "")[:limite] + "..."
+
+
+def iterar_json(response, ruta: str) -> Iterator[Dict]:
+    """
+    Emite uno a uno los objetos de la respuesta en la ruta indicada
+    (notación de ijson, p. ej. "response.results.item")
+    """
+    if ijson is not None:
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, ruta, use_float=True)
+        return
+
+    datos = response.json()
+    for clave in ruta.split(".")[:-1]:
+        datos = datos.get(clave, {}) if isinstance(datos, dict) else {}
+    yield from datos or []
+
+
+def iterar_rss(response, limite: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Emite las entradas <item> de un feed RSS a medida que se parsean,
+    liberando cada elemento en cuanto se ha leído
+    """
+    response.raw.decode_content = True
+    canal = None
+    emitidos = 0
+    for evento, elemento in ET.iterparse(response.raw, events=("start", "end")):
+        if evento == "start":
+            if elemento.tag == "channel":
+                canal = elemento
+            continue
+        if elemento.tag != "item":
+            continue
+
+        yield {
+            "id": elemento.findtext("guid") or elemento.findtext("link") or "",
+            "title": elemento.findtext("title") or "",
+            "description": elemento.findtext("description") or "",
+            "link": elemento.findtext("link") or "",
+            "published": elemento.findtext("pubDate") or ""
+        }
+        # Quitar el item del canal para que el árbol no crezca con el feed
+        elemento.clear()
+        if canal is not None:
+            canal.remove(elemento)
+
+        emitidos += 1
+        if limite is not None and emitidos >= limite:
+            return
+
+
+def normalizar_guardian(item: Dict) -> Dict:
+    """Convierte un resultado de The Guardian al formato común de noticia"""
+    campos = item.get("fields", {})
+    return {
+        "title": item.get("webTitle", ""),
+        "description": campos.get("trailText", ""),
+        # Solo se pide trailText: descargar el cuerpo completo para recortarlo no compensa
+        "content": recortar(campos.get("trailText", "")),
+        "url": item.get("webUrl", ""),
+        "publishedAt": item.get("webPublicationDate", ""),
+        "urlToImage": campos.get("thumbnail", "")
+    }
+
+
+def normalizar_newsapi(articulo: Dict) -> Dict:
+    """Conserva solo los campos de NewsAPI que usa la app"""
+    fuente = articulo.get("source") or {}
+    return {
+        "title": articulo.get("title") or "",
+        "description": articulo.get("description") or "",
+        "content": (articulo.get("content") or "")[:MAX_TEXTO],
+        "url": articulo.get("url") or "",
+        "publishedAt": articulo.get("publishedAt") or "",
+        "urlToImage": articulo.get("urlToImage") or "",
+        "source": fuente.get("name", "") if isinstance(fuente, dict) else str(fuente)
+    }
+
+
+def normalizar_rss(entrada: Dict) -> Dict:
+    """Convierte una entrada de iterar_rss al formato común de noticia"""
+    return {
+        "title": entrada["title"],
+        "description": entrada["description"],
+        "content": recortar(entrada["description"]),
+        "url": entrada["link"],
+        "publishedAt": entrada["published"],
+        "urlToImage": ""
+    }
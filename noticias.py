@@ -0,0 +1,335 @@
+"""
+Obtención de noticias de Google News, The Guardian, BBC RSS y NewsAPI.
+
+No depende de Streamlit: los errores se propagan como excepciones para que
+quien llame (la app o el backend compartido) decida cómo mostrarlos.
+Las llamadas idénticas simultáneas se agrupan en una sola (ver coalescencia.py)
+y cada fuente solo pide y normaliza lo publicado desde su última marca de agua
+(ver incremental.py). Las respuestas de The Guardian, NewsAPI y BBC se leen en
+streaming y se normalizan artículo a artículo (ver normalizador.py). Cada fuente
+pasa por su cortacircuitos, que la desactiva un tiempo tras fallos repetidos
+(ver circuitos.py). Las búsquedas en Google News se expanden en subconsultas
+paralelas con caché propia y se fusionan por rango (ver consultas.py).
+"""
+
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+import circuitos
+from circuitos import proteger
+from coalescencia import coalescer
+from consultas import CacheConsultas, fusion_rrf, planificar
+from incremental import REGISTRO
+from normalizador import iterar_json, iterar_rss, normalizar_guardian, normalizar_newsapi, normalizar_rss
+
+TIMEOUT = 10  # Segundos por petición a las fuentes
+DIAS_BUSQUEDA = 7  # Ventana de las búsquedas personalizadas
+
+# Resultados de cada subconsulta de Google News, compartidos entre búsquedas y usuarios
+SUBCONSULTAS = CacheConsultas()
+_POOL_SUBCONSULTAS = ThreadPoolExecutor(max_workers=8, thread_name_prefix="subconsultas")
+
+
+def _normalizar_google(entry, imagen_en_enlaces: bool = True) -> Dict:
+    """Convierte una entrada de Google News al formato común de noticia"""
+    # Extraer imagen si existe
+    image_url = ""
+    if hasattr(entry, 'media_content') and entry.media_content:
+        image_url = entry.media_content[0].get('url', '')
+    elif imagen_en_enlaces and hasattr(entry, 'links'):
+        for link in entry.links:
+            if 'image' in link.get('type', ''):
+                image_url = link.get('href', '')
+                break
+
+    return {
+        "title": entry.title,
+        "description": entry.summary if hasattr(entry, 'summary') else entry.title,
+        "content": (entry.summary if hasattr(entry, 'summary') else entry.title)[:500] + "...",
+        "url": entry.link,
+        "publishedAt": entry.published if hasattr(entry, 'published') else "",
+        "urlToImage": image_url,
+        "source": entry.source.title if hasattr(entry, 'source') else "Google News"
+    }
+
+
+def _id_entrada(entry) -> str:
+    """Identificador estable de una entrada de feed"""
+    return entry.get('id') or entry.get('link', '')
+
+
+def _ingerir_guardian(fuente: str, consulta: str, params: Dict, num_articulos: int,
+                      por_relevancia: bool = False, ventana_dias: Optional[int] = None) -> List[Dict]:
+    """
+    Petición a The Guardian que solo normaliza lo nuevo. Las búsquedas por fecha
+    piden solo lo publicado desde la marca de agua; las de relevancia piden la
+    ventana completa para conservar el orden de la API
+    """
+    desde = None if por_relevancia else REGISTRO.desde(fuente, consulta, num_articulos)
+    if desde is not None:
+        params["from-date"] = desde.strftime('%Y-%m-%d')
+
+    conocidos = REGISTRO.conocidos(fuente, consulta)
+    nuevos, ids, orden = [], [], []
+    with requests.get("https://content.guardianapis.com/search", params=params, timeout=TIMEOUT,
+                      stream=True) as response:
+        response.raise_for_status()
+        for item in iterar_json(response, "response.results.item"):
+            orden.append(item.get("webUrl", ""))
+            id_item = item.get("id") or item.get("webUrl", "")
+            if id_item in conocidos:
+                continue
+            ids.append(id_item)
+            nuevos.append(normalizar_guardian(item))
+
+    return REGISTRO.fusionar(fuente, consulta, nuevos, ids, num_articulos, ventana_dias=ventana_dias,
+                             orden=orden if por_relevancia else None)
+
+
+def _ingerir_newsapi(fuente: str, consulta: str, url: str, params: Dict, num_articulos: int,
+                     admite_desde: bool, por_relevancia: bool = False,
+                     ventana_dias: Optional[int] = None) -> List[Dict]:
+    """
+    Petición a NewsAPI que solo normaliza lo nuevo y solo pide lo publicado desde
+    la marca de agua cuando el endpoint lo admite y el orden es por fecha
+    """
+    desde = REGISTRO.desde(fuente, consulta, num_articulos) if admite_desde and not por_relevancia else None
+    if desde is not None:
+        params["from"] = desde.strftime('%Y-%m-%dT%H:%M:%S')
+
+    conocidos = REGISTRO.conocidos(fuente, consulta)
+    nuevos, orden = [], []
+    with requests.get(url, params=params, timeout=TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        for articulo in iterar_json(response, "articles.item"):
+            orden.append(articulo.get("url"))
+            if articulo.get("url") not in conocidos:
+                nuevos.append(normalizar_newsapi(articulo))
+
+    return REGISTRO.fusionar(fuente, consulta, nuevos, [a["url"] for a in nuevos], num_articulos,
+                             ventana_dias=ventana_dias, orden=orden if por_relevancia else None)
+
+
+def _ingerir_google(fuente: str, consulta: str, entradas, num_articulos: int, imagen_en_enlaces: bool = True) -> List[Dict]:
+    """Normaliza solo las entradas de Google News que no se habían visto antes"""
+    conocidos = REGISTRO.conocidos(fuente, consulta)
+    nuevos, ids = [], []
+    for entry in entradas[:num_articulos]:
+        id_entrada = _id_entrada(entry)
+        if id_entrada in conocidos:
+            continue
+        ids.append(id_entrada)
+        nuevos.append(_normalizar_google(entry, imagen_en_enlaces))
+
+    return REGISTRO.fusionar(fuente, consulta, nuevos, ids, num_articulos)
+
+
+@coalescer
+@proteger("newsapi")
+def obtener_noticias_newsapi(api_key: str, categoria: str = "general", pais: str = "us", num_articulos: int = 10) -> List[Dict]:
+    """
+    Obtiene noticias de NewsAPI
+    """
+    params = {
+        "apiKey": api_key,
+        "category": categoria,
+        "country": pais,
+        "pageSize": num_articulos,
+        "sortBy": "publishedAt"
+    }
+
+    # top-headlines no admite filtro de fecha: solo se evita reprocesar lo conocido
+    return _ingerir_newsapi("newsapi", f"{categoria}|{pais}", "https://newsapi.org/v2/top-headlines",
+                            params, num_articulos, admite_desde=False)
+
+
+@coalescer
+@proteger("guardian")
+def obtener_noticias_guardian(api_key: str, seccion: str = "world", num_articulos: int = 10) -> List[Dict]:
+    """
+    Obtiene noticias de The Guardian API
+    """
+    params = {
+        "api-key": api_key,
+        "section": seccion,
+        "page-size": num_articulos,
+        "order-by": "newest",
+        "show-fields": "trailText,thumbnail"
+    }
+
+    return _ingerir_guardian("guardian", seccion, params, num_articulos)
+
+
+@coalescer
+@proteger("google")
+def _buscar_google(query: str, num_articulos: int, idioma: str) -> List[Dict]:
+    """Una búsqueda en Google News (una subconsulta)"""
+    from pygooglenews import GoogleNews
+
+    # Inicializar Google News
+    gn = GoogleNews(lang=idioma, country='ES' if idioma == 'es' else 'US')
+
+    # Buscar noticias por query (solo las publicadas desde la marca de agua)
+    consulta = f"{idioma}|{query}"
+    desde = REGISTRO.desde("google", consulta, num_articulos)
+    search_result = gn.search(query, from_=desde.strftime('%Y-%m-%d') if desde else None)
+
+    entradas = search_result['entries'] if search_result and 'entries' in search_result else []
+    return _ingerir_google("google", consulta, entradas, num_articulos)
+
+
+def _subconsulta_google(query: str, num_articulos: int, idioma: str) -> List[Dict]:
+    """Subconsulta con caché propia, de modo que otras búsquedas que la incluyan la reutilizan"""
+    clave = (idioma, query.lower(), num_articulos)
+    resultado = SUBCONSULTAS.obtener(clave)
+    if resultado is None:
+        resultado = _buscar_google(query, num_articulos, idioma)
+        SUBCONSULTAS.guardar(clave, resultado)
+    return resultado
+
+
+@coalescer
+def obtener_noticias_google(query: str, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+    """
+    Obtiene noticias de Google News usando una query personalizada.
+    La consulta se expande en subconsultas de palabras clave que se lanzan en
+    paralelo y se fusionan por rango recíproco; si fallan todas, se propaga el error.
+    """
+    futuros = [_POOL_SUBCONSULTAS.submit(_subconsulta_google, subconsulta, num_articulos, idioma)
+               for subconsulta in planificar(query, idioma)]
+    listas, error = [], None
+    for futuro in futuros:
+        try:
+            listas.append(futuro.result())
+        except Exception as e:
+            error = error or e
+    if error is not None and not listas:
+        raise error
+    return fusion_rrf(listas)[:num_articulos]
+
+
+@coalescer
+@proteger("google")
+def obtener_noticias_google_trending(num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+    """
+    Obtiene las noticias trending de Google News
+    """
+    from pygooglenews import GoogleNews
+
+    # Inicializar Google News
+    gn = GoogleNews(lang=idioma, country='ES' if idioma == 'es' else 'US')
+
+    # Obtener noticias trending
+    trending = gn.top_news()
+
+    entradas = trending['entries'] if trending and 'entries' in trending else []
+    return _ingerir_google("google_trending", idioma, entradas, num_articulos, imagen_en_enlaces=False)
+
+
+@coalescer
+@proteger("bbc")
+def obtener_noticias_rss_bbc(query: str = "", num_articulos: int = 10) -> List[Dict]:
+    """
+    Obtiene noticias de BBC RSS como alternativa gratuita
+    """
+    # URLs de RSS de BBC por categoría
+    rss_urls = {
+        "general": "http://feeds.bbci.co.uk/news/rss.xml",
+        "business": "http://feeds.bbci.co.uk/news/business/rss.xml", 
+        "technology": "http://feeds.bbci.co.uk/news/technology/rss.xml",
+        "science": "http://feeds.bbci.co.uk/news/science_and_environment/rss.xml"
+    }
+
+    # Usar feed general por defecto
+    feed_url = rss_urls["general"]
+
+    # Si hay query, usar búsqueda en tecnología/business
+    if query and any(word in query.lower() for word in ["tech", "ai", "digital", "business", "economy"]):
+        if any(word in query.lower() for word in ["tech", "ai", "digital", "technology"]):
+            feed_url = rss_urls["technology"]
+        else:
+            feed_url = rss_urls["business"]
+
+    # Petición condicional: si el feed no ha cambiado (304) no se descarga ni se parsea
+    cabeceras = {}
+    if REGISTRO.dato("bbc", feed_url, "etag"):
+        cabeceras["If-None-Match"] = REGISTRO.dato("bbc", feed_url, "etag")
+    if REGISTRO.dato("bbc", feed_url, "modified"):
+        cabeceras["If-Modified-Since"] = REGISTRO.dato("bbc", feed_url, "modified")
+
+    conocidos = REGISTRO.conocidos("bbc", feed_url)
+    nuevos, ids = [], []
+    with requests.get(feed_url, headers=cabeceras, timeout=TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        etag = response.headers.get("ETag") or cabeceras.get("If-None-Match")
+        modified = response.headers.get("Last-Modified") or cabeceras.get("If-Modified-Since")
+        if response.status_code != 304:
+            # Solo se leen tantas entradas como puede guardar el registro
+            for entrada in iterar_rss(response, limite=REGISTRO.max_articulos):
+                if entrada["id"] in conocidos:
+                    continue
+                ids.append(entrada["id"])
+                nuevos.append(normalizar_rss(entrada))
+
+    # Se guarda el feed completo y se filtra por query al responder
+    articles = REGISTRO.fusionar("bbc", feed_url, nuevos, ids, etag=etag, modified=modified)
+
+    # Filtrar por query si se proporciona
+    if query:
+        articles = [a for a in articles
+                    if query.lower() in a["title"].lower() or query.lower() in a["description"].lower()]
+
+    return articles[:num_articulos]
+
+
+@coalescer
+@proteger("guardian")
+def buscar_noticias_guardian_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+    """
+    Busca noticias específicas en The Guardian API usando una query personalizada
+    """
+    params = {
+        "api-key": api_key,
+        "q": query,
+        "page-size": num_articulos,
+        "order-by": "relevance",
+        "show-fields": "trailText,thumbnail",
+        "from-date": (datetime.now() - timedelta(days=DIAS_BUSQUEDA)).strftime('%Y-%m-%d')  # Solo la ventana de búsqueda
+    }
+
+    return _ingerir_guardian("guardian_busqueda", query, params, num_articulos,
+                             por_relevancia=True, ventana_dias=DIAS_BUSQUEDA)
+
+
+@coalescer
+@proteger("newsapi")
+def buscar_noticias_newsapi_personalizada(api_key: str, query: str, num_articulos: int = 10) -> List[Dict]:
+    """
+    Busca noticias específicas en NewsAPI usando una query personalizada
+    """
+    params = {
+        "apiKey": api_key,
+        "q": query,
+        "pageSize": num_articulos,
+        "sortBy": "relevancy",
+        "language": "en",
+        "from": (datetime.now() - timedelta(days=DIAS_BUSQUEDA)).strftime('%Y-%m-%d')  # Solo la ventana de búsqueda
+    }
+
+    return _ingerir_newsapi("newsapi_busqueda", query, "https://newsapi.org/v2/everything",
+                            params, num_articulos, admite_desde=True, por_relevancia=True,
+                            ventana_dias=DIAS_BUSQUEDA)
+
+
+def estadisticas_subconsultas() -> Dict[str, int]:
+    """Aciertos y fallos de la caché de subconsultas de Google News"""
+    return SUBCONSULTAS.estadisticas()
+
+
+def estado_fuentes() -> Dict[str, Dict]:
+    """
+    Estado del cortacircuitos, tasa de error y latencias de cada fuente
+    """
+    return circuitos.estadisticas()
@@ -0,0 +1,139 @@
+"""
+Presupuesto de tokens de salida según la longitud elegida.
+
+En lugar de pedir siempre 500 tokens, max_tokens se calcula a partir del rango
+de palabras de la longitud ("Corto (100-200 palabras)") y de cuántos tokens
+por palabra gasta cada modelo en cada idioma. Esa relación se aprende del
+historial de posts (tokens de respuesta / palabras) y, mientras no hay datos
+suficientes, se usan valores por defecto conservadores.
+"""
+
+import re
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Tokens por palabra habituales en los tokenizadores BPE (el español gasta más que el inglés)
+TOKENS_POR_PALABRA = {"es": 1.7, "en": 1.35}
+TOKENS_POR_PALABRA_POR_DEFECTO = 1.7
+
+# Holgura sobre el máximo de palabras y tokens reservados para hashtags y la pregunta final
+MARGEN = 1.15
+TOKENS_CIERRE = 40
+
+RANGO_POR_DEFECTO = (200, 300)
+
+_RANGO = re.compile(r"(\d+)\s*-\s*(\d+)")
+_PALABRA = re.compile(r"(?<!#)\b\w+(?:['’-]\w+)*", re.UNICODE)
+_FIN_FRASE = re.compile(r"[.!?…][\"'»)]*\s*$")
+
+
+def rango_palabras(longitud: str) -> Tuple[int, int]:
+    """Rango de palabras de una longitud como "Medio (200-300 palabras)" """
+    coincidencia = _RANGO.search(longitud or "")
+    if not coincidencia:
+        return RANGO_POR_DEFECTO
+    return int(coincidencia.group(1)), int(coincidencia.group(2))
+
+
+def contar_palabras(texto: str) -> int:
+    """Palabras del cuerpo del post (los hashtags no cuentan)"""
+    return len(_PALABRA.findall(texto or ""))
+
+
+def termina_frase(texto: str) -> bool:
+    """Indica si el texto acaba en un final de frase"""
+    return bool(_FIN_FRASE.search(texto))
+
+
+def recortar_a_frase(texto: str) -> str:
+    """Quita la frase incompleta del final (respuestas cortadas por max_tokens)"""
+    texto = texto.rstrip()
+    if termina_frase(texto):
+        return texto
+    finales = list(re.finditer(r"[.!?…][\"'»)]*(?=\s)", texto))
+    return texto[:finales[-1].end()] if finales else texto
+
+
+class PresupuestoTokens:
+    """Calcula max_tokens por longitud con la relación tokens/palabra aprendida del historial"""
+
+    def __init__(self, min_muestras: int = 5, refresco_s: float = 600.0):
+        self.min_muestras = min_muestras
+        self.refresco_s = refresco_s
+        self._historial = None
+        self._ratios: Dict[Tuple[str, str], float] = {}
+        self._aprendido = 0.0
+        self._lock = threading.Lock()
+
+    def conectar(self, historial) -> "PresupuestoTokens":
+        """Usa un HistorialPosts como fuente de muestras (se relee cada refresco_s)"""
+        with self._lock:
+            self._historial = historial
+            self._aprendido = 0.0
+        return self
+
+    def aprender(self, muestras: List[Dict]) -> Dict[Tuple[str, str], float]:
+        """
+        Recalcula la mediana de tokens por palabra por modelo e idioma a partir de
+        muestras con "modelo", "texto" y "tokens_respuesta". Las variantes de una
+        misma llamada comparten métricas, así que sus palabras se suman.
+        """
+        from traduccion import detectar_idioma
+
+        llamadas: Dict[Tuple, List[str]] = {}
+        for muestra in muestras:
+            if muestra.get("tokens_respuesta"):
+                clave = (muestra.get("modelo") or "", muestra["tokens_respuesta"],
+                         muestra.get("creado"), muestra.get("titulo_noticia"))
+                llamadas.setdefault(clave, []).append(muestra.get("texto") or "")
+
+        relaciones: Dict[Tuple[str, str], List[float]] = {}
+        for (modelo, tokens, _, _), textos in llamadas.items():
+            palabras = sum(contar_palabras(texto) for texto in textos)
+            if palabras < 20:
+                continue
+            clave = (modelo, detectar_idioma(textos[0]))
+            relaciones.setdefault(clave, []).append(tokens / palabras)
+
+        ratios = {clave: statistics.median(valores) for clave, valores in relaciones.items()
+                  if len(valores) >= self.min_muestras}
+        with self._lock:
+            self._ratios = ratios
+            self._aprendido = time.monotonic()
+        return ratios
+
+    def _refrescar(self) -> None:
+        with self._lock:
+            historial = self._historial
+            pendiente = historial is not None and time.monotonic() - self._aprendido >= self.refresco_s
+            if pendiente:
+                # Se marca antes de leer para que otro hilo no repita la consulta
+                self._aprendido = time.monotonic()
+        if pendiente:
+            try:
+                self.aprender(historial.muestras_generacion())
+            except Exception:
+                pass
+
+    def tokens_por_palabra(self, modelo: str, idioma: str = "es") -> float:
+        """Relación aprendida para el modelo e idioma, o la de por defecto del idioma"""
+        self._refrescar()
+        with self._lock:
+            ratio = self._ratios.get((modelo, idioma))
+        return ratio or TOKENS_POR_PALABRA.get(idioma, TOKENS_POR_PALABRA_POR_DEFECTO)
+
+    def max_tokens(self, longitud: str, modelo: str, idioma: str = "es") -> int:
+        """Tokens de salida suficientes para el máximo de palabras de la longitud"""
+        _, maximo = rango_palabras(longitud)
+        return int(maximo * self.tokens_por_palabra(modelo, idioma) * MARGEN) + TOKENS_CIERRE
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Relaciones aprendidas, como "modelo/idioma" -> tokens por palabra"""
+        with self._lock:
+            return {f"{modelo}/{idioma}": round(ratio, 2) for (modelo, idioma), ratio in self._ratios.items()}
+
+
+# Presupuesto compartido por el proceso (la app lo conecta a su historial)
+PRESUPUESTO = PresupuestoTokens()
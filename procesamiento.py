@@ -0,0 +1,173 @@
+"""
+Limpieza de HTML y extracción de palabras clave y hashtags de las noticias.
+
+Los resúmenes de Google News y BBC traen HTML (enlaces, <font>, entidades) que
+se pasaba tal cual a los prompts y a la interfaz. Esta etapa lo limpia y añade
+a cada noticia sus palabras clave y hashtags (NewsProcessor). Para lotes
+grandes el trabajo, que es de CPU, se reparte en trozos entre un pool de
+procesos con un map que conserva el orden, de modo que no bloquea el hilo del
+script de Streamlit. Se usa lxml si está instalado (bastante más rápido) y si
+no BeautifulSoup con html.parser.
+
+Uso:
+    python procesamiento.py --benchmark 10000            # de 1 proceso a todos los núcleos
+    python procesamiento.py --benchmark 10000 --max-procesos 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+from bs4 import BeautifulSoup
+
+from utils import NewsProcessor
+
+CAMPOS_HTML = ("title", "description", "content")
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def disponible() -> bool:
+    """Indica si está instalado lxml para la limpieza rápida"""
+    return lxml_html is not None
+
+
+def limpiar_html(texto: Optional[str], usar_lxml: bool = True) -> str:
+    """Texto plano de un fragmento HTML, con las entidades resueltas y los espacios normalizados"""
+    if not texto:
+        return ""
+    if "<" not in texto and "&" not in texto:
+        return _ESPACIOS.sub(" ", texto).strip()
+    if usar_lxml and lxml_html is not None:
+        try:
+            # itertext con separador: text_content() pega los textos de elementos contiguos
+            plano = " ".join(lxml_html.fragment_fromstring(texto, create_parent="div").itertext())
+        except Exception:
+            plano = BeautifulSoup(texto, "html.parser").get_text(" ")
+    else:
+        plano = BeautifulSoup(texto, "html.parser").get_text(" ")
+    return _ESPACIOS.sub(" ", plano).strip()
+
+
+def procesar_noticia(noticia: Dict, usar_lxml: bool = True) -> Dict:
+    """Copia de la noticia con el HTML limpio, sus palabras clave y sus hashtags"""
+    noticia = dict(noticia)
+    for campo in CAMPOS_HTML:
+        if isinstance(noticia.get(campo), str):
+            noticia[campo] = limpiar_html(noticia[campo], usar_lxml)
+    palabras_clave = NewsProcessor.extraer_palabras_clave(f"{noticia.get('title', '')} {noticia.get('description', '')}", 5)
+    noticia["palabras_clave"] = palabras_clave
+    noticia["hashtags"] = NewsProcessor.generar_hashtags(palabras_clave)
+    return noticia
+
+
+def _procesar_lote(lote: List[Dict], usar_lxml: bool = True) -> List[Dict]:
+    # Función de módulo para que el pool de procesos pueda serializarla
+    return [procesar_noticia(noticia, usar_lxml) for noticia in lote]
+
+
+class ProcesadorNoticias:
+    """
+    Procesa noticias en el propio proceso (lotes pequeños) o en un pool de
+    procesos por trozos (lotes grandes), devolviéndolas en el mismo orden
+    """
+
+    def __init__(self, max_procesos: Optional[int] = None, tam_trozo: int = 250, umbral: int = 500,
+                 usar_lxml: bool = True):
+        self.max_procesos = max_procesos or os.cpu_count() or 1
+        self.tam_trozo = tam_trozo
+        self.umbral = umbral
+        self.usar_lxml = usar_lxml
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: el proceso de Streamlit tiene hilos y hacer fork con hilos no es seguro
+            self._pool = ProcessPoolExecutor(max_workers=self.max_procesos,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def procesar(self, noticias: List[Dict]) -> List[Dict]:
+        """Noticias procesadas en el mismo orden en que llegan"""
+        if len(noticias) < self.umbral or self.max_procesos == 1:
+            return _procesar_lote(noticias, self.usar_lxml)
+        trozos = [noticias[i:i + self.tam_trozo] for i in range(0, len(noticias), self.tam_trozo)]
+        resultado = []
+        for lote in self._obtener_pool().map(_procesar_lote, trozos, [self.usar_lxml] * len(trozos)):
+            resultado.extend(lote)
+        return resultado
+
+    def cerrar(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def noticias_de_prueba(cantidad: int) -> List[Dict]:
+    """Noticias sintéticas con HTML parecido al de los resúmenes de Google News y BBC"""
+    temas = ["inteligencia artificial", "energías renovables", "mercado laboral", "ciberseguridad", "salud digital"]
+    noticias = []
+    for i in range(cantidad):
+        tema = temas[i % len(temas)]
+        noticias.append({
+            "title": f"Avances en {tema} &amp; transformación digital #{i}",
+            "description": (f'<a href="https://news.google.com/articles/{i}" target="_blank">Las empresas apuestan por '
+                            f'{tema}</a>&nbsp;&nbsp;<font color="#6f6f6f">Medio {i % 40}</font>'
+                            f"<p>Un informe sobre {tema} muestra cambios en la inversión, el empleo y la "
+                            "regulación durante el último trimestre.</p>") * 3,
+            "content": f"<div><p>Análisis de {tema}</p><ul><li>Inversión</li><li>Talento</li></ul></div>",
+            "url": f"https://ejemplo.com/{i}"
+        })
+    return noticias
+
+
+def benchmark(cantidad: int, max_procesos: int, tam_trozo: int) -> None:
+    """Mide el tiempo de procesar 'cantidad' noticias con 1..max_procesos procesos"""
+    noticias = noticias_de_prueba(cantidad)
+    analizadores = [("lxml", True)] if disponible() else []
+    analizadores.append(("html.parser", False))
+    if disponible():
+        # Los dos analizadores deben dar el mismo texto
+        for noticia in noticias[:20]:
+            for campo in CAMPOS_HTML:
+                assert limpiar_html(noticia[campo], True) == limpiar_html(noticia[campo], False), campo
+
+    print(f"🧪 {cantidad} noticias, trozos de {tam_trozo}, {os.cpu_count()} núcleos")
+    print(f"{'Analizador':<13}{'Procesos':>9}{'Tiempo (s)':>12}{'Noticias/s':>12}{'Aceleración':>13}")
+    for nombre, usar_lxml in analizadores:
+        base = None
+        for procesos in range(1, max_procesos + 1):
+            procesador = ProcesadorNoticias(procesos, tam_trozo, umbral=0, usar_lxml=usar_lxml)
+            if procesos > 1:
+                # Arranca el pool antes de medir (coste único al iniciar la app)
+                procesador.procesar(noticias[:procesos * tam_trozo])
+            inicio = time.perf_counter()
+            resultado = procesador.procesar(noticias)
+            duracion = time.perf_counter() - inicio
+            procesador.cerrar()
+            assert [n["url"] for n in resultado] == [n["url"] for n in noticias]
+            base = base or duracion
+            print(f"{nombre:<13}{procesos:>9}{duracion:>12.2f}{cantidad / duracion:>12.0f}{base / duracion:>12.1f}×")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Limpieza de HTML y palabras clave de noticias en paralelo")
+    parser.add_argument("--benchmark", type=int, default=10000, metavar="NOTICIAS",
+                        help="Noticias sintéticas del benchmark")
+    parser.add_argument("--max-procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tam-trozo", type=int, default=250)
+    args = parser.parse_args()
+    benchmark(args.benchmark, args.max_procesos, args.tam_trozo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Prueba de carga del backend compartido con fuentes simuladas.
+
+Simula a varios usuarios que buscan a la vez los mismos temas (el pico de las
+9:00) y compara llamar a las fuentes desde cada sesión con pasar por el backend.
+
+Uso:
+    python prueba_carga_backend.py --usuarios 10 --temas 3 --latencia 0.5
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from backend import Backend, crear_servidor
+from cliente_backend import ClienteBackend
+
+
+def crear_fuente_simulada(latencia: float, contador: Dict[str, int], lock: threading.Lock):
+    """Fuente de noticias falsa con latencia fija que cuenta sus llamadas"""
+    def fuente(query: str, num_articulos: int = 10, idioma: str = "es") -> List[Dict]:
+        with lock:
+            contador["llamadas"] += 1
+        time.sleep(latencia)
+        return [{"title": f"{query} {i}", "description": "", "content": "", "url": f"https://ejemplo.com/{query}/{i}",
+                 "publishedAt": "", "urlToImage": ""} for i in range(num_articulos)]
+    return fuente
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def ejecutar(buscar, usuarios: int, temas: int, rondas: int) -> Dict:
+    """Lanza usuarios x temas búsquedas simultáneas por ronda y mide latencias"""
+    latencias = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=usuarios * temas) as executor:
+        for _ in range(rondas):
+            def peticion(i):
+                t0 = time.perf_counter()
+                buscar(f"tema-{i % temas}")
+                return time.perf_counter() - t0
+            latencias.extend(executor.map(peticion, range(usuarios * temas)))
+    total = time.perf_counter() - inicio
+    return {
+        "peticiones": len(latencias),
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "rps": len(latencias) / total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del backend compartido")
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--temas", type=int, default=3)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latencia simulada de la fuente (s)")
+    args = parser.parse_args()
+
+    lock = threading.Lock()
+
+    # Sin backend: cada sesión llama a la fuente por su cuenta
+    contador_directo = {"llamadas": 0}
+    fuente = crear_fuente_simulada(args.latencia, contador_directo, lock)
+    directo = ejecutar(lambda q: fuente(q), args.usuarios, args.temas, args.rondas)
+    directo["llamadas_fuente"] = contador_directo["llamadas"]
+
+    # Con backend: caché compartida y coalescencia de búsquedas idénticas
+    contador_backend = {"llamadas": 0}
+    backend = Backend(fuentes={"obtener_noticias_google": crear_fuente_simulada(args.latencia, contador_backend, lock)})
+    servidor = crear_servidor(backend, puerto=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    cliente = ClienteBackend(f"http://127.0.0.1:{servidor.server_address[1]}")
+    compartido = ejecutar(lambda q: cliente.obtener_noticias_google(q), args.usuarios, args.temas, args.rondas)
+    compartido["llamadas_fuente"] = contador_backend["llamadas"]
+    servidor.shutdown()
+
+    print(f"👥 {args.usuarios} usuarios × {args.temas} temas × {args.rondas} rondas, fuente de {args.latencia * 1000:.0f} ms")
+    print(f"{'Modo':<12}{'Peticiones':>12}{'Llamadas fuente':>17}{'p50 (ms)':>11}{'p95 (ms)':>11}{'Peticiones/s':>14}")
+    for nombre, r in (("Directo", directo), ("Backend", compartido)):
+        print(f"{nombre:<12}{r['peticiones']:>12}{r['llamadas_fuente']:>17}{r['p50_ms']:>11.1f}{r['p95_ms']:>11.1f}{r['rps']:>14.1f}")
+    print(f"📊 Métricas del backend: {backend.resumen_metricas()}")
+
+
+if __name__ == "__main__":
+    main()
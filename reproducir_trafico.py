@@ -0,0 +1,196 @@
+"""
+Reproduce un registro de tráfico (ver grabacion.py) contra fuentes simuladas.
+
+Las búsquedas y generaciones grabadas se lanzan contra el backend compartido
+respetando los intervalos entre eventos divididos por el factor de velocidad
+(1×, 10×, 100×...). Las fuentes y el LLM se sustituyen por simulaciones locales
+cuya latencia se toma de las llamadas reales grabadas, de modo que se mide la
+capacidad del backend (caché, coalescencia, cola de generación) sin tocar los
+servicios externos.
+
+Uso:
+    python reproducir_trafico.py .cache/trafico.jsonl --velocidad 1 10 100
+    python reproducir_trafico.py trafico.jsonl.gz --velocidad 10 --max-generaciones 8
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import grabacion
+from backend import FUNCIONES_NOTICIAS, Backend, crear_servidor
+from cliente_backend import ClienteBackend
+from prueba_carga_backend import percentil
+
+# Cortacircuito (nombre de fuente grabado) de cada función de noticias
+FUENTE_DE_FUNCION = {
+    "obtener_noticias_newsapi": "newsapi",
+    "obtener_noticias_guardian": "guardian",
+    "obtener_noticias_google": "google",
+    "obtener_noticias_google_trending": "google",
+    "obtener_noticias_rss_bbc": "bbc",
+    "buscar_noticias_guardian_personalizada": "guardian",
+    "buscar_noticias_newsapi_personalizada": "newsapi",
+}
+
+LATENCIA_POR_DEFECTO_MS = {"fuente": 300.0, "generacion": 3000.0}
+
+
+class Latencias:
+    """Latencias grabadas por fuente; las simulaciones toman muestras al azar"""
+
+    def __init__(self, eventos: List[Dict], semilla: int = 0):
+        self._muestras: Dict[str, List[float]] = defaultdict(list)
+        for evento in eventos:
+            if evento["e"] == "fuente" and evento.get("ok", True):
+                self._muestras[evento["f"]].append(evento["ms"])
+            elif evento["e"] == "generacion" and evento.get("ms"):
+                self._muestras["generacion"].append(evento["ms"])
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def muestra(self, nombre: str, tipo: str = "fuente") -> float:
+        """Segundos de una latencia grabada de la fuente (o la de por defecto)"""
+        with self._lock:
+            muestras = self._muestras.get(nombre)
+            ms = self._azar.choice(muestras) if muestras else LATENCIA_POR_DEFECTO_MS[tipo]
+        return ms / 1000
+
+
+def crear_fuentes_simuladas(latencias: Latencias, contador: Counter, lock: threading.Lock) -> Dict:
+    """Una función simulada por cada función de noticias del backend"""
+    def crear(funcion: str):
+        def fuente(query: str = "", num_articulos: int = 10, **_) -> List[Dict]:
+            with lock:
+                contador[funcion] += 1
+            time.sleep(latencias.muestra(FUENTE_DE_FUNCION[funcion]))
+            return [{"title": f"{query} {i}", "description": "", "content": "", "url": f"https://ejemplo.com/{funcion}/{query}/{i}",
+                     "publishedAt": "", "urlToImage": "", "source": funcion} for i in range(num_articulos)]
+        return fuente
+    return {funcion: crear(funcion) for funcion in FUNCIONES_NOTICIAS}
+
+
+class MotorSimulado:
+    """Sustituye al LLM: tarda lo que tardaron las generaciones grabadas"""
+
+    def __init__(self, latencias: Latencias):
+        self.latencias = latencias
+
+    def crear_cliente(self, proveedor: str):
+        return None
+
+    def _generar(self, metricas: Dict) -> None:
+        espera = self.latencias.muestra("generacion", "generacion")
+        time.sleep(espera)
+        metricas.update({"modelo": "simulado", "latencia_ms": round(espera * 1000, 1)})
+
+    def generar_post(self, client, proveedor, noticia, estilo, tono, longitud, metricas=None, cancelado=None) -> str:
+        self._generar(metricas if metricas is not None else {})
+        return f"Post simulado sobre {noticia.get('title', '')}"
+
+    def generar_variantes(self, client, proveedor, noticia, estilo, tono, longitud, num_variantes, metricas=None):
+        self._generar(metricas if metricas is not None else {})
+        return [f"Variante {i + 1}" for i in range(num_variantes)]
+
+    def generar_post_estructurado(self, client, proveedor, noticia, estilo, tono, longitud, metricas=None) -> Dict:
+        return {"texto": self.generar_post(client, proveedor, noticia, estilo, tono, longitud, metricas)}
+
+
+def reproducir(eventos: List[Dict], velocidad: float, max_generaciones: int = 4, max_hilos: int = 64) -> Dict:
+    """
+    Lanza los eventos de usuario con sus intervalos divididos por 'velocidad' y
+    devuelve rendimiento, latencias por tipo y aciertos de caché del backend
+    """
+    latencias = Latencias(eventos)
+    contador = Counter()
+    lock = threading.Lock()
+    backend = Backend(fuentes=crear_fuentes_simuladas(latencias, contador, lock),
+                      max_generaciones=max_generaciones, motor_generacion=MotorSimulado(latencias))
+    servidor = crear_servidor(backend, puerto=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    cliente = ClienteBackend(f"http://127.0.0.1:{servidor.server_address[1]}")
+
+    acciones = [e for e in eventos if e["e"] in ("busqueda", "generacion")]
+    resultados: Dict[str, List[float]] = defaultdict(list)
+    errores = Counter()
+
+    def ejecutar(evento: Dict) -> None:
+        inicio = time.perf_counter()
+        try:
+            if evento["e"] == "busqueda":
+                argumentos = dict(evento["a"])
+                if FUNCIONES_NOTICIAS.get(evento["f"]):
+                    # La key no se graba; el backend simulado no la necesita
+                    argumentos["api_key"] = ""
+                getattr(cliente, evento["f"])(**argumentos)
+            else:
+                config = evento.get("c", {})
+                argumentos = (None, config.get("proveedor", "Groq"), {"title": "noticia"}, config.get("estilo", ""),
+                              config.get("tono", ""), config.get("longitud", ""))
+                if (evento.get("v") or 1) > 1:
+                    cliente.generar_variantes(*argumentos, evento["v"])
+                else:
+                    cliente.generar_post(*argumentos)
+        except Exception:
+            with lock:
+                errores[evento["e"]] += 1
+            return
+        with lock:
+            resultados[evento["e"]].append(time.perf_counter() - inicio)
+
+    origen = acciones[0]["t"] if acciones else 0.0
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_hilos) as executor:
+        for evento in acciones:
+            espera = (evento["t"] - origen) / velocidad - (time.perf_counter() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+            executor.submit(ejecutar, evento)
+    duracion = time.perf_counter() - inicio
+    servidor.shutdown()
+
+    metricas = backend.resumen_metricas()
+    resumen = {
+        "velocidad": velocidad,
+        "eventos": len(acciones),
+        "duracion_s": duracion,
+        "rps": sum(len(v) for v in resultados.values()) / duracion if duracion else 0.0,
+        "errores": sum(errores.values()),
+        "llamadas_fuente": sum(contador.values()),
+        "tasa_cache": metricas.get("aciertos_cache", 0) / metricas["busquedas"] if metricas.get("busquedas") else 0.0,
+        "coalescidas": metricas.get("coalescidas", 0)
+    }
+    for tipo, valores in resultados.items():
+        resumen[f"{tipo}_p50_ms"] = percentil(valores, 50) * 1000
+        resumen[f"{tipo}_p99_ms"] = percentil(valores, 99) * 1000
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce tráfico grabado contra fuentes simuladas")
+    parser.add_argument("registro", help="Registro de tráfico (GRABAR_TRAFICO)")
+    parser.add_argument("--velocidad", type=float, nargs="+", default=[1, 10, 100],
+                        help="Factores de aceleración a probar")
+    parser.add_argument("--max-generaciones", type=int, default=4, help="Generaciones simultáneas del backend")
+    args = parser.parse_args()
+
+    eventos = sorted(grabacion.leer(args.registro), key=lambda e: e["t"])
+    usuarios = len({e.get("s") for e in eventos if e["e"] in ("busqueda", "generacion")})
+    print(f"📼 {len(eventos)} eventos grabados de {usuarios} sesiones")
+
+    print(f"{'Velocidad':>10}{'Eventos':>9}{'Duración (s)':>14}{'Acciones/s':>12}{'Errores':>9}"
+          f"{'Llamadas fuente':>17}{'Caché':>8}{'Coalesc.':>10}{'Búsq. p50/p99 (ms)':>21}{'Gen. p50/p99 (ms)':>20}")
+    for velocidad in args.velocidad:
+        r = reproducir(eventos, velocidad, args.max_generaciones)
+        busquedas = f"{r.get('busqueda_p50_ms', 0):.0f}/{r.get('busqueda_p99_ms', 0):.0f}"
+        generaciones = f"{r.get('generacion_p50_ms', 0):.0f}/{r.get('generacion_p99_ms', 0):.0f}"
+        print(f"{velocidad:>9g}×{r['eventos']:>9}{r['duracion_s']:>14.1f}{r['rps']:>12.1f}{r['errores']:>9}"
+              f"{r['llamadas_fuente']:>17}{r['tasa_cache']:>8.0%}{r['coalescidas']:>10}{busquedas:>21}{generaciones:>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Salida estructurada de la generación de posts.
+
+El modelo devuelve un objeto JSON con gancho, cuerpo, llamada a la acción y
+hashtags por separado, y el post se monta después de forma determinista con
+LinkedInOptimizer.formatear_para_linkedin. Se pide formato JSON al proveedor
+(json_schema en el servidor local, que restringe la gramática; json_object en
+OpenAI y Groq) y la respuesta se valida siempre: si faltan campos o no es JSON
+válido se pide una reparación solo de lo que falla, sin regenerar el post.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils import LinkedInOptimizer, MAX_HASHTAGS_RECOMENDADOS
+
+CAMPOS = ("gancho", "cuerpo", "cta", "hashtags")
+
+ESQUEMA_POST = {
+    "type": "object",
+    "properties": {
+        "gancho": {"type": "string", "description": "Primera frase que capta la atención"},
+        "cuerpo": {"type": "string", "description": "Desarrollo del post, sin hashtags ni pregunta final"},
+        "cta": {"type": "string", "description": "Pregunta final para generar conversación"},
+        "hashtags": {"type": "array", "items": {"type": "string"}, "minItems": 1,
+                     "maxItems": MAX_HASHTAGS_RECOMENDADOS}
+    },
+    "required": list(CAMPOS),
+    "additionalProperties": False
+}
+
+INSTRUCCIONES_JSON = f"""
+FORMATO DE RESPUESTA:
+Responde únicamente con un objeto JSON con estas claves:
+- "gancho": primera frase que capte la atención
+- "cuerpo": desarrollo del post, sin hashtags ni la pregunta final
+- "cta": pregunta final para generar engagement
+- "hashtags": lista de 3 a {MAX_HASHTAGS_RECOMENDADOS} hashtags
+"""
+
+# Tokens extra para las claves y comillas del JSON
+TOKENS_JSON = 40
+
+# response_format por proveedor: llama-server aplica el esquema como gramática
+FORMATO_RESPUESTA = {
+    "OpenAI": {"type": "json_object"},
+    "Groq": {"type": "json_object"},
+    "Local": {"type": "json_schema", "json_schema": {"name": "post_linkedin", "schema": ESQUEMA_POST}}
+}
+
+_BLOQUE_CODIGO = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+class SalidaInvalida(Exception):
+    """La respuesta del modelo no se pudo convertir en un post estructurado"""
+
+
+def extraer_json(texto: str) -> Optional[Dict]:
+    """
+    Objeto JSON de una respuesta, aunque venga entre ``` o con texto alrededor
+    """
+    texto = (texto or "").strip()
+    bloque = _BLOQUE_CODIGO.search(texto)
+    if bloque:
+        texto = bloque.group(1).strip()
+    try:
+        datos = json.loads(texto)
+        return datos if isinstance(datos, dict) else None
+    except ValueError:
+        pass
+
+    # Primer objeto completo del texto, respetando las llaves dentro de cadenas
+    decodificador = json.JSONDecoder()
+    for inicio in (i for i, c in enumerate(texto) if c == "{"):
+        try:
+            datos, _ = decodificador.raw_decode(texto, inicio)
+        except ValueError:
+            continue
+        if isinstance(datos, dict):
+            return datos
+    return None
+
+
+def normalizar_hashtag(hashtag: str) -> str:
+    """'inteligencia artificial' o '#IA' -> '#InteligenciaArtificial' / '#IA'"""
+    partes = re.findall(r"\w+", hashtag or "")
+    if not partes:
+        return ""
+    if len(partes) == 1:
+        return f"#{partes[0]}"
+    return "#" + "".join(p[:1].upper() + p[1:] for p in partes)
+
+
+def validar(datos: Optional[Dict]) -> Tuple[Dict, List[str]]:
+    """
+    Normaliza los campos de un post estructurado y devuelve los que no son válidos
+    """
+    datos = datos or {}
+    post = {}
+    errores = []
+    for campo in ("gancho", "cuerpo", "cta"):
+        valor = datos.get(campo)
+        post[campo] = valor.strip() if isinstance(valor, str) else ""
+    if not post["cuerpo"]:
+        errores.append("cuerpo")
+    if not post["cta"]:
+        errores.append("cta")
+
+    hashtags = datos.get("hashtags")
+    if isinstance(hashtags, str):
+        hashtags = hashtags.split()
+    if not isinstance(hashtags, list):
+        hashtags = []
+    normalizados = [normalizar_hashtag(h) for h in hashtags if isinstance(h, str)]
+    # Sin repetidos aunque cambien las mayúsculas (#IA y #ia)
+    unicos = {}
+    for hashtag in normalizados:
+        if hashtag:
+            unicos.setdefault(hashtag.lower(), hashtag)
+    post["hashtags"] = list(unicos.values())[:MAX_HASHTAGS_RECOMENDADOS]
+    if not post["hashtags"]:
+        errores.append("hashtags")
+    return post, errores
+
+
+def prompt_reparacion(respuesta: str, post: Dict, errores: List[str]) -> str:
+    """Pide solo los campos que faltan o no son válidos, con el resto como contexto"""
+    if not post.get("cuerpo"):
+        return (
+            "La siguiente respuesta debía ser un objeto JSON con las claves "
+            f"{', '.join(CAMPOS)}. Conviértela a ese formato sin cambiar el contenido "
+            "y responde solo con el JSON.\n\n" + respuesta
+        )
+    contexto = json.dumps({c: post[c] for c in CAMPOS if c not in errores}, ensure_ascii=False)
+    return (
+        f"Este es un post de LinkedIn a medias:\n{contexto}\n\n"
+        f"Escribe solo los campos que faltan ({', '.join(errores)}) y responde únicamente con un "
+        "objeto JSON con esas claves. \"hashtags\" es una lista de hashtags y \"cta\" una pregunta final."
+    )
+
+
+def ensamblar(post: Dict) -> str:
+    """Texto final del post a partir de sus campos"""
+    return LinkedInOptimizer.formatear_para_linkedin(post["cuerpo"], post["hashtags"],
+                                                     gancho=post.get("gancho", ""), cta=post.get("cta", ""))
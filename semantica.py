@@ -0,0 +1,268 @@
+"""
+Búsqueda semántica y agrupación por temas con embeddings locales en CPU.
+
+Dependencias opcionales:
+- sentence-transformers: modelo multilingüe para conectar consultas en español
+  con noticias en inglés
+- hnswlib: índice aproximado de vecinos cercanos (sin él se usa búsqueda exacta
+  sobre los vectores mapeados en memoria)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+from utils import NewsProcessor
+
+MODELO_POR_DEFECTO = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def disponible() -> bool:
+    """Indica si está instalado el modelo de embeddings"""
+    return SentenceTransformer is not None
+
+
+def _clave(noticia: Dict) -> str:
+    """Identificador estable de una noticia"""
+    base = noticia.get('url') or f"{noticia.get('title', '')}|{noticia.get('publishedAt', '')}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+def _texto(noticia: Dict) -> str:
+    return f"{noticia.get('title', '')}. {noticia.get('description', '')}"
+
+
+class IndiceSemantico:
+    """
+    Índice de embeddings persistente en disco.
+
+    Los vectores se guardan en un fichero float32 que se abre con np.memmap, de
+    modo que arrancar no vuelve a calcular embeddings del corpus ya ingerido.
+    """
+
+    def __init__(self, directorio: str = ".cache/semantica", modelo: str = MODELO_POR_DEFECTO,
+                 tamano_lote: int = 32, max_elementos: int = 100_000):
+        if SentenceTransformer is None:
+            raise ImportError("Instala sentence-transformers para usar la búsqueda semántica")
+
+        self.directorio = directorio
+        self.tamano_lote = tamano_lote
+        self.max_elementos = max_elementos
+        self._modelo = SentenceTransformer(modelo, device="cpu")
+        self.dimension = self._modelo.get_sentence_embedding_dimension()
+        self._lock = threading.Lock()
+
+        os.makedirs(directorio, exist_ok=True)
+        self._ruta_vectores = os.path.join(directorio, "vectores.f32")
+        self._ruta_noticias = os.path.join(directorio, "noticias.jsonl")
+        self._ruta_hnsw = os.path.join(directorio, "indice.hnsw")
+
+        self.noticias: List[Dict] = []
+        self._posiciones: Dict[str, int] = {}
+        self._cargar()
+
+    def _cargar(self) -> None:
+        """Carga metadatos, vectores mapeados en memoria e índice HNSW"""
+        reescribir = False
+        if os.path.exists(self._ruta_noticias):
+            with open(self._ruta_noticias, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        noticia = json.loads(linea)
+                    except ValueError:
+                        # Última línea a medio escribir
+                        reescribir = True
+                        break
+                    self._posiciones[_clave(noticia)] = len(self.noticias)
+                    self.noticias.append(noticia)
+
+        # Deja vectores y metadatos con el mismo número de filas: la fila i del
+        # fichero de vectores debe ser siempre la noticia i
+        tamano_fila = self.dimension * np.dtype(np.float32).itemsize
+        filas_vectores = os.path.getsize(self._ruta_vectores) // tamano_fila if os.path.exists(self._ruta_vectores) else 0
+        if filas_vectores < len(self.noticias):
+            for noticia in self.noticias[filas_vectores:]:
+                del self._posiciones[_clave(noticia)]
+            del self.noticias[filas_vectores:]
+            reescribir = True
+        if reescribir:
+            with open(self._ruta_noticias, "w", encoding="utf-8") as f:
+                for noticia in self.noticias:
+                    f.write(json.dumps(noticia, ensure_ascii=False) + "\n")
+        if os.path.exists(self._ruta_vectores) and os.path.getsize(self._ruta_vectores) != len(self.noticias) * tamano_fila:
+            # Vectores escritos sin sus metadatos (escritura interrumpida)
+            os.truncate(self._ruta_vectores, len(self.noticias) * tamano_fila)
+
+        self._vectores = self._mapear_vectores()
+
+        self._hnsw = None
+        if hnswlib is not None:
+            self._hnsw = hnswlib.Index(space="cosine", dim=self.dimension)
+            if os.path.exists(self._ruta_hnsw) and self.noticias:
+                self._hnsw.load_index(self._ruta_hnsw, max_elements=max(self.max_elementos, len(self.noticias)))
+                if self._hnsw.get_current_count() != len(self.noticias):
+                    self._reconstruir_hnsw()
+            else:
+                self._reconstruir_hnsw()
+            self._hnsw.set_ef(64)
+
+    def _reconstruir_hnsw(self) -> None:
+        self._hnsw = hnswlib.Index(space="cosine", dim=self.dimension)
+        self._hnsw.init_index(max_elements=max(self.max_elementos, len(self.noticias)), ef_construction=200, M=16)
+        if len(self._vectores):
+            self._hnsw.add_items(np.asarray(self._vectores), np.arange(len(self._vectores)))
+            self._hnsw.save_index(self._ruta_hnsw)
+
+    def _mapear_vectores(self) -> np.ndarray:
+        filas = len(self.noticias)
+        if not filas or not os.path.exists(self._ruta_vectores):
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(self._ruta_vectores, dtype=np.float32, mode="r", shape=(filas, self.dimension))
+
+    def embeber(self, textos: List[str]) -> np.ndarray:
+        """Calcula embeddings normalizados por lotes"""
+        return self._modelo.encode(
+            textos,
+            batch_size=self.tamano_lote,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+
+    def agregar(self, noticias: List[Dict]) -> int:
+        """
+        Añade al índice las noticias que aún no contiene.
+
+        Returns:
+            Número de noticias nuevas indexadas
+        """
+        with self._lock:
+            nuevas = []
+            vistas = set()
+            for noticia in noticias:
+                clave = _clave(noticia)
+                if clave not in self._posiciones and clave not in vistas:
+                    vistas.add(clave)
+                    nuevas.append(noticia)
+            if not nuevas:
+                return 0
+
+            vectores = self.embeber([_texto(n) for n in nuevas])
+            inicio = len(self.noticias)
+
+            # Primero los vectores y después los metadatos: una línea de
+            # metadatos implica que su vector ya está en disco
+            with open(self._ruta_vectores, "ab") as f:
+                f.write(vectores.tobytes())
+            with open(self._ruta_noticias, "a", encoding="utf-8") as f:
+                for noticia in nuevas:
+                    f.write(json.dumps(noticia, ensure_ascii=False) + "\n")
+
+            for i, noticia in enumerate(nuevas):
+                self._posiciones[_clave(noticia)] = inicio + i
+                self.noticias.append(noticia)
+            self._vectores = self._mapear_vectores()
+
+            if self._hnsw is not None:
+                if len(self.noticias) > self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(len(self.noticias) * 2)
+                self._hnsw.add_items(vectores, np.arange(inicio, inicio + len(nuevas)))
+                self._hnsw.save_index(self._ruta_hnsw)
+
+            return len(nuevas)
+
+    def buscar(self, consulta: str, k: int = 10) -> List[Dict]:
+        """Devuelve las k noticias más cercanas a la consulta con su puntuación"""
+        if not self.noticias:
+            return []
+
+        k = min(k, len(self.noticias))
+        vector = self.embeber([consulta])[0]
+
+        if self._hnsw is not None:
+            etiquetas, distancias = self._hnsw.knn_query(vector, k=k)
+            pares = zip(etiquetas[0], 1.0 - distancias[0])
+        else:
+            similitudes = np.asarray(self._vectores) @ vector
+            mejores = np.argpartition(-similitudes, k - 1)[:k]
+            pares = ((i, similitudes[i]) for i in mejores[np.argsort(-similitudes[mejores])])
+
+        return [dict(self.noticias[int(i)], score_semantico=float(s)) for i, s in pares]
+
+    def ordenar_por_relevancia(self, consulta: str, noticias: List[Dict]) -> List[Dict]:
+        """Reordena una lista de resultados según su similitud con la consulta"""
+        if not noticias:
+            return noticias
+
+        vectores = self.vectores_de(noticias)
+        similitudes = vectores @ self.embeber([consulta])[0]
+        orden = np.argsort(-similitudes)
+        return [dict(noticias[i], score_semantico=float(similitudes[i])) for i in orden]
+
+    def vectores_de(self, noticias: List[Dict]) -> np.ndarray:
+        """Vectores de una lista de noticias, reutilizando los ya indexados"""
+        self.agregar(noticias)
+        posiciones = [self._posiciones[_clave(n)] for n in noticias]
+        return np.asarray(self._vectores[posiciones])
+
+    def agrupar(self, noticias: List[Dict], num_grupos: Optional[int] = None,
+                iteraciones: int = 20) -> List[Dict]:
+        """
+        Agrupa una lista de resultados por temas con k-means sobre los embeddings.
+
+        Returns:
+            Lista de grupos con 'etiqueta' (palabras clave) y 'noticias'
+        """
+        if not noticias:
+            return []
+
+        vectores = self.vectores_de(noticias)
+        if num_grupos is None:
+            num_grupos = max(1, round(np.sqrt(len(noticias) / 2)))
+        num_grupos = min(num_grupos, len(noticias))
+
+        # k-means con inicialización determinista por puntos más alejados
+        centros = [vectores[0]]
+        for _ in range(1, num_grupos):
+            distancias = 1.0 - np.max(vectores @ np.array(centros).T, axis=1)
+            centros.append(vectores[int(np.argmax(distancias))])
+        centros = np.array(centros)
+
+        asignacion = np.zeros(len(noticias), dtype=int)
+        for iteracion in range(iteraciones):
+            nueva = np.argmax(vectores @ centros.T, axis=1)
+            if iteracion > 0 and np.array_equal(nueva, asignacion):
+                break
+            asignacion = nueva
+            for g in range(num_grupos):
+                miembros = vectores[asignacion == g]
+                if len(miembros):
+                    centro = miembros.mean(axis=0)
+                    centros[g] = centro / (np.linalg.norm(centro) or 1.0)
+
+        grupos = []
+        for g in range(num_grupos):
+            miembros = [noticias[i] for i in np.flatnonzero(asignacion == g)]
+            if not miembros:
+                continue
+            texto = " ".join(_texto(n) for n in miembros)
+            grupos.append({
+                "etiqueta": ", ".join(NewsProcessor.extraer_palabras_clave(texto, 3)),
+                "noticias": miembros
+            })
+
+        return sorted(grupos, key=lambda grupo: -len(grupo["noticias"]))
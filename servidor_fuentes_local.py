@@ -0,0 +1,122 @@
+"""
+Servidor local que emula las fuentes de noticias y los endpoints de modelos de
+los proveedores LLM, para probar monitor_salud.py sin red ni API keys.
+
+Atiende las rutas que sondea el monitor (Guardian /search, NewsAPI
+/v2/top-headlines, Google News /rss, BBC /news/rss.xml, /v1/models y
+/openai/v1/models). Cada fuente puede tener su propio retardo o fallar.
+
+Uso:
+    python servidor_fuentes_local.py --puerto 8650 --retardo 0.2 --fallar newsapi
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+
+# Ruta -> fuente a la que corresponde
+RUTAS = {
+    "/search": "guardian",
+    "/v2/top-headlines": "newsapi",
+    "/rss": "google",
+    "/news/rss.xml": "bbc",
+    "/v1/models": "openai",
+    "/openai/v1/models": "groq",
+}
+
+RSS = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Prueba</title>'
+       '<item><title>Noticia de prueba</title><link>https://ejemplo.com/1</link></item></channel></rss>')
+
+
+class ServidorFuentesLocal:
+    """Emulador de fuentes con retardo y fallos configurables por fuente"""
+
+    def __init__(self, puerto: int = 0, retardo: float = 0.0, retardos: Optional[Dict[str, float]] = None,
+                 fallos: Optional[Set[str]] = None):
+        self.retardo = retardo
+        self.retardos = dict(retardos or {})
+        self.fallos = set(fallos or ())
+        self.peticiones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_handler())
+        self._servidor.daemon_threads = True
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self) -> "ServidorFuentesLocal":
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado: int, cuerpo, tipo: str = "application/json"):
+                datos = (cuerpo if isinstance(cuerpo, str) else json.dumps(cuerpo)).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                ruta = self.path.split("?", 1)[0]
+                fuente = RUTAS.get(ruta)
+                if fuente is None:
+                    return self._responder(404, {"error": "No encontrado"})
+                with servidor._lock:
+                    servidor.peticiones[fuente] = servidor.peticiones.get(fuente, 0) + 1
+                time.sleep(servidor.retardos.get(fuente, servidor.retardo))
+                if fuente in servidor.fallos:
+                    return self._responder(503, {"error": f"{fuente} no disponible"})
+                if fuente in ("google", "bbc"):
+                    return self._responder(200, RSS, "application/rss+xml")
+                if fuente == "guardian":
+                    return self._responder(200, {"response": {"status": "ok", "results": []}})
+                if fuente == "newsapi":
+                    return self._responder(200, {"status": "ok", "articles": []})
+                self._responder(200, {"object": "list", "data": [{"id": "modelo-prueba", "object": "model"}]})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de fuentes para probar el monitor de salud")
+    parser.add_argument("--puerto", type=int, default=8650)
+    parser.add_argument("--retardo", type=float, default=0.0, help="Segundos de retardo de cada respuesta")
+    parser.add_argument("--fallar", nargs="*", default=[], choices=sorted(set(RUTAS.values())),
+                        help="Fuentes que responden con 503")
+    args = parser.parse_args()
+
+    servidor = ServidorFuentesLocal(args.puerto, args.retardo, fallos=set(args.fallar)).iniciar()
+    print(f"🧪 Fuentes simuladas escuchando en {servidor.url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
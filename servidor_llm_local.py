@@ -0,0 +1,291 @@
+"""
+Servidor LLM local compatible con la API de OpenAI para el proveedor "Local".
+
+Mantiene el modelo cargado en memoria (llama.cpp en CPU con un modelo GGUF
+cuantizado) y ejecuta las peticiones de una en una, por orden de llegada, en
+un único hilo: las simultáneas esperan en cola, no se decodifican en paralelo.
+llama.cpp reutiliza su caché de estados cuando un prompt comparte prefijo con
+otro anterior. El streaming envía cada fragmento según se genera, y si el
+cliente corta la conexión la generación se detiene. Sin modelo arranca en modo
+eco, que responde sin red ni dependencias para pruebas.
+
+Para atender varias peticiones a la vez, usar llama-server de llama.cpp con
+--parallel y --cont-batching; la app solo necesita LOCAL_LLM_URL.
+
+Uso:
+    python servidor_llm_local.py --modelo modelos/llama-3.1-8b-instruct-q4_k_m.gguf
+    python servidor_llm_local.py --eco --puerto 8080   # sin modelo, para pruebas
+    python servidor_llm_local.py --eco --retardo-fragmento 0.05   # simula la velocidad de generación
+"""
+
+import argparse
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from servidor_lotes_local import respuesta_por_defecto
+
+
+def _texto_prompt(mensajes: List[Dict]) -> str:
+    return "\n".join(f"{m['role']}: {m['content']}" for m in mensajes)
+
+
+class MotorEco:
+    """Motor de pruebas: genera un post a partir del título de la noticia"""
+
+    nombre = "eco"
+
+    def __init__(self, retardo_fragmento: float = 0.0):
+        self.retardo_fragmento = retardo_fragmento
+
+    def tokenizar(self, texto: str) -> List[str]:
+        return texto.split()
+
+    def generar(self, mensajes: List[Dict], max_tokens: int, temperature: float,
+                response_format: Optional[Dict] = None) -> Iterator[str]:
+        texto = respuesta_por_defecto({"messages": mensajes})
+        if response_format:
+            # Mismo post de prueba con las partes que pide la salida estructurada
+            gancho, cuerpo, cta, hashtags = texto.split("\n\n")
+            texto = json.dumps({"gancho": gancho, "cuerpo": cuerpo, "cta": cta, "hashtags": hashtags.split()},
+                               ensure_ascii=False)
+        for parte in re.findall(r"\s*\S+", texto):
+            time.sleep(self.retardo_fragmento)
+            yield parte
+
+
+class MotorLlamaCpp:
+    """Modelo GGUF cargado una sola vez con llama-cpp-python y caché de estados por prefijo"""
+
+    def __init__(self, ruta_modelo: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 cache_bytes: int = 2 << 30):
+        from llama_cpp import Llama, LlamaRAMCache
+
+        self.nombre = ruta_modelo
+        self.llm = Llama(model_path=ruta_modelo, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self.llm.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes))
+
+    def tokenizar(self, texto: str) -> List[int]:
+        return self.llm.tokenize(texto.encode("utf-8"))
+
+    def generar(self, mensajes: List[Dict], max_tokens: int, temperature: float,
+                response_format: Optional[Dict] = None) -> Iterator[str]:
+        if response_format and response_format.get("type") == "json_schema":
+            # llama-cpp-python recibe el esquema dentro de json_object y lo aplica como gramática
+            response_format = {"type": "json_object", "schema": response_format["json_schema"]["schema"]}
+        # Dejar de iterar detiene la generación
+        for trozo in self.llm.create_chat_completion(messages=mensajes, max_tokens=max_tokens,
+                                                     temperature=temperature, response_format=response_format,
+                                                     stream=True):
+            parte = trozo["choices"][0]["delta"].get("content")
+            if parte:
+                yield parte
+
+
+class ColaSerie:
+    """
+    Un único hilo ejecuta el modelo y atiende las peticiones de una en una, por
+    orden de llegada. Con una cola de fragmentos, cada fragmento se entrega
+    según se genera (None al terminar) y activar el evento de cancelación
+    detiene la generación
+    """
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.metricas = Counter()
+        self._cola: "queue.Queue[Tuple[Dict, Future, Optional[queue.Queue], Optional[threading.Event]]]" = \
+            queue.Queue()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._trabajar, daemon=True).start()
+
+    def enviar(self, peticion: Dict, fragmentos: Optional[queue.Queue] = None,
+               cancelado: Optional[threading.Event] = None) -> Future:
+        """Encola la petición; el futuro se resuelve con la respuesta completa"""
+        futuro = Future()
+        self._cola.put((peticion, futuro, fragmentos, cancelado))
+        with self._lock:
+            self.metricas["en_cola_max"] = max(self.metricas["en_cola_max"], self._cola.qsize())
+        return futuro
+
+    def _trabajar(self) -> None:
+        while True:
+            peticion, futuro, fragmentos, cancelado = self._cola.get()
+            try:
+                futuro.set_result(self._completar(peticion, fragmentos, cancelado))
+            except Exception as e:
+                futuro.set_exception(e)
+            finally:
+                if fragmentos is not None:
+                    fragmentos.put(None)
+
+    def _completar(self, peticion: Dict, fragmentos: Optional[queue.Queue],
+                   cancelado: Optional[threading.Event]) -> Dict:
+        mensajes = peticion["messages"]
+        inicio = time.perf_counter()
+        partes = []
+        finalizacion = "stop"
+        for parte in self.motor.generar(mensajes, peticion.get("max_tokens") or 512,
+                                        peticion.get("temperature", 0.7), peticion.get("response_format")):
+            if cancelado is not None and cancelado.is_set():
+                finalizacion = "cancelled"
+                break
+            partes.append(parte)
+            if fragmentos is not None:
+                fragmentos.put(parte)
+        texto = "".join(partes)
+        tokens_prompt = len(self.motor.tokenizar(_texto_prompt(mensajes)))
+        tokens_respuesta = len(self.motor.tokenizar(texto))
+        with self._lock:
+            self.metricas["peticiones"] += 1
+            self.metricas["canceladas"] += finalizacion == "cancelled"
+            self.metricas["tokens_prompt"] += tokens_prompt
+            self.metricas["tokens_respuesta"] += tokens_respuesta
+            self.metricas["ms_generacion"] += round((time.perf_counter() - inicio) * 1000)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": peticion.get("model", self.motor.nombre),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": texto},
+                         "finish_reason": finalizacion}],
+            "usage": {
+                "prompt_tokens": tokens_prompt,
+                "completion_tokens": tokens_respuesta,
+                "total_tokens": tokens_prompt + tokens_respuesta
+            }
+        }
+
+
+class ServidorLLMLocal:
+    """Servidor HTTP con /v1/chat/completions, /v1/models y /metricas"""
+
+    def __init__(self, motor=None, host: str = "127.0.0.1", puerto: int = 0):
+        self.cola = ColaSerie(motor or MotorEco())
+        self._servidor = ThreadingHTTPServer((host, puerto), self._crear_handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self) -> "ServidorLLMLocal":
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado: int, cuerpo: Dict) -> None:
+                datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _evento(self, evento: Dict) -> None:
+                self.wfile.write(f"data: {json.dumps(evento, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _responder_stream(self, peticion: Dict, incluir_uso: bool) -> None:
+                """Envía cada fragmento como evento SSE según lo genera el modelo"""
+                fragmentos, cancelado = queue.Queue(), threading.Event()
+                futuro = servidor.cola.enviar(peticion, fragmentos, cancelado)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                base = {"id": f"chatcmpl-{uuid.uuid4().hex[:8]}", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": peticion.get("model", servidor.cola.motor.nombre)}
+                try:
+                    self._evento(dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                                      "finish_reason": None}]))
+                    parte = fragmentos.get()
+                    while parte is not None:
+                        self._evento(dict(base, choices=[{"index": 0, "delta": {"content": parte},
+                                                          "finish_reason": None}]))
+                        parte = fragmentos.get()
+                    respuesta = futuro.result()
+                    self._evento(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                    if incluir_uso:
+                        self._evento(dict(base, choices=[], usage=respuesta["usage"]))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente ha cortado el stream (generación cancelada): se deja de generar
+                    cancelado.set()
+                except Exception as e:
+                    self._evento({"error": {"message": str(e)}})
+
+            def do_GET(self):
+                if self.path == "/v1/models":
+                    return self._responder(200, {"object": "list", "data": [
+                        {"id": servidor.cola.motor.nombre, "object": "model", "owned_by": "local"}
+                    ]})
+                if self.path == "/metricas":
+                    return self._responder(200, dict(servidor.cola.metricas))
+                self._responder(404, {"error": {"message": "No encontrado"}})
+
+            def do_POST(self):
+                if self.path != "/v1/chat/completions":
+                    return self._responder(404, {"error": {"message": "No encontrado"}})
+                try:
+                    peticion = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    if peticion.get("stream"):
+                        incluir_uso = (peticion.get("stream_options") or {}).get("include_usage", False)
+                        return self._responder_stream(peticion, incluir_uso)
+                    self._responder(200, servidor.cola.enviar(peticion).result())
+                except Exception as e:
+                    self._responder(500, {"error": {"message": str(e)}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM local compatible con OpenAI")
+    parser.add_argument("--modelo", help="Ruta al modelo GGUF cuantizado")
+    parser.add_argument("--eco", action="store_true", help="Arranca sin modelo (respuestas de prueba)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--hilos", type=int, help="Hilos de CPU para llama.cpp")
+    parser.add_argument("--contexto", type=int, default=4096)
+    parser.add_argument("--retardo-fragmento", type=float, default=0.0,
+                        help="Con --eco, segundos entre fragmentos (simula la velocidad de generación)")
+    args = parser.parse_args()
+
+    if not args.eco and not args.modelo:
+        parser.error("Indica --modelo o usa --eco")
+
+    motor = MotorEco(args.retardo_fragmento) if args.eco else MotorLlamaCpp(args.modelo, args.contexto, args.hilos)
+    servidor = ServidorLLMLocal(motor, args.host, args.puerto).iniciar()
+    print(f"🖥️ LLM local ({motor.nombre}) escuchando en {servidor.url}/v1 (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
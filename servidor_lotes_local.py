@@ -0,0 +1,196 @@
+"""
+Servidor local que emula los endpoints de ficheros y lotes de OpenAI/Groq.
+
+Permite probar lotes.py sin red ni API keys. Acepta las rutas de OpenAI
+(/v1/...) y las de Groq (/openai/v1/...).
+
+Uso:
+    python servidor_lotes_local.py --puerto 8600 --retardo 2
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+
+def respuesta_por_defecto(cuerpo: Dict) -> str:
+    """Genera un post de prueba a partir del prompt recibido"""
+    prompt = cuerpo["messages"][-1]["content"]
+    titulo = next((linea.split(":", 1)[1].strip() for linea in prompt.splitlines()
+                   if linea.strip().startswith("Título:")), "la noticia")
+    return f"📰 {titulo}\n\nPost de prueba generado por el servidor local.\n\n¿Qué opinas?\n\n#Prueba #LinkedIn"
+
+
+class ServidorLotesLocal:
+    """Emulador en memoria de /files y /batches"""
+
+    def __init__(self, puerto: int = 0, retardo: float = 0.0,
+                 responder: Callable[[Dict], str] = respuesta_por_defecto):
+        self.retardo = retardo
+        self.responder = responder
+        self.ficheros: Dict[str, bytes] = {}
+        self.lotes: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_handler())
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self) -> "ServidorLotesLocal":
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def _guardar_fichero(self, contenido: bytes) -> Dict:
+        file_id = f"file_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.ficheros[file_id] = contenido
+        return {"id": file_id, "object": "file", "bytes": len(contenido), "purpose": "batch",
+                "created_at": int(time.time()), "filename": "lote.jsonl"}
+
+    def _crear_lote(self, peticion: Dict) -> Dict:
+        lote_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lote = {
+            "id": lote_id,
+            "object": "batch",
+            "endpoint": peticion["endpoint"],
+            "input_file_id": peticion["input_file_id"],
+            "completion_window": peticion.get("completion_window", "24h"),
+            "metadata": peticion.get("metadata"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}
+        }
+        with self._lock:
+            self.lotes[lote_id] = lote
+        threading.Timer(self.retardo, self._procesar_lote, args=(lote_id,)).start()
+        return lote
+
+    def _procesar_lote(self, lote_id: str) -> None:
+        lote = self.lotes[lote_id]
+        salida = []
+        completados = fallidos = 0
+        for linea in self.ficheros[lote["input_file_id"]].decode("utf-8").splitlines():
+            if not linea.strip():
+                continue
+            peticion = json.loads(linea)
+            try:
+                texto = self.responder(peticion["body"])
+                prompt_tokens = sum(len(m["content"].split()) for m in peticion["body"]["messages"])
+                cuerpo = {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
+                    "object": "chat.completion",
+                    "model": peticion["body"]["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": texto},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(texto.split()),
+                              "total_tokens": prompt_tokens + len(texto.split())}
+                }
+                salida.append({"id": peticion["custom_id"], "custom_id": peticion["custom_id"],
+                               "response": {"status_code": 200, "body": cuerpo}, "error": None})
+                completados += 1
+            except Exception as e:
+                salida.append({"id": peticion["custom_id"], "custom_id": peticion["custom_id"],
+                               "response": None, "error": {"message": str(e)}})
+                fallidos += 1
+
+        contenido = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in salida).encode("utf-8")
+        archivo = self._guardar_fichero(contenido)
+        with self._lock:
+            lote.update({
+                "status": "completed",
+                "output_file_id": archivo["id"],
+                "completed_at": int(time.time()),
+                "request_counts": {"total": completados + fallidos, "completed": completados, "failed": fallidos}
+            })
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _ruta(self) -> str:
+                ruta = self.path.split("?", 1)[0]
+                return ruta[len("/openai"):] if ruta.startswith("/openai/") else ruta
+
+            def _responder(self, estado: int, cuerpo, tipo: str = "application/json"):
+                datos = cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _leer_cuerpo(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                ruta = self._ruta()
+                cuerpo = self._leer_cuerpo()
+                if ruta == "/v1/files":
+                    mensaje = BytesParser(policy=policy.default).parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + cuerpo
+                    )
+                    for parte in mensaje.iter_parts():
+                        if parte.get_param("name", header="content-disposition") == "file":
+                            return self._responder(200, servidor._guardar_fichero(parte.get_payload(decode=True)))
+                    return self._responder(400, {"error": {"message": "Falta el fichero"}})
+                if ruta == "/v1/batches":
+                    peticion = json.loads(cuerpo)
+                    if peticion.get("input_file_id") not in servidor.ficheros:
+                        return self._responder(404, {"error": {"message": "Fichero no encontrado"}})
+                    return self._responder(200, servidor._crear_lote(peticion))
+                self._responder(404, {"error": {"message": f"Ruta desconocida: {ruta}"}})
+
+            def do_GET(self):
+                partes = self._ruta().strip("/").split("/")
+                if partes[:2] == ["v1", "batches"] and len(partes) == 3 and partes[2] in servidor.lotes:
+                    return self._responder(200, servidor.lotes[partes[2]])
+                if partes[:2] == ["v1", "files"] and len(partes) == 4 and partes[3] == "content" \
+                        and partes[2] in servidor.ficheros:
+                    return self._responder(200, servidor.ficheros[partes[2]], "application/octet-stream")
+                self._responder(404, {"error": {"message": "No encontrado"}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de lotes para pruebas")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--retardo", type=float, default=0.0, help="Segundos hasta completar cada lote")
+    args = parser.parse_args()
+
+    servidor = ServidorLotesLocal(args.puerto, args.retardo).iniciar()
+    print(f"🧪 Servidor de lotes escuchando en {servidor.url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
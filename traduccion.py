@@ -0,0 +1,206 @@
+"""
+Traducción de noticias en la ingesta.
+
+Detecta el idioma de cada noticia y traduce una sola vez el título y la
+descripción de las que no están en el idioma de destino. Las traducciones se
+guardan en SQLite por hash del contenido, de modo que una noticia repetida o
+una búsqueda posterior no vuelven a traducirse.
+
+Traductores disponibles:
+- TraductorLocal: modelos MarianMT en CPU (requiere transformers, opcional)
+- TraductorLLM: el proveedor LLM configurado (OpenAI o Groq), por lotes
+- TraductorPrueba: sustituto local sin dependencias para pruebas
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from transformers import pipeline
+except ImportError:
+    pipeline = None
+
+import generacion
+
+# Palabras frecuentes por idioma para una detección rápida sin dependencias
+PALABRAS_FRECUENTES = {
+    "es": {"el", "la", "los", "las", "de", "del", "que", "y", "en", "un", "una", "por", "para", "con", "se", "es", "su", "al"},
+    "en": {"the", "of", "and", "to", "in", "a", "is", "that", "for", "on", "with", "as", "by", "at", "from", "it", "its", "be"},
+    "fr": {"le", "la", "les", "des", "et", "du", "une", "est", "dans", "pour", "que", "qui", "sur", "au", "aux", "pas"},
+    "de": {"der", "die", "das", "und", "ist", "nicht", "mit", "den", "von", "zu", "ein", "eine", "im", "auf", "für", "dem"},
+    "it": {"il", "di", "che", "e", "la", "per", "un", "una", "del", "della", "sono", "con", "non", "gli", "nel", "alla"},
+    "pt": {"o", "a", "os", "as", "de", "do", "da", "que", "e", "em", "um", "uma", "para", "com", "não", "no", "na"},
+}
+
+CAMPOS_TRADUCIBLES = ("title", "description")
+
+_PALABRA = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def disponible() -> bool:
+    """Indica si está instalado el modelo de traducción local"""
+    return pipeline is not None
+
+
+def detectar_idioma(texto: str, por_defecto: str = "es") -> str:
+    """Idioma más probable según las palabras frecuentes que aparecen en el texto"""
+    palabras = [p.lower() for p in _PALABRA.findall(texto or "")]
+    if not palabras:
+        return por_defecto
+    puntuaciones = Counter({idioma: sum(p in frecuentes for p in palabras)
+                            for idioma, frecuentes in PALABRAS_FRECUENTES.items()})
+    idioma, puntos = puntuaciones.most_common(1)[0]
+    return idioma if puntos else por_defecto
+
+
+class TraductorPrueba:
+    """Traductor local de pruebas: marca el texto con el idioma de destino"""
+
+    def traducir(self, textos: List[str], origen: str, destino: str) -> List[str]:
+        return [f"[{destino}] {texto}" for texto in textos]
+
+
+class TraductorLocal:
+    """Traductor en CPU con modelos MarianMT (Helsinki-NLP/opus-mt-<origen>-<destino>)"""
+
+    def __init__(self, tam_lote: int = 16):
+        if pipeline is None:
+            raise ImportError("Instala transformers para usar la traducción local")
+        self.tam_lote = tam_lote
+        self._modelos: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def _modelo(self, origen: str, destino: str):
+        with self._lock:
+            if (origen, destino) not in self._modelos:
+                self._modelos[(origen, destino)] = pipeline(
+                    "translation", model=f"Helsinki-NLP/opus-mt-{origen}-{destino}"
+                )
+            return self._modelos[(origen, destino)]
+
+    def traducir(self, textos: List[str], origen: str, destino: str) -> List[str]:
+        resultados = self._modelo(origen, destino)(textos, batch_size=self.tam_lote, truncation=True)
+        return [r["translation_text"] for r in resultados]
+
+
+class TraductorLLM:
+    """Traduce varios textos en una sola llamada al proveedor LLM"""
+
+    def __init__(self, client, proveedor: str):
+        self.client = client
+        self.proveedor = proveedor
+
+    def traducir(self, textos: List[str], origen: str, destino: str) -> List[str]:
+        prompt = (
+            f"Traduce del idioma '{origen}' al idioma '{destino}' cada elemento de esta lista JSON. "
+            "Responde solo con una lista JSON de cadenas, en el mismo orden y con el mismo número de elementos.\n\n"
+            + json.dumps(textos, ensure_ascii=False)
+        )
+        response = self.client.chat.completions.create(
+            model=generacion.MODELOS[self.proveedor],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
+        )
+        contenido = response.choices[0].message.content.strip()
+        # Una respuesta inválida es un error del lote: no debe guardarse en caché como traducción
+        try:
+            traducciones = json.loads(contenido[contenido.index("["):contenido.rindex("]") + 1])
+        except ValueError:
+            raise ValueError("La respuesta del LLM no es una lista JSON de traducciones")
+        if len(traducciones) != len(textos) or not all(isinstance(t, str) for t in traducciones):
+            raise ValueError(f"La lista del LLM no corresponde a los {len(textos)} textos enviados")
+        return traducciones
+
+
+class CacheTraducciones:
+    """Traducciones guardadas en SQLite por hash de idioma y contenido"""
+
+    def __init__(self, ruta: str = ".cache/traducciones.db"):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("CREATE TABLE IF NOT EXISTS traducciones (clave TEXT PRIMARY KEY, texto TEXT NOT NULL)")
+        self._conexion.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(texto: str, origen: str, destino: str) -> str:
+        return hashlib.sha256(f"{origen}|{destino}|{texto}".encode("utf-8")).hexdigest()
+
+    def obtener(self, claves: List[str]) -> Dict[str, str]:
+        if not claves:
+            return {}
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT clave, texto FROM traducciones WHERE clave IN ({','.join('?' * len(claves))})", claves
+            ).fetchall()
+        return dict(filas)
+
+    def guardar(self, traducciones: Dict[str, str]) -> None:
+        with self._lock:
+            self._conexion.executemany("INSERT OR REPLACE INTO traducciones VALUES (?, ?)", traducciones.items())
+            self._conexion.commit()
+
+
+class TraductorNoticias:
+    """Etapa de ingesta que deja título y descripción en el idioma de destino"""
+
+    def __init__(self, traductor, cache: Optional[CacheTraducciones] = None,
+                 idioma_destino: str = "es", tam_lote: int = 16):
+        self.traductor = traductor
+        self.cache = cache or CacheTraducciones()
+        self.idioma_destino = idioma_destino
+        self.tam_lote = tam_lote
+        self.estadisticas = Counter()
+
+    def traducir_noticias(self, noticias: List[Dict]) -> List[Dict]:
+        """
+        Devuelve copias de las noticias con los campos traducidos; los originales
+        quedan en title_original/description_original y el idioma en idioma_original
+        """
+        resultado = []
+        pendientes: Dict[str, List[Tuple[int, str, str]]] = {}
+        for i, noticia in enumerate(noticias):
+            noticia = dict(noticia)
+            resultado.append(noticia)
+            if "idioma_original" in noticia:
+                continue
+            idioma = detectar_idioma(f"{noticia.get('title', '')} {noticia.get('description', '')}", self.idioma_destino)
+            noticia["idioma_original"] = idioma
+            if idioma == self.idioma_destino:
+                continue
+            for campo in CAMPOS_TRADUCIBLES:
+                if noticia.get(campo):
+                    pendientes.setdefault(idioma, []).append((i, campo, noticia[campo]))
+
+        for origen, campos in pendientes.items():
+            claves = [self.cache.clave(texto, origen, self.idioma_destino) for _, _, texto in campos]
+            traducidos = self.cache.obtener(claves)
+            self.estadisticas["aciertos_cache"] += len(traducidos)
+
+            # Solo se envían al traductor los textos distintos que no estaban en caché
+            faltan = list(dict.fromkeys((clave, texto) for clave, (_, _, texto) in zip(claves, campos)
+                                        if clave not in traducidos))
+            for inicio in range(0, len(faltan), self.tam_lote):
+                lote = faltan[inicio:inicio + self.tam_lote]
+                try:
+                    textos = self.traductor.traducir([texto for _, texto in lote], origen, self.idioma_destino)
+                except Exception:
+                    self.estadisticas["errores"] += 1
+                    continue
+                nuevos = {clave: texto for (clave, _), texto in zip(lote, textos)}
+                self.cache.guardar(nuevos)
+                traducidos.update(nuevos)
+                self.estadisticas["traducidos"] += len(nuevos)
+
+            for clave, (i, campo, texto) in zip(claves, campos):
+                if clave in traducidos:
+                    resultado[i][f"{campo}_original"] = texto
+                    resultado[i][campo] = traducidos[clave]
+
+        return resultado
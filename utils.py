@@ -9,6 +9,22 @@ from bs4 import BeautifulSoup
 import feedparser
 from datetime import datetime, timedelta
 
+# Límites de LinkedIn
+LIMITE_CARACTERES_LINKEDIN = 3000
+PLIEGUE_CARACTERES = 210  # Texto visible antes de "...ver más"
+PLIEGUE_LINEAS = 3
+MAX_HASHTAGS_RECOMENDADOS = 5
+
+# Un único patrón para recorrer el texto una sola vez
+_TOKEN = re.compile(
+    r"(?P<salto>\n)"
+    r"|(?P<hashtag>#\w+)"
+    r"|(?P<palabra>\w+(?:['’-]\w+)*)"
+    r"|(?P<fin>[.!?…]+)"
+    r"|(?P<emoji>[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF])"
+)
+_VOCALES = re.compile(r"[aeiouyáéíóúàèìòùäëïöü]+", re.IGNORECASE)
+
 class NewsProcessor:
     """Clase para procesar y enriquecer noticias"""
     
@@ -93,7 +109,12 @@ class LinkedInOptimizer:
             limite = 500
         
         if len(palabras) > limite:
-            return ' '.join(palabras[:limite]) + "..."
+            texto = ' '.join(palabras[:limite]) + "..."
+        
+        # LinkedIn corta los posts a 3000 caracteres: recorta en un límite de palabra
+        if len(texto) > LIMITE_CARACTERES_LINKEDIN:
+            corte = texto.rfind(' ', 0, LIMITE_CARACTERES_LINKEDIN - 3)
+            texto = texto[:corte if corte > 0 else LIMITE_CARACTERES_LINKEDIN - 3].rstrip() + "..."
         
         return texto
     
@@ -127,16 +148,18 @@ class LinkedInOptimizer:
         return f"{texto}\n\n{cta}"
     
     @staticmethod
-    def formatear_para_linkedin(texto: str, hashtags: List[str]) -> str:
-        """Formatea el texto final para LinkedIn"""
+    def formatear_para_linkedin(texto: str, hashtags: List[str], gancho: str = "", cta: str = "") -> str:
+        """Formatea el texto final para LinkedIn (gancho, cuerpo, llamada a la acción y hashtags)"""
         # Asegurar que el texto termine correctamente
         if not texto.endswith(('.', '!', '?')):
             texto += '.'
-        
+
+        bloques = [gancho, texto, cta]
+
         # Agregar salto de línea antes de hashtags
-        hashtags_texto = ' '.join(hashtags)
-        
-        return f"{texto}\n\n{hashtags_texto}"
+        bloques.append(' '.join(hashtags))
+
+        return "\n\n".join(bloque for bloque in bloques if bloque)
 
 class TrendAnalyzer:
     """Analizador de tendencias en noticias"""
@@ -216,29 +239,73 @@ def generar_prompt_personalizado(noticia: Dict, perfil_usuario: Dict) -> str:
 
 # Funciones de utilidad adicionales
 
-def validar_api_keys(keys_dict: Dict[str, str]) -> Dict[str, bool]:
-    """Valida que las API keys estén configuradas correctamente"""
-    resultados = {}
+def analizar_post(texto: str) -> Dict:
+    """
+    Calcula en una sola pasada todas las métricas del post: recuentos,
+    legibilidad, posición del pliegue "ver más", densidades y límites de LinkedIn
+    """
+    palabras = hashtags = emojis = oraciones = silabas = 0
+    lineas = 1
+    palabras_en_oracion = 0
+    pliegue = min(len(texto), PLIEGUE_CARACTERES)
     
-    for servicio, key in keys_dict.items():
-        if key and len(key) > 10:  # Validación básica
-            resultados[servicio] = True
+    for token in _TOKEN.finditer(texto):
+        tipo = token.lastgroup
+        if tipo == 'palabra':
+            palabras += 1
+            palabras_en_oracion += 1
+            silabas += max(1, len(_VOCALES.findall(token.group())))
+        elif tipo == 'hashtag':
+            hashtags += 1
+        elif tipo == 'salto':
+            lineas += 1
+            if lineas > PLIEGUE_LINEAS and token.start() < pliegue:
+                pliegue = token.start()
+        elif tipo == 'fin':
+            if palabras_en_oracion:
+                oraciones += 1
+                palabras_en_oracion = 0
         else:
-            resultados[servicio] = False
+            emojis += 1
     
-    return resultados
-
-def calcular_metricas_post(texto: str) -> Dict[str, int]:
-    """Calcula métricas básicas del post generado"""
-    caracteres = len(texto)
-    palabras = len(texto.split())
-    lineas = len(texto.split('\n'))
-    hashtags = len([palabra for palabra in texto.split() if palabra.startswith('#')])
+    if palabras_en_oracion:
+        oraciones += 1
+    
+    # Índice de Fernández Huerta (adaptación de Flesch al español), 0-100
+    legibilidad = 0.0
+    if palabras:
+        legibilidad = 206.84 - 60 * (silabas / palabras) - 102 * (oraciones / palabras)
+        legibilidad = round(min(100.0, max(0.0, legibilidad)), 1)
+    
+    avisos = []
+    if len(texto) > LIMITE_CARACTERES_LINKEDIN:
+        avisos.append(f"Supera el límite de {LIMITE_CARACTERES_LINKEDIN} caracteres de LinkedIn en {len(texto) - LIMITE_CARACTERES_LINKEDIN}")
+    if hashtags > MAX_HASHTAGS_RECOMENDADOS:
+        avisos.append(f"Tiene {hashtags} hashtags (se recomiendan 3-{MAX_HASHTAGS_RECOMENDADOS})")
+    if pliegue < len(texto) and not texto[:pliegue].strip():
+        avisos.append('No hay texto visible antes de "ver más"')
     
     return {
-        'caracteres': caracteres,
+        'caracteres': len(texto),
         'palabras': palabras,
         'lineas': lineas,
         'hashtags': hashtags,
-        'tiempo_lectura': max(1, palabras // 200)  # minutos aproximados
+        'emojis': emojis,
+        'oraciones': oraciones,
+        'tiempo_lectura': max(1, palabras // 200),  # minutos aproximados
+        'legibilidad': legibilidad,
+        'densidad_hashtags': round(hashtags / palabras, 3) if palabras else 0.0,
+        'densidad_emojis': round(emojis / palabras, 3) if palabras else 0.0,
+        'pliegue': pliegue,
+        'caracteres_restantes': LIMITE_CARACTERES_LINKEDIN - len(texto),
+        'avisos': avisos
+    }
+
+def calcular_metricas_post(texto: str) -> Dict[str, int]:
+    """Calcula métricas básicas del post generado"""
+    metricas = analizar_post(texto)
+    
+    return {
+        clave: metricas[clave]
+        for clave in ('caracteres', 'palabras', 'lineas', 'hashtags', 'tiempo_lectura')
     }
\ No newline at end of file